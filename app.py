@@ -13,6 +13,11 @@ from agentic import AgenticWorkflow
 from dotenv import load_dotenv
 import us_states
 import traceback
+import time
+from chat_memory import ConversationMemory
+from templateprompts import summary_template, rag_template
+from stig_index import StigIndex
+from stig_rag import HybridRetriever, grounding_prompt
 
 st.set_page_config(page_title="Simple GenAI App", page_icon="🤖")
 
@@ -22,47 +27,132 @@ print(os.getenv('GRANITE_LLM_NAME'))
 
 tab1, tab2 = st.tabs(["Chat", "Agentic"])
 
-try:
-    llm = ChatOpenAI(
-        model=os.getenv('GRANITE_LLM_NAME'), 
+def llm_config():
+    """Env settings the chat model is built from; a change yields a new cached client."""
+    return (os.getenv('GRANITE_LLM_NAME'), os.getenv('OPENAI_API_KEY'), os.getenv('OPENAI_BASE_URL'))
+
+def embed_config():
+    """Env settings the embedding model is built from; a change yields a new cached client."""
+    return (os.getenv('EMBED_LLM_NAME'), os.getenv('EMBED_API_KEY'), os.getenv('EMBED_API_BASE'))
+
+@st.cache_resource(show_spinner=False)
+def get_llm(model_name, api_key, base_url):
+    """Process-wide chat model client, shared across reruns and sessions (and its connection pool with it)."""
+    return ChatOpenAI(
+        model=model_name, 
+        api_key=api_key,
+        base_url=base_url,
         temperature=0.1,
     )
-            
-    embed_llm = OpenAIEmbeddings(
-        api_key=os.getenv('EMBED_API_KEY'),
-        base_url=os.getenv('EMBED_API_BASE'),
+
+@st.cache_resource(show_spinner=False)
+def get_embed_llm(model_name, api_key, base_url):
+    """Process-wide embedding model client, shared across reruns and sessions."""
+    return OpenAIEmbeddings(
+        api_key=api_key,
+        base_url=base_url,
         dimensions=768,
-        model=os.getenv('EMBED_LLM_NAME'),
+        model=model_name,
     )
+
+@st.cache_resource(show_spinner=False)
+def get_workflow(llm_settings, embed_settings):
+    """Process-wide agentic workflow, rebuilt only when the model settings change."""
+    return AgenticWorkflow(get_llm(*llm_settings), get_embed_llm(*embed_settings))
+
+@st.cache_resource(show_spinner="Indexing STIG rules...")
+def get_retriever(embed_settings):
+    """Process-wide hybrid retriever over the STIG corpus; keyword-only if the vector store is unavailable."""
+    index = StigIndex()
+    index.update()
+    try:
+        from stig_vectors import StigVectorStore
+        vectors = StigVectorStore(get_embed_llm(*embed_settings), model=embed_settings[0])
+        if not vectors.collection.count():
+            vectors = None
+    except Exception as e:
+        print(f"Vector store unavailable, using keyword retrieval only: {e}")
+        vectors = None
+    return HybridRetriever(index, vectors)
+
+try:
+    llm = get_llm(*llm_config())
+            
+    embed_llm = get_embed_llm(*embed_config())
 except Exception as e:
     st.error(f"An error occurred during model initialization: {str(e)}")
     st.info("Please check your API key and try again.")
 
+def stream_response(messages, placeholder):
+    """Streams the completion into placeholder as tokens arrive.
+
+    Returns the full content, the time to first token and the total latency (in seconds).
+    """
+    start_time = time.perf_counter()
+    time_to_first_token = None
+    content = ""
+
+    placeholder.markdown("Thinking...")
+
+    for chunk in llm.stream(messages):
+        if not chunk.content:
+            continue
+        if time_to_first_token is None:
+            time_to_first_token = time.perf_counter() - start_time
+        content += chunk.content
+        placeholder.markdown(content + "▌")
+
+    placeholder.markdown(content)
+
+    return content, time_to_first_token, time.perf_counter() - start_time
+
+def latency_caption(message):
+    """Formats the latency recorded for an assistant turn."""
+    ttft = message.get("ttft")
+    return f"First token: {ttft:.2f}s · Total: {message['latency']:.2f}s" if ttft is not None else f"Total: {message['latency']:.2f}s"
+
+def summarize_turns(summary, messages):
+    """Folds messages leaving the chat context window into the running summary."""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    response = llm.invoke([HumanMessage(content=summary_template.format(summary=summary or "(none)", messages=transcript))])
+    return response.content
+
 with tab1:
     st.title("🤖 Simple Chat App")
     st.write("This app demonstrates integrating with InstructLab-tuned LLMs for various generative AI tasks.")
     
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    if "memory" not in st.session_state:
+        st.session_state.memory = ConversationMemory(summarize=summarize_turns)
+        st.session_state.messages = st.session_state.memory.messages
         
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
+            if "latency" in message:
+                st.caption(latency_caption(message))
+    
+    use_rag = st.toggle("Ground answers in STIG rules", value=False)
     
     if prompt := st.chat_input("Ask me a question!"):
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        # Summarizing old turns waits until the answer has streamed (see the assistant append below)
+        st.session_state.memory.append({"role": "user", "content": prompt}, fold=False)
         with st.chat_message("user"):
             st.markdown(prompt)
         
         with st.chat_message(name="assistant",avatar="images/redhat.png"):
-            with st.spinner("Thinking..."):
-                try:
-                    response = llm.invoke([HumanMessage(content=prompt)])
-                    response_content = response.content
-                    st.markdown(response_content)
-                    st.session_state.messages.append({"role": "assistant", "content": response_content})
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+            try:
+                grounding = None
+                if use_rag:
+                    snippets = get_retriever(embed_config()).retrieve(prompt)
+                    grounding = grounding_prompt(snippets, rag_template)
+                    with st.expander(f"Retrieved {len(snippets)} STIG rules"):
+                        st.text("\n\n".join(snippets))
+                response_content, ttft, latency = stream_response(st.session_state.memory.context_messages(grounding or ""), st.empty())
+                message = {"role": "assistant", "content": response_content, "ttft": ttft, "latency": latency}
+                st.caption(latency_caption(message))
+                st.session_state.memory.append(message)
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
 with tab2:
     st.title("🤖 Simple Agentic App")
     st.write("This section allows you to search for scholarships, grants, and other state and federal student aid.")
@@ -85,7 +175,7 @@ with tab2:
                 st.markdown(prompt)
                 
             try:
-                workflow = AgenticWorkflow(llm, embed_llm)
+                workflow = get_workflow(llm_config(), embed_config())
                 workflow.run(f"I live in {prompt}.", st)
             except Exception as e:
                 st.error(f"Error: {str(e)}")
@@ -0,0 +1,240 @@
+##############################################################################
+# Batched offline license extraction with vLLM
+##############################################################################
+# Generalizes test.py: the vision model is loaded once per run and license
+# images are streamed through LLM.generate in large batches, with the same
+# extraction prompt as the drivers_license_validation flow.
+#
+# Usage:
+#   python batch_extract.py notebooks/data2 --output extractions.jsonl
+#   python batch_extract.py manifest.jsonl --model ibm-granite/granite-vision-3.3-2b --batch-size 128
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count, islice
+from typing import Iterable, Iterator, Optional
+
+PROMPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "notebooks", "flows", "drivers_license_validation", "prompts", "data_from_image.yaml")
+
+DEFAULT_MODEL = "ibm-granite/granite-vision-3.3-2b"
+
+# Same user instruction as CustomLLMMultimodalBlock sends next to the image
+USER_PROMPT = "Extract the data from the image"
+
+# Prompt format of the granite vision models (see test.py)
+PROMPT_TEMPLATE = "<|system|>\n{system}\n<|user|>\n<image>\n{user}<|end_of_user|>\n<|assistant|>"
+
+IMAGE_EXTENSIONS = (".jpeg", ".jpg", ".png", ".webp")
+
+
+def load_system_prompt(path: str = PROMPT_PATH) -> str:
+    """Returns the system prompt of a flow prompt config."""
+    import yaml
+
+    with open(path) as f:
+        messages = yaml.safe_load(f)
+
+    return next(message["content"] for message in messages if message["role"] == "system").strip()
+
+
+def application_id_from_path(path: str) -> str:
+    """Same convention as utils.group_files_by_id: the file name up to the first dot."""
+    return os.path.basename(path).split('.')[0]
+
+
+def iter_inputs(source: str) -> Iterator[dict]:
+    """Yields {"application_id", "image_path"} records from a directory of images or a manifest.
+
+    A manifest is either a JSONL file of records with an image_path (and optionally an
+    application_id), or a text file with one image path per line.
+    """
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(source, name)
+                yield {"application_id": application_id_from_path(path), "image_path": path}
+        return
+
+    with open(source) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line) if line.startswith("{") else {"image_path": line}
+            record.setdefault("application_id", application_id_from_path(record["image_path"]))
+            yield record
+
+
+def load_image(path: str, max_edge: Optional[int] = None):
+    """Loads an image from a local path or URL as upright RGB, optionally downscaled."""
+    from io import BytesIO
+
+    import requests
+    from PIL import Image, ImageOps
+
+    if path.startswith(("http://", "https://")):
+        response = requests.get(path, timeout=60)
+        response.raise_for_status()
+        image = Image.open(BytesIO(response.content))
+    else:
+        image = Image.open(path)
+
+    image = ImageOps.exif_transpose(image).convert("RGB")
+
+    if max_edge:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    return image
+
+
+def batched(records: Iterable[dict], batch_size: int) -> Iterator[list]:
+    """Splits an iterable of records into lists of batch_size."""
+    records = iter(records)
+    while batch := list(islice(records, batch_size)):
+        yield batch
+
+
+class BatchExtractor:
+    """Runs the license extraction prompt over batches of images with a vLLM model loaded once.
+
+    Args:
+        model: Model name or path.
+        batch_size: Number of images per generate call.
+        max_tokens: Maximum number of generated tokens per image.
+        temperature: Sampling temperature.
+        max_edge: If set, images are downscaled to this longest edge before inference.
+        prompt_template: Prompt format with {system} and {user} placeholders.
+        loader_workers: Number of threads loading the next batch while the current one runs.
+        llm_kwargs: Extra arguments for vllm.LLM (e.g. dtype, max_model_len, tensor_parallel_size).
+    """
+
+    def __init__(self, model: str = DEFAULT_MODEL, batch_size: int = 64, max_tokens: int = 1024,
+                 temperature: float = 0.0, max_edge: Optional[int] = 1280,
+                 prompt_template: str = PROMPT_TEMPLATE, loader_workers: int = 8, **llm_kwargs):
+        from vllm import LLM, SamplingParams
+
+        self.model_name = model
+        self.batch_size = batch_size
+        self.max_edge = max_edge
+        self.loader_workers = loader_workers
+        self.prompt = prompt_template.format(system=load_system_prompt(), user=USER_PROMPT)
+        self.sampling_params = SamplingParams(temperature=temperature, max_tokens=max_tokens)
+        self.llm = LLM(model=model, **llm_kwargs)
+
+    def _load_batch(self, executor: ThreadPoolExecutor, batch: list) -> list:
+        """Loads the images of a batch; records whose image fails to load carry the error instead."""
+        def load(record):
+            try:
+                return load_image(record["image_path"], self.max_edge), None
+            except Exception as e:
+                return None, str(e)
+
+        return list(executor.map(load, batch))
+
+    def run(self, records: Iterable[dict]) -> Iterator[tuple]:
+        """Yields (results, stats) per batch.
+
+        Each result is the input record with the model name, extracted_data (the generated text),
+        finish_reason and token counts, or an error (with extracted_data None). The images of the next batch are loaded
+        while the current batch is generating.
+        """
+        with ThreadPoolExecutor(max_workers=self.loader_workers) as loaders, \
+                ThreadPoolExecutor(max_workers=1) as prefetch:
+
+            def load_next(batches):
+                """Starts loading the next batch; returns (batch, future) or (None, None) when done."""
+                batch = next(batches, None)
+                return batch, (prefetch.submit(self._load_batch, loaders, batch) if batch else None)
+
+            batches = batched(records, self.batch_size)
+            batch, loading = load_next(batches)
+
+            for index in count():
+                if batch is None:
+                    return
+
+                images = loading.result()
+                next_batch, loading = load_next(batches)
+
+                start_time = time.perf_counter()
+
+                ok = [i for i, (image, _) in enumerate(images) if image is not None]
+                outputs = self.llm.generate(
+                    [{"prompt": self.prompt, "multi_modal_data": {"image": images[i][0]}} for i in ok],
+                    sampling_params=self.sampling_params,
+                    use_tqdm=False,
+                ) if ok else []
+
+                seconds = time.perf_counter() - start_time
+
+                results = [{**record, "model_name": self.model_name, "extracted_data": None, "error": error}
+                           for record, (_, error) in zip(batch, images)]
+                for i, output in zip(ok, outputs):
+                    completion = output.outputs[0]
+                    results[i].update({"extracted_data": completion.text, "finish_reason": completion.finish_reason,
+                                       "prompt_tokens": len(output.prompt_token_ids),
+                                       "completion_tokens": len(completion.token_ids)})
+
+                completion_tokens = sum(result.get("completion_tokens", 0) for result in results)
+                stats = {"batch": index, "size": len(batch), "failed": len(batch) - len(ok),
+                         "seconds": round(seconds, 3),
+                         "images_per_second": round(len(ok) / seconds, 2) if ok and seconds else None,
+                         "output_tokens_per_second": round(completion_tokens / seconds, 1) if ok and seconds else None}
+
+                yield results, stats
+
+                batch = next_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract driver's license data from images with a local vLLM model.")
+    parser.add_argument("source", help="Directory of images, or a JSONL/text manifest of image paths")
+    parser.add_argument("--output", default="extractions.jsonl")
+    parser.add_argument("--stats", default=None, help="JSONL file for per-batch throughput stats")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-tokens", type=int, default=1024)
+    parser.add_argument("--temperature", type=float, default=0.0)
+    parser.add_argument("--max-edge", type=int, default=1280, help="Downscale images to this longest edge (0 to disable)")
+    parser.add_argument("--max-model-len", type=int, default=None)
+    parser.add_argument("--tensor-parallel-size", type=int, default=1)
+    args = parser.parse_args()
+
+    llm_kwargs = {"tensor_parallel_size": args.tensor_parallel_size}
+    if args.max_model_len:
+        llm_kwargs["max_model_len"] = args.max_model_len
+
+    extractor = BatchExtractor(args.model, batch_size=args.batch_size, max_tokens=args.max_tokens,
+                               temperature=args.temperature, max_edge=args.max_edge or None, **llm_kwargs)
+
+    start_time, total, failed = time.perf_counter(), 0, 0
+    stats_file = open(args.stats, "a") if args.stats else None
+
+    try:
+        with open(args.output, "a") as output:
+            for results, stats in extractor.run(iter_inputs(args.source)):
+                for result in results:
+                    output.write(json.dumps(result) + "\n")
+                output.flush()
+
+                if stats_file:
+                    stats_file.write(json.dumps(stats) + "\n")
+                    stats_file.flush()
+
+                total += stats["size"]
+                failed += stats["failed"]
+                print(f"batch {stats['batch']}: {stats['size']} images ({stats['failed']} failed to load) "
+                      f"in {stats['seconds']:.2f}s "
+                      f"({stats['images_per_second']} img/s, {stats['output_tokens_per_second']} tok/s)")
+    finally:
+        if stats_file:
+            stats_file.close()
+
+    print(f"Extracted {total - failed}/{total} images in {time.perf_counter() - start_time:.2f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+from typing import Callable, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for context budgeting."""
+    return len(text) // 4 + 1
+
+
+class ConversationMemory:
+    """Bounded chat history with a token-budgeted context window and a rolling summary.
+
+    The most recent turns that fit in ``max_context_tokens`` are sent to the model verbatim;
+    turns that fall out of that window are folded into ``summary`` by ``summarize``.
+    Only the last ``max_history_messages`` messages are retained for display, so the
+    per-session footprint stays bounded no matter how long the conversation runs.
+
+    Args:
+        summarize: Called as ``summarize(summary, messages)`` with the current summary and the
+            messages leaving the context window; returns the updated summary.
+        max_context_tokens: Token budget for the recent turns sent to the model.
+        max_summary_tokens: The summary is truncated to roughly this many tokens.
+        max_history_messages: Number of messages kept for display.
+    """
+
+    def __init__(self,
+                 summarize: Optional[Callable[[str, list], str]] = None,
+                 max_context_tokens: int = 2000,
+                 max_summary_tokens: int = 400,
+                 max_history_messages: int = 50):
+        self.summarize = summarize
+        self.max_context_tokens = max_context_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.max_history_messages = max_history_messages
+        self.summary = ""
+        self.messages = []
+        self._window_start = 0
+
+    def append(self, message: dict, fold: bool = True):
+        """Adds a {"role": ..., "content": ...} message (extra keys are kept for display only).
+
+        With ``fold=False`` the window is not trimmed (and ``summarize`` is not called) until the
+        next append, e.g. to add the user's message without delaying the answer to it.
+        """
+        self.messages.append(message)
+
+        if not fold:
+            return
+
+        # Once the window exceeds the budget, fold the oldest turns out of it until it is back
+        # to half the budget (so the summary is updated every few turns rather than every turn),
+        # always keeping the latest message
+        window_tokens = sum(estimate_tokens(m["content"]) for m in self.messages[self._window_start:])
+        target_tokens = self.max_context_tokens // 2 if window_tokens > self.max_context_tokens else window_tokens
+        fold_end = self._window_start
+        while fold_end < len(self.messages) - 1 and window_tokens > target_tokens:
+            window_tokens -= estimate_tokens(self.messages[fold_end]["content"])
+            fold_end += 1
+
+        # Messages dropped from the history must be summarized first
+        drop = max(0, len(self.messages) - self.max_history_messages)
+        fold_end = max(fold_end, drop)
+
+        self._fold(fold_end)
+
+        if drop:
+            del self.messages[:drop]
+            self._window_start -= drop
+
+    def _fold(self, fold_end: int):
+        """Folds messages[window_start:fold_end] into the summary."""
+        if fold_end <= self._window_start:
+            return
+
+        folded = self.messages[self._window_start:fold_end]
+
+        if self.summarize is not None:
+            # If summarize raises, the messages stay in the window and are folded on a later append
+            summary = self.summarize(self.summary, [{"role": m["role"], "content": m["content"]} for m in folded])
+            self.summary = summary[:self.max_summary_tokens * 4]
+
+        self._window_start = fold_end
+
+    def context_messages(self, system_prompt: str = "") -> list:
+        """Returns the messages to send to the model: the summary (if any) and the recent turns."""
+        system = system_prompt
+        if self.summary:
+            system = f"{system}\n\nSummary of the earlier conversation:\n{self.summary}".strip()
+
+        context = [{"role": "system", "content": system}] if system else []
+
+        context.extend({"role": m["role"], "content": m["content"]} for m in self.messages[self._window_start:])
+
+        return context
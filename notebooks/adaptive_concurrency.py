@@ -0,0 +1,194 @@
+##############################################################################
+# Adaptive (AIMD) concurrency limiting for LLM endpoints
+##############################################################################
+try:
+    from sdg_hub.core.utils.logger_config import setup_logger
+except ImportError:
+    from logging import getLogger as setup_logger
+from typing import Optional
+import asyncio
+import random
+import time
+logger = setup_logger(__name__)
+
+# Exception names (LiteLLM / OpenAI) that signal a transient failure worth retrying
+RETRYABLE_ERRORS = {"Timeout", "APITimeoutError", "APIConnectionError", "RateLimitError",
+                    "ServiceUnavailableError", "InternalServerError", "BadGatewayError"}
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """Returns the HTTP status code carried by a completion error, if any."""
+    status = getattr(error, "status_code", None)
+
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+
+    return status if isinstance(status, int) else None
+
+
+def is_overload(error: Exception) -> bool:
+    """Returns whether an error means the endpoint is saturated (429 or 5xx)."""
+    status = error_status(error)
+
+    return status is not None and (status == 429 or status >= 500)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Returns whether a completion error is transient (overload, timeout or connection error)."""
+    return is_overload(error) or type(error).__name__ in RETRYABLE_ERRORS
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full-jitter exponential backoff: uniform over [0, min(max_delay, base_delay * 2**attempt)]."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limits in-flight requests with additive-increase/multiplicative-decrease (AIMD).
+
+    The limit grows by one for every ``limit`` successful requests completed while it was
+    fully used, and is multiplied by ``backoff`` when the endpoint answers 429/5xx or when
+    the recent latency exceeds ``latency_tolerance`` times the long-run latency. Decreases
+    are spaced by the recent latency so that a single burst only halves the limit once.
+
+    Numeric state persists across event loops; the asyncio condition is recreated per loop,
+    so one limiter can serve successive ``asyncio.run`` calls.
+
+    Attributes
+    ----------
+    limit : int
+        Current number of requests allowed in flight.
+    min_limit, max_limit : int
+        Bounds of the limit.
+    in_flight : int
+        Requests currently holding a slot.
+    waiting : int
+        Requests queued for a slot.
+    """
+
+    def __init__(self, max_limit: int, initial_limit: Optional[int] = None, min_limit: int = 1,
+                 backoff: float = 0.5, latency_tolerance: float = 2.0):
+        if max_limit < 1:
+            raise ValueError(f"max_limit must be greater than 0, got {max_limit}")
+
+        self.min_limit = max(1, min(min_limit, max_limit))
+        self.max_limit = max_limit
+        self.limit = max(self.min_limit, min(initial_limit or max_limit, max_limit))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+
+        self.in_flight = 0
+        self.waiting = 0
+
+        self.successes = 0
+        self.overloads = 0
+        self.decreases = 0
+
+        # Short- and long-run exponentially weighted latencies
+        self._recent_latency: Optional[float] = None
+        self._baseline_latency: Optional[float] = None
+
+        self._increase_credit = 0.0
+        self._last_decrease = 0.0
+
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def set_max_limit(self, max_limit: int):
+        """Updates the ceiling, e.g. when the flow's max_concurrency changes between batches."""
+        self.max_limit = max(1, max_limit)
+        self.min_limit = min(self.min_limit, self.max_limit)
+        self.limit = min(self.limit, self.max_limit)
+
+    def _get_condition(self) -> asyncio.Condition:
+        """Returns the condition for the running event loop."""
+        loop = asyncio.get_running_loop()
+
+        if self._loop is not loop:
+            self._condition, self._loop = asyncio.Condition(), loop
+            self.in_flight = self.waiting = 0
+
+        return self._condition
+
+    async def acquire(self):
+        """Waits for a free slot."""
+        condition = self._get_condition()
+
+        async with condition:
+            self.waiting += 1
+            try:
+                await condition.wait_for(lambda: self.in_flight < self.limit)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+
+    async def release(self):
+        """Frees a slot and wakes the waiting requests."""
+        condition = self._get_condition()
+
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+    def _decrease(self, reason: str):
+        """Multiplicative decrease, at most once per recent latency."""
+        now = time.monotonic()
+
+        if now - self._last_decrease < (self._recent_latency or 0.0):
+            return
+
+        previous = self.limit
+        self.limit = max(self.min_limit, int(self.limit * self.backoff))
+        self._last_decrease = now
+        self._increase_credit = 0.0
+        self.decreases += 1
+
+        if self.limit != previous:
+            logger.info("Concurrency limit %d -> %d (%s)", previous, self.limit, reason)
+
+    def on_success(self, latency: float):
+        """Records a successful request and its latency."""
+        self.successes += 1
+
+        if self._recent_latency is None:
+            self._recent_latency = self._baseline_latency = latency
+        else:
+            self._recent_latency += 0.2 * (latency - self._recent_latency)
+            self._baseline_latency += 0.02 * (latency - self._baseline_latency)
+
+        if self._recent_latency > self.latency_tolerance * self._baseline_latency:
+            self._decrease("latency")
+            return
+
+        # Only grow while the current limit is actually the bottleneck
+        if self.in_flight + self.waiting >= self.limit and self.limit < self.max_limit:
+            self._increase_credit += 1 / self.limit
+            if self._increase_credit >= 1:
+                self._increase_credit -= 1
+                self.limit += 1
+
+    def on_overload(self):
+        """Records a 429/5xx response."""
+        self.overloads += 1
+        self._decrease("overload")
+
+    def stats(self) -> dict:
+        """Current limit, in-flight and queued requests, and counters."""
+        return {
+            "limit": self.limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "successes": self.successes,
+            "overloads": self.overloads,
+            "decreases": self.decreases,
+            "recent_latency_s": round(self._recent_latency, 3) if self._recent_latency is not None else None,
+            "baseline_latency_s": round(self._baseline_latency, 3) if self._baseline_latency is not None else None,
+        }
@@ -0,0 +1,193 @@
+##############################################################################
+# Benchmark: two-stage vs single-pass drivers_license_validation flows
+##############################################################################
+# Runs three arms over the same local applications with the same model and
+# compares wall time, model round-trips, tokens, cost and verdict accuracy:
+#   two_stage        extraction, then the evaluation LLM on every application
+#   two_stage_rules  the shipped two-stage flow: deterministic rules decide the
+#                    fields they can, and only applications with a NEEDS_REVIEW
+#                    field reach the evaluation LLM
+#   single_pass      one extract-and-evaluate call per application
+# The response cache is disabled so that every run reaches the model.
+#
+# Usage (from the notebooks directory):
+#   python -m benchmarks.flow_mode_benchmark --data-dir data2 --model-prefix LLAMASCOUT4
+#   python -m benchmarks.flow_mode_benchmark --labels labels.jsonl
+#
+# Labels are JSONL records of {"application_id": ..., <field>: VALID|INVALID|NEEDS_REVIEW}.
+# Without labels, accuracy is reported as the agreement between the two flows.
+import argparse
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+import utils
+from field_validation import EVALUATED_FIELDS
+
+# Arm name: (flow path, whether the rule-based short-circuit of the evaluation LLM is kept)
+FLOWS = {
+    "two_stage": ("flows/drivers_license_validation/flow.yaml", False),
+    "two_stage_rules": ("flows/drivers_license_validation/flow.yaml", True),
+    "single_pass": ("flows/drivers_license_validation_single_pass/flow.yaml", True),
+}
+
+
+class UsageRecorder:
+    """litellm success/failure callback that tallies calls, latency, tokens and cost."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.calls, self.failures = 0, 0
+        self.latencies = []
+        self.prompt_tokens, self.completion_tokens, self.cost = 0, 0, 0.0
+
+    def on_success(self, kwargs, response, start_time, end_time):
+        usage = getattr(response, "usage", None)
+
+        with self._lock:
+            self.calls += 1
+            self.latencies.append((end_time - start_time).total_seconds())
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+            self.cost += kwargs.get("response_cost") or 0.0
+
+    def on_failure(self, kwargs, response, start_time, end_time):
+        with self._lock:
+            self.failures += 1
+
+
+def load_labels(path: str) -> pd.DataFrame:
+    """Loads verdict labels as a frame indexed by application_id."""
+    with open(path) as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()]).set_index("application_id")
+
+
+def run_flow(flow_path: str, df: pd.DataFrame, model_prefix: str, max_concurrency: int,
+             recorder: UsageRecorder, rule_short_circuit: bool = True) -> tuple:
+    """Runs a flow with the response cache disabled; returns (report frame, seconds).
+
+    Without rule_short_circuit, every application goes to the evaluation LLM.
+    """
+    from datasets import Dataset
+    from sdg_hub.core.flow import Flow
+
+    import flow_extensions  # noqa: F401 (registers the custom blocks)
+
+    flow = Flow.from_yaml(flow_path)
+
+    for block in flow.blocks:
+        if hasattr(block, "response_cache_path"):
+            block.response_cache_path = None
+
+        if not rule_short_circuit and getattr(block, "llm_required_col", None):
+            block.llm_required_col = None
+
+    flow.set_model_config(
+        model=os.getenv(f"{model_prefix}_LLM_NAME"),
+        api_base=os.getenv(f"{model_prefix}_LLM_BASE"),
+        api_key=os.getenv(f"{model_prefix}_LLM_KEY"),
+        temperature=0,
+        max_tokens=8192,
+        response_format={"type": "json_object"},
+        top_k=1,
+    )
+
+    recorder.reset()
+
+    start_time = time.perf_counter()
+
+    output = flow.generate(Dataset.from_pandas(df), max_concurrency=max_concurrency).to_pandas()
+
+    return utils.data_report_prep(output), time.perf_counter() - start_time
+
+
+def accuracy(report: pd.DataFrame, reference: pd.DataFrame) -> float:
+    """Share of (application, field) verdicts equal to the reference verdicts."""
+    verdicts = report.set_index("application_id")[[f"eval_{field}" for field in EVALUATED_FIELDS if f"eval_{field}" in report]]
+    verdicts.columns = [column[len("eval_"):] for column in verdicts.columns]
+
+    common = verdicts.index.intersection(reference.index)
+    fields = [field for field in verdicts.columns if field in reference.columns]
+
+    if not len(common) or not fields:
+        return float("nan")
+
+    left = verdicts.loc[common, fields].astype(str).to_numpy()
+    right = reference.loc[common, fields].astype(str).to_numpy()
+
+    return float((left == right).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the two-stage (with and without rules) and single-pass license validation flows.")
+
+    parser.add_argument("--data-dir", default="data2")
+
+    parser.add_argument("--model-prefix", default="LLAMASCOUT4", help="Prefix of the <PREFIX>_LLM_* environment variables.")
+
+    parser.add_argument("--max-concurrency", type=int, default=10)
+
+    parser.add_argument("--labels", default=None, help="JSONL file of expected verdicts per application.")
+
+    args = parser.parse_args()
+
+    import litellm
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    recorder = UsageRecorder()
+
+    litellm.success_callback.append(recorder.on_success)
+
+    litellm.failure_callback.append(recorder.on_failure)
+
+    df = utils.load_local_applications(args.data_dir)
+
+    df["model_name"] = os.getenv(f"{args.model_prefix}_LLM_NAME")
+
+    labels = load_labels(args.labels) if args.labels else None
+
+    reports, rows = {}, []
+
+    for mode, (flow_path, rule_short_circuit) in FLOWS.items():
+
+        report, seconds = run_flow(flow_path, df, args.model_prefix, args.max_concurrency, recorder,
+                                   rule_short_circuit)
+
+        reports[mode] = report
+
+        latencies = pd.Series(recorder.latencies, dtype=float)
+
+        rows.append({"mode": mode,
+                     "applications": len(df),
+                     "seconds": round(seconds, 2),
+                     "seconds_per_application": round(seconds / max(len(df), 1), 2),
+                     "model_calls": recorder.calls,
+                     "failed_calls": recorder.failures,
+                     "call_p50_s": round(latencies.quantile(0.5), 2) if len(latencies) else None,
+                     "call_p95_s": round(latencies.quantile(0.95), 2) if len(latencies) else None,
+                     "prompt_tokens": recorder.prompt_tokens,
+                     "completion_tokens": recorder.completion_tokens,
+                     "cost_usd": round(recorder.cost, 4),
+                     "accuracy": round(accuracy(report, labels), 3) if labels is not None else None})
+
+    summary = pd.DataFrame(rows).set_index("mode")
+
+    if labels is None:
+        two_stage = reports["two_stage"].set_index("application_id")
+        two_stage = two_stage[[f"eval_{field}" for field in EVALUATED_FIELDS if f"eval_{field}" in two_stage]]
+        two_stage.columns = [column[len("eval_"):] for column in two_stage.columns]
+
+        summary["agreement_with_two_stage"] = [accuracy(reports[mode], two_stage) for mode in summary.index]
+
+    print(summary.T.to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+##############################################################################
+# Benchmark: utils.data_report_prep
+##############################################################################
+# Compares the original json.loads/json_normalize implementation of
+# data_report_prep with the current one on synthetic evaluation frames.
+#
+# Usage (from the notebooks directory):
+#   python benchmarks/report_prep_benchmark.py --rows 10000 100000 1000000
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+from field_validation import EVALUATED_FIELDS
+
+MODELS = ["LLAMASCOUT4", "GEMMA27B", "GEMMA12B"]
+
+def legacy_data_report_prep(data: pd.DataFrame):
+    """The original implementation of utils.data_report_prep, kept here as the baseline."""
+    transformed_df = data.copy()
+
+    def jsonize(obj): 
+        try:
+            return json.loads(obj)
+        except Exception as e:
+            return {}
+
+    transformed_df["extracted_data_dict"]= transformed_df["extracted_data"].apply(jsonize)
+
+    transformed_df["eval_data_dict"]= transformed_df["eval_data"].apply(jsonize)
+
+    extracted_df = pd.json_normalize(transformed_df["extracted_data_dict"]).add_prefix("extracted_")
+
+    eval_df = pd.json_normalize(transformed_df["eval_data_dict"]).add_prefix("eval_")
+
+    transformed_df = transformed_df.drop(columns=["extracted_data", "eval_data", "extracted_data_dict", "eval_data_dict"])
+
+    return transformed_df.join(extracted_df).join(eval_df)
+
+def make_frame(rows: int, seed=42) -> pd.DataFrame:
+    """Builds a synthetic flow output with rows evaluated applications."""
+    rng = random.Random(seed)
+
+    extracted = [json.dumps({"name": f"Person {i}", "date_of_birth": "1981-02-02", "expiration_date": "2026-02-02",
+                             "issuance_date": "2021-02-02", "state_issued": "Colorado", "dl_number": f"96-{i:09d}",
+                             "photo_orientation": "straight"})
+                 for i in range(rows)]
+
+    evaluated = [json.dumps({field: rng.choice(utils.VERDICTS) for field in EVALUATED_FIELDS}) for _ in range(rows)]
+
+    return pd.DataFrame({"application_id": [f"DENVER-{i:010d}" for i in range(rows)],
+                         "image_path": [f"https://example.com/{i}.jpeg" for i in range(rows)],
+                         "model_name": [MODELS[i % len(MODELS)] for i in range(rows)],
+                         "extracted_data": extracted,
+                         "eval_data": evaluated})
+
+def measure(fn, data: pd.DataFrame):
+    """Returns (seconds, peak traced MiB, result memory MiB) for fn(data).
+
+    Time and memory are measured in separate runs, since tracing allocations slows execution down.
+    """
+    start_time = time.perf_counter()
+
+    fn(data)
+
+    elapsed = time.perf_counter() - start_time
+
+    tracemalloc.start()
+
+    result = fn(data)
+
+    _, peak = tracemalloc.get_traced_memory()
+
+    tracemalloc.stop()
+
+    return elapsed, peak / 2**20, result.memory_usage(deep=True).sum() / 2**20
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the original and current data_report_prep on synthetic evaluation frames.")
+
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+
+    parser.add_argument("--skip-legacy", action="store_true", help="Only benchmark the current implementation.")
+
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'impl':>8} {'time (s)':>10} {'peak (MiB)':>12} {'result (MiB)':>13}")
+
+    for rows in args.rows:
+
+        data = make_frame(rows)
+
+        impls = [("current", utils.data_report_prep)]
+
+        if not args.skip_legacy:
+
+            impls.insert(0, ("legacy", legacy_data_report_prep))
+
+        for name, fn in impls:
+
+            elapsed, peak, size = measure(fn, data)
+
+            print(f"{rows:>10} {name:>8} {elapsed:>10.2f} {peak:>12.1f} {size:>13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+##############################################################################
+# Block-level checkpointing and resumable flow runs
+##############################################################################
+# Every record a block completes is appended to a SQLite store keyed by run,
+# block name and application_id. When a run is restarted, each application
+# resumes after the last block it completed, so only the unfinished slice is
+# processed (and billed) again. Streaming LLM blocks checkpoint each record
+# as soon as its response arrives; records whose request failed are not
+# checkpointed and are retried on the next run.
+#
+# Usage (from the notebooks directory):
+#   python checkpointing.py flows/drivers_license_validation/flow.yaml --data-dir data2 --run-id data2-LLAMASCOUT4
+try:
+    from sdg_hub.core.utils.logger_config import setup_logger
+except ImportError:
+    from logging import getLogger as setup_logger
+from typing import Any, Optional
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+logger = setup_logger(__name__)
+
+KEY_COL = "application_id"
+
+
+def _to_json(value: Any) -> Any:
+    """json.dumps fallback for the numpy and pandas values found in flow outputs."""
+    if isinstance(value, np.generic):
+        return value.item()
+
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+
+    return str(value)
+
+
+def is_failed(row: dict, output_cols: list) -> bool:
+    """Returns whether a block's output for a row is an error placeholder (see CustomLLMChatBlock)."""
+    for col in output_cols:
+        value = row.get(col)
+        if isinstance(value, list) and value and isinstance(value[0], dict) and value[0].get("error"):
+            return True
+
+    return False
+
+
+class CheckpointStore:
+    """Append-only store of the records completed by each block of a flow run, backed by SQLite.
+
+    Records are only ever inserted; the latest record of a (run_id, block_name, application_id)
+    key wins on load.
+
+    Attributes
+    ----------
+    path : str
+        Location of the SQLite database.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT NOT NULL, block_name TEXT NOT NULL, "
+            "application_id TEXT NOT NULL, record TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS checkpoints_key ON checkpoints (run_id, block_name, application_id)"
+        )
+        self._conn.commit()
+
+    def append(self, run_id: str, block_name: str, records: list) -> None:
+        """Appends the records (dicts with an application_id) completed by a block."""
+        if not records:
+            return
+
+        now = time.time()
+        rows = [(run_id, block_name, str(record[KEY_COL]), json.dumps(record, default=_to_json), now)
+                for record in records]
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO checkpoints (run_id, block_name, application_id, record, created) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def completed(self, run_id: str) -> dict:
+        """Returns the application_ids completed by each block of a run."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT block_name, application_id FROM checkpoints WHERE run_id = ?", (run_id,)
+            ).fetchall()
+
+        completed = {}
+        for block_name, application_id in rows:
+            completed.setdefault(block_name, set()).add(application_id)
+
+        return completed
+
+    def load(self, run_id: str, block_name: str, application_ids: list) -> list:
+        """Returns the latest record of each application_id for a block of a run."""
+        wanted = set(map(str, application_ids))
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT application_id, record FROM checkpoints WHERE run_id = ? AND block_name = ? ORDER BY id",
+                (run_id, block_name),
+            ).fetchall()
+
+        latest = {application_id: record for application_id, record in rows if application_id in wanted}
+
+        return [json.loads(record) for record in latest.values()]
+
+    def stats(self, run_id: str) -> dict:
+        """Returns the number of completed applications per block of a run."""
+        return {block_name: len(ids) for block_name, ids in self.completed(run_id).items()}
+
+
+def _resume_points(blocks: list, completed: dict, application_ids: list) -> dict:
+    """Returns, for each application, the index of the last block it completed (-1 for none)."""
+    resume = {}
+
+    for application_id in application_ids:
+        resume[application_id] = -1
+        for i, block in enumerate(blocks):
+            if application_id not in completed.get(block.block_name, ()):
+                break
+            resume[application_id] = i
+
+    return resume
+
+
+async def _run_block(block, frame: pd.DataFrame, store: CheckpointStore, run_id: str, kwargs: dict) -> pd.DataFrame:
+    """Runs a block over the frame, appending each completed record to the store.
+
+    Blocks with ``astream`` checkpoint each record as its response arrives, so an interrupted
+    block loses only the requests in flight. Other blocks run in a worker thread, outside the
+    event loop. Records whose request failed are neither checkpointed nor returned, so the
+    following blocks skip them; they are retried on resume.
+    """
+    output_cols = list(block.output_cols or [])
+
+    if not hasattr(block, "astream"):
+        output = await asyncio.to_thread(block, frame, **kwargs)
+        succeeded = [not is_failed(record, output_cols) for record in output.to_dict(orient="records")]
+        store.append(run_id, block.block_name, output[succeeded].to_dict(orient="records"))
+        failed = len(output) - sum(succeeded)
+        output = output[succeeded].reset_index(drop=True)
+
+    else:
+        rows, failed = [], 0
+        async for _, row in block.astream(frame, **kwargs):
+            if is_failed(row.iloc[0].to_dict(), output_cols):
+                failed += 1
+                continue
+            store.append(run_id, block.block_name, row.to_dict(orient="records"))
+            rows.append(row)
+
+        output = pd.concat(rows).sort_index().reset_index(drop=True) if rows else frame.iloc[0:0]
+
+    if failed:
+        logger.warning("%d records failed in block %s and are left for the next run", failed, block.block_name)
+
+    return output
+
+
+async def arun_with_checkpoints(flow, dataset: Any, store: CheckpointStore, run_id: str,
+                                max_concurrency: Optional[int] = None) -> pd.DataFrame:
+    """Runs a flow block by block, resuming every application after the last block it completed.
+
+    Args:
+        flow: sdg_hub Flow with its model configured.
+        dataset: pd.DataFrame or datasets.Dataset with the flow's input columns and a unique application_id.
+        store (CheckpointStore): Where completed records are appended.
+        run_id (str): Identifies the run in the store; reuse it to resume, change it to start over.
+        max_concurrency (int): Maximum concurrency passed to the blocks, as in Flow.generate.
+
+    Returns the flow output of the applications that completed, in the order of the dataset.
+    """
+    df = dataset.to_pandas() if hasattr(dataset, "to_pandas") else dataset
+
+    if df[KEY_COL].duplicated().any():
+        raise ValueError(f"{KEY_COL} must be unique to checkpoint a run")
+
+    kwargs = {"_flow_max_concurrency": max_concurrency} if max_concurrency is not None else {}
+
+    blocks = flow.blocks
+
+    order = df[KEY_COL].astype(str).tolist()
+
+    resume = _resume_points(blocks, store.completed(run_id), order)
+
+    logger.info(
+        "Resuming run %s: %d/%d applications already complete, %d not started",
+        run_id,
+        sum(point == len(blocks) - 1 for point in resume.values()),
+        len(order),
+        sum(point == -1 for point in resume.values()),
+    )
+
+    active = df[[resume[application_id] == -1 for application_id in order]].reset_index(drop=True)
+
+    for i, block in enumerate(blocks):
+
+        # Applications that last completed the previous block join here, from their checkpoint
+        joining = [application_id for application_id in order if resume[application_id] == i - 1 and i > 0]
+
+        if joining:
+            restored = pd.DataFrame(store.load(run_id, blocks[i - 1].block_name, joining))
+            active = pd.concat([active, restored], ignore_index=True) if len(active) else restored
+
+        if not len(active):
+            continue
+
+        start_time = time.perf_counter()
+
+        active = await _run_block(block, active, store, run_id, kwargs)
+
+        logger.info("Block %s processed %d rows in %.2fs", block.block_name, len(active), time.perf_counter() - start_time)
+
+    finished = [application_id for application_id in order if resume[application_id] == len(blocks) - 1]
+
+    if finished:
+        restored = pd.DataFrame(store.load(run_id, blocks[-1].block_name, finished))
+        active = pd.concat([active, restored], ignore_index=True) if len(active) else restored
+
+    active[KEY_COL] = active[KEY_COL].astype(str)
+
+    # Failed records and rows dropped by blocks (e.g. the parsers) resume on the next run
+    if len(active) < len(order):
+        logger.warning("%d/%d applications did not complete in run %s", len(order) - len(active), len(order), run_id)
+
+    rank = {application_id: i for i, application_id in enumerate(order)}
+
+    return active.sort_values(KEY_COL, key=lambda ids: ids.map(rank)).reset_index(drop=True)
+
+
+def run_with_checkpoints(flow, dataset: Any, store: CheckpointStore, run_id: str,
+                         max_concurrency: Optional[int] = None) -> pd.DataFrame:
+    """Runs arun_with_checkpoints to completion (see there for the arguments).
+
+    Inside a running event loop (e.g. a Jupyter notebook), await arun_with_checkpoints instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(arun_with_checkpoints(flow, dataset, store, run_id, max_concurrency))
+
+    raise RuntimeError("run_with_checkpoints cannot be called from a running event loop; "
+                       "use `await arun_with_checkpoints(...)` instead")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a flow with block-level checkpoints, resuming a previous run.")
+
+    parser.add_argument("flow_path")
+
+    parser.add_argument("--data-dir", default="data2")
+
+    parser.add_argument("--model-prefix", default="LLAMASCOUT4", help="Prefix of the <PREFIX>_LLM_* environment variables.")
+
+    parser.add_argument("--max-concurrency", type=int, default=10)
+
+    parser.add_argument("--checkpoint-db", default="cache/checkpoints.sqlite")
+
+    parser.add_argument("--run-id", default=None, help="Defaults to <data dir>-<model prefix>.")
+
+    parser.add_argument("--output", default="results.jsonl")
+
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    from utils import load_local_applications
+    from model_sweep import build_flow
+
+    load_dotenv()
+
+    df = load_local_applications(args.data_dir)
+
+    df["model_name"] = os.getenv(f"{args.model_prefix}_LLM_NAME")
+
+    run_id = args.run_id or f"{os.path.basename(os.path.normpath(args.data_dir))}-{args.model_prefix}"
+
+    store = CheckpointStore(args.checkpoint_db)
+
+    output = run_with_checkpoints(build_flow(args.model_prefix, args.flow_path), df, store, run_id,
+                                  args.max_concurrency)
+
+    output.to_json(args.output, orient="records", lines=True, default_handler=str)
+
+    print(f"Run {run_id}: {len(output)} applications -> {args.output}; completed per block: {store.stats(run_id)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+##############################################################################
+# Deterministic validation of extracted license fields
+##############################################################################
+# Applies the mechanical checks of prompts/eval_from_image.yaml (exact and
+# fuzzy name match, date equality, expiry, state, license number) to a whole
+# batch at once. Fields the rules cannot decide are marked NEEDS_REVIEW, and
+# only rows with such a field need the evaluation LLM.
+from datetime import date
+from difflib import SequenceMatcher
+from typing import Optional
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+VALID, INVALID, NEEDS_REVIEW = "VALID", "INVALID", "NEEDS_REVIEW"
+
+# Verdicts the evaluation assigns to each application field
+VERDICTS = [VALID, INVALID, NEEDS_REVIEW]
+
+EVALUATED_FIELDS = ["name", "date_of_birth", "expiration_date", "state_issued", "dl_number"]
+
+# State every license must be issued by
+REQUIRED_STATE = "COLORADO"
+
+STATE_ABBREVIATIONS = {"CO": "COLORADO", "COL": "COLORADO", "COLO": "COLORADO"}
+
+# Name similarity at or above which a mismatch is ambiguous rather than INVALID
+NAME_REVIEW_RATIO = 0.8
+
+# Extracted values that mean the model could not read the field
+MISSING_VALUE = re.compile(r"^\s*$|\b(?:not (?:found|visible|available|present)|cannot|can't|unable|n/a|unknown)\b",
+                           re.IGNORECASE)
+
+NON_ALPHANUMERIC = re.compile(r"[^0-9A-Z]+")
+
+NON_NAME = re.compile(r"[^A-Z ]+")
+
+
+def parse_extracted(values) -> list:
+    """Parses extracted_data JSON strings into dicts ({} when not valid JSON)."""
+    parsed = []
+
+    for value in values:
+        if isinstance(value, dict):
+            parsed.append(value)
+            continue
+        try:
+            value = json.loads(value)
+        except (TypeError, ValueError):
+            value = {}
+        parsed.append(value if isinstance(value, dict) else {})
+
+    return parsed
+
+
+def normalize_text(values: pd.Series) -> pd.Series:
+    """Uppercases and strips values, mapping unreadable or missing values to None."""
+    text = values.astype("string").str.strip()
+
+    return text.mask(text.isna() | text.str.contains(MISSING_VALUE, na=True)).str.upper()
+
+
+def normalize_name(name) -> Optional[str]:
+    """Normalizes a person's name: uppercase, "LAST, FIRST" reordered, punctuation and extra spaces removed."""
+    if name is None or name is pd.NA:
+        return None
+
+    last, comma, first = str(name).upper().partition(",")
+    name = f"{first} {last}" if comma else last
+
+    name = " ".join(NON_NAME.sub(" ", name).split())
+
+    return name or None
+
+
+def name_verdict(submitted: Optional[str], extracted: Optional[str]) -> str:
+    """Compares two normalized names, ignoring word order and tolerating a missing middle name."""
+    if not submitted or not extracted:
+        return NEEDS_REVIEW
+
+    submitted_tokens, extracted_tokens = submitted.split(), extracted.split()
+
+    if sorted(submitted_tokens) == sorted(extracted_tokens):
+        return VALID
+
+    # A dropped middle name, or a near miss (e.g. an OCR slip), is for a reviewer to decide
+    if set(submitted_tokens) <= set(extracted_tokens) or set(extracted_tokens) <= set(submitted_tokens):
+        return NEEDS_REVIEW
+
+    ratio = SequenceMatcher(None, " ".join(sorted(submitted_tokens)), " ".join(sorted(extracted_tokens))).ratio()
+
+    return NEEDS_REVIEW if ratio >= NAME_REVIEW_RATIO else INVALID
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Parses dates in any of the formats seen on applications and licenses (NaT when unparseable)."""
+    return pd.to_datetime(normalize_text(values), errors="coerce", format="mixed").dt.normalize()
+
+
+def date_verdicts(submitted: pd.Series, extracted: pd.Series) -> np.ndarray:
+    """VALID for equal dates, NEEDS_REVIEW for unreadable or day/month-swapped dates, INVALID otherwise."""
+    submitted, extracted = parse_dates(submitted), parse_dates(extracted)
+
+    unreadable = (submitted.isna() | extracted.isna()).to_numpy()
+    equal = (submitted == extracted).fillna(False).to_numpy(dtype=bool)
+    swapped = ((submitted.dt.year == extracted.dt.year) & (submitted.dt.month == extracted.dt.day)
+               & (submitted.dt.day == extracted.dt.month)).fillna(False).to_numpy(dtype=bool)
+
+    return np.select([unreadable, equal, swapped], [NEEDS_REVIEW, VALID, NEEDS_REVIEW], INVALID)
+
+
+def validate_fields(samples: pd.DataFrame, extracted_col: str = "extracted_data",
+                    reference_date: Optional[date] = None) -> pd.DataFrame:
+    """Evaluates the submitted application fields against the extracted license fields.
+
+    Args:
+        samples (pd.DataFrame): Rows with the submitted fields (name, date_of_birth, expiration_date,
+            state_issued, dl_number) and the extracted license data.
+        extracted_col (str): Column with the extracted data as JSON text or dicts.
+        reference_date (date): Date expiry is checked against; defaults to today.
+
+    Returns a frame indexed like samples with one VALID/INVALID/NEEDS_REVIEW column per field.
+    """
+    extracted = pd.DataFrame(parse_extracted(samples[extracted_col]), index=samples.index,
+                             columns=EVALUATED_FIELDS)
+    submitted = samples.reindex(columns=EVALUATED_FIELDS)
+
+    verdicts = pd.DataFrame(index=samples.index)
+
+    verdicts["name"] = [name_verdict(normalize_name(a), normalize_name(b))
+                        for a, b in zip(normalize_text(submitted["name"]), normalize_text(extracted["name"]))]
+
+    verdicts["date_of_birth"] = date_verdicts(submitted["date_of_birth"], extracted["date_of_birth"])
+
+    expiration = date_verdicts(submitted["expiration_date"], extracted["expiration_date"])
+    today = pd.Timestamp(reference_date or date.today())
+    expired = ((parse_dates(extracted["expiration_date"]) < today)
+               | (parse_dates(submitted["expiration_date"]) < today)).to_numpy(dtype=bool)
+    verdicts["expiration_date"] = np.where(expired, INVALID, expiration)
+
+    def state(values):
+        states = normalize_text(values).str.replace(".", "", regex=False).str.strip()
+        return states.replace(STATE_ABBREVIATIONS)
+
+    submitted_state, extracted_state = state(submitted["state_issued"]), state(extracted["state_issued"])
+    verdicts["state_issued"] = np.select(
+        [extracted_state.isna().to_numpy(),
+         (extracted_state != REQUIRED_STATE).fillna(True).to_numpy(dtype=bool),
+         (submitted_state == extracted_state).fillna(False).to_numpy(dtype=bool),
+         submitted_state.isna().to_numpy()],
+        [NEEDS_REVIEW, INVALID, VALID, NEEDS_REVIEW],
+        INVALID,
+    )
+
+    def dl_number(values):
+        return normalize_text(values).str.replace(NON_ALPHANUMERIC, "", regex=True).replace("", pd.NA)
+
+    submitted_dl, extracted_dl = dl_number(submitted["dl_number"]), dl_number(extracted["dl_number"])
+    near = [a is not pd.NA and b is not pd.NA and len(a) == len(b) and sum(x != y for x, y in zip(a, b)) == 1
+            for a, b in zip(submitted_dl, extracted_dl)]
+    verdicts["dl_number"] = np.select(
+        [(submitted_dl.isna() | extracted_dl.isna()).to_numpy(),
+         (submitted_dl == extracted_dl).fillna(False).to_numpy(dtype=bool),
+         np.array(near, dtype=bool)],
+        [NEEDS_REVIEW, VALID, NEEDS_REVIEW],
+        INVALID,
+    )
+
+    return verdicts
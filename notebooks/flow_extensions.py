@@ -4,61 +4,498 @@
 from sdg_hub.core.blocks.base import BaseBlock
 from sdg_hub.core.blocks.llm.llm_chat_block import LLMChatBlock
 from sdg_hub.core.blocks.registry import BlockRegistry
-from pydantic import ConfigDict, field_validator
+from pydantic import ConfigDict, Field, PrivateAttr, field_validator
 import validators
 from sdg_hub.core.utils.logger_config import setup_logger
-from litellm import acompletion, completion
+from litellm import acompletion, completion, stream_chunk_builder
 import pandas as pd
-from typing import Any, Optional
+from typing import Any, AsyncIterable, AsyncIterator, Optional, Union
 import asyncio
+import contextvars
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from llm_cache import ResponseCache, get_response_cache, make_cache_key
+from image_preprocessing import DEFAULT_MAX_EDGE, ImageNormalizer, to_data_url
+from field_validation import EVALUATED_FIELDS, NEEDS_REVIEW, VERDICTS, validate_fields
+from adaptive_concurrency import AdaptiveConcurrencyLimiter, backoff_delay, error_status, is_overload, is_retryable
+from instrumentation import active_instrumentation
+from datetime import date
 logger = setup_logger(__name__)
 import os
 
-@BlockRegistry.register("CustomLLMMultimodalBlock", 
-                        "llm", 
-                        "Extension of BaseBlock that supports multimodal models")
-class CustomLLMMultimodalBlock(LLMChatBlock):
-    """Extends LLMChatBlock to support multimodal models"""
+# Concurrency ceiling of a streamed block whose input length is unknown and which has no flow limit
+DEFAULT_STREAM_CONCURRENCY = 64
+
+
+async def aiter_rows(samples: pd.DataFrame) -> AsyncIterator[tuple[Any, pd.DataFrame]]:
+    """Yields the (index, single-row frame) pairs of a DataFrame."""
+
+    for position in range(len(samples)):
+        yield samples.index[position], samples.iloc[[position]]
+
+
+def is_error_response(response: Any) -> bool:
+    """Returns whether a response is the placeholder of a failed request (see CustomLLMChatBlock._error_response)."""
+
+    return (isinstance(response, list) and bool(response) and isinstance(response[0], dict)
+            and bool(response[0].get("error")))
+
+
+@BlockRegistry.register("CustomLLMChatBlock",
+                        "llm",
+                        "Extension of LLMChatBlock with bounded-parallel sync generation and response caching")
+class CustomLLMChatBlock(LLMChatBlock):
+    """Extends LLMChatBlock with bounded-parallel sync generation and an on-disk response cache.
+
+    Attributes
+    ----------
+    response_cache_path : Optional[str]
+        SQLite file used to cache responses by model, messages, image digest and
+        completion kwargs. Caching is disabled when unset.
+    response_cache_max_mb : float
+        Size cap of the response cache; least recently used entries are evicted beyond it.
+    llm_required_col : Optional[str]
+        Boolean column selecting the rows sent to the model. Other rows get the content of
+        ``precomputed_content_col`` as their response. All rows go to the model when unset.
+    precomputed_content_col : Optional[str]
+        Column holding the response content of the rows that skip the model.
+    max_retries : int
+        Retries of a request failing with a 429/5xx, timeout or connection error (async path, which
+        disables LiteLLM's own ``num_retries``).
+    retry_base_delay, retry_max_delay : float
+        Bounds, in seconds, of the jittered exponential backoff between retries.
+    min_concurrency : int
+        Floor of the adaptive concurrency limit.
+    latency_tolerance : float
+        Ratio of recent to long-run latency beyond which the concurrency limit is reduced.
+    measure_ttft : bool
+        Whether async requests are streamed so that the time to first token can be reported
+        to the active FlowInstrumentation.
+    """
 
     model_config = ConfigDict(extra="allow")
 
-    def monkey_patch_messages(self, records):
-        """Adds <image_url> message to the list of existing messages"""
+    response_cache_path: Optional[str] = None
 
-        for i, record in enumerate(records):
-            
-            image_url = None
-    
-            user = list(filter(lambda x: x["role"]=="user", record))[0]        
-                
-            _, _, image_url = user["content"].partition("```image_url: ")
-        
-            if not validators.url(image_url):
-    
-                raise ValueError(f"Error processing image_url: Ensure image_url={image_url} is valid")
-                
-            user["content"] = [
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": image_url,
-                        "detail": "high",
+    response_cache_max_mb: float = 512
+
+    llm_required_col: Optional[str] = None
+
+    precomputed_content_col: Optional[str] = None
+
+    max_retries: int = Field(3, ge=0)
+
+    retry_base_delay: float = 1.0
+
+    retry_max_delay: float = 30.0
+
+    min_concurrency: int = 1
+
+    latency_tolerance: float = 2.0
+
+    measure_ttft: bool = False
+
+    _flow_max_concurrency: Optional[int] = PrivateAttr(default=None)
+
+    _limiter: Optional[AdaptiveConcurrencyLimiter] = PrivateAttr(default=None)
+
+    def _build_completion_kwargs(self, **overrides: Any) -> dict[str, Any]:
+        """Builds the LiteLLM kwargs without the settings declared by this block and its subclasses.
+
+        LLMChatBlock forwards every explicitly set field to LiteLLM, which would otherwise
+        include e.g. response_cache_path (and mix it into the cache key).
+        """
+        completion_kwargs = super()._build_completion_kwargs(**overrides)
+
+        for name in set(type(self).model_fields) - set(LLMChatBlock.model_fields):
+            completion_kwargs.pop(name, None)
+
+        return completion_kwargs
+
+    def prepare_messages(self, messages_list):
+        """Hook for subclasses to rewrite messages before they are sent (and cached)."""
+
+        return messages_list
+
+    def generate(self, samples: Any, **override_kwargs: Any) -> Any:
+        """Captures the flow-level concurrency limit before delegating to LLMChatBlock.
+
+        The base class only forwards ``_flow_max_concurrency`` to the async path,
+        so it is stashed here for ``_generate_sync`` to honor as well.
+        """
+        self._flow_max_concurrency = override_kwargs.get("_flow_max_concurrency")
+
+        if not self.llm_required_col:
+            return super().generate(samples, **override_kwargs)
+
+        return self._generate_required(samples, **override_kwargs)
+
+    def _generate_required(self, samples: pd.DataFrame, **override_kwargs: Any) -> pd.DataFrame:
+        """Sends only the rows flagged in ``llm_required_col`` to the model.
+
+        The other rows get an assistant message with the content of ``precomputed_content_col``,
+        so that downstream parsers see the same response shape for every row.
+        """
+        if not self.precomputed_content_col:
+            raise ValueError("precomputed_content_col is required when llm_required_col is set")
+
+        required = samples[self.llm_required_col].fillna(True).astype(bool).to_numpy()
+
+        output_col = self.output_cols[0]
+
+        responses = [
+            self._precomputed_response(content)
+            for content in samples[self.precomputed_content_col].fillna("")
+        ]
+
+        logger.info(
+            "Sending %d/%d samples to the model (%d answered without it)",
+            required.sum(),
+            len(samples),
+            len(samples) - required.sum(),
+            extra={"block_name": self.block_name},
+        )
+
+        if required.any():
+            generated = super().generate(samples[required].reset_index(drop=True), **override_kwargs)
+
+            for i, response in zip(required.nonzero()[0], generated[output_col]):
+                responses[i] = response
+
+        output = samples.copy()
+
+        output[output_col] = responses
+
+        return output
+
+    def _precomputed_response(self, content: str) -> list[dict[str, Any]]:
+        """Response recorded for a row that skips the model."""
+
+        return [{"role": "assistant", "content": content}]
+
+    def _requires_llm(self, row: pd.DataFrame) -> bool:
+        """Returns whether a single-row frame must be sent to the model (see ``llm_required_col``)."""
+
+        if not self.llm_required_col:
+            return True
+
+        value = row[self.llm_required_col].iloc[0]
+
+        return True if pd.isna(value) else bool(value)
+
+    async def astream(
+        self,
+        samples: Union[pd.DataFrame, AsyncIterable[tuple[Any, pd.DataFrame]]],
+        **override_kwargs: Any,
+    ) -> AsyncIterator[tuple[Any, pd.DataFrame]]:
+        """Streaming counterpart of ``generate``: yields ``(index, row)`` pairs as responses complete.
+
+        ``samples`` is a DataFrame or an async iterable of ``(index, single-row DataFrame)`` pairs,
+        e.g. the output of an upstream block's ``astream``, so requests start as soon as their row
+        arrives. Each yielded single-row frame holds the response in the output column and keeps
+        the index it came in with, from which the caller can restore the original order. Rows go
+        through the same response cache, adaptive concurrency limit, retries and
+        ``llm_required_col`` selection as ``generate``.
+
+        Parameters
+        ----------
+        samples : Union[pd.DataFrame, AsyncIterable[tuple[Any, pd.DataFrame]]]
+            Rows to process.
+        **override_kwargs : Any
+            Runtime overrides, as for ``generate`` (including ``_flow_max_concurrency``).
+
+        Yields
+        ------
+        tuple[Any, pd.DataFrame]
+            The original index and the completed single-row frame.
+        """
+
+        if self.llm_required_col and not self.precomputed_content_col:
+            raise ValueError("precomputed_content_col is required when llm_required_col is set")
+
+        flow_max_concurrency = override_kwargs.pop("_flow_max_concurrency", None)
+        completion_kwargs = self._build_completion_kwargs(**override_kwargs)
+
+        if isinstance(samples, pd.DataFrame):
+            num_requests = len(samples)
+            samples = aiter_rows(samples)
+        else:
+            # The stream length is unknown up front
+            num_requests = DEFAULT_STREAM_CONCURRENCY
+
+        limiter = self._get_limiter(flow_max_concurrency, completion_kwargs, num_requests)
+        cache = self._response_cache()
+        output_col = self.output_cols[0]
+
+        completed: asyncio.Queue = asyncio.Queue()
+
+        async def complete(index, row):
+            if not self._requires_llm(row):
+                content = row[self.precomputed_content_col].iloc[0]
+                response = self._precomputed_response("" if pd.isna(content) else content)
+            else:
+                messages = self.prepare_messages(row[self.input_cols[0]].tolist())[0]
+                key = make_cache_key(messages, completion_kwargs) if cache is not None else None
+                response = cache.get(key) if cache is not None else None
+                metrics = active_instrumentation()
+                if response is not None and metrics is not None:
+                    metrics.record_cache_hits(self.block_name, 1)
+                if response is None:
+                    response = await self._make_cached_acompletion(messages, completion_kwargs, cache, key, limiter)
+
+            row = row.copy()
+            row[output_col] = [response]
+
+            await completed.put((index, row))
+
+        async def feed():
+            tasks = []
+            try:
+                async for index, row in samples:
+                    tasks.append(asyncio.ensure_future(complete(index, row)))
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            finally:
+                await completed.put(None)
+
+        feeder = asyncio.ensure_future(feed())
+
+        try:
+            while (item := await completed.get()) is not None:
+                yield item
+
+            # Surfaces a failure of the upstream stream or of a request
+            await feeder
+        finally:
+            feeder.cancel()
+
+    def _effective_concurrency(
+        self,
+        flow_max_concurrency: int,
+        completion_kwargs: dict[str, Any],
+    ) -> int:
+        """Returns the number of in-flight requests allowed for the given flow concurrency.
+
+        Parameters
+        ----------
+        flow_max_concurrency : int
+            Maximum concurrency requested by the flow.
+        completion_kwargs : dict[str, Any]
+            Kwargs for LiteLLM completion.
+
+        Returns
+        -------
+        int
+            Concurrency adjusted for the number of completions per request.
+        """
+        # Validate max_concurrency parameter
+        if flow_max_concurrency < 1:
+            raise ValueError(
+                f"max_concurrency must be greater than 0, got {flow_max_concurrency}"
+            )
+
+        # Adjust concurrency based on n parameter (number of completions per request)
+        effective_concurrency = flow_max_concurrency
+        n_value = completion_kwargs.get("n", 1)
+
+        if n_value and n_value > 1:
+            if flow_max_concurrency >= n_value:
+                # Adjust concurrency to account for n completions per request
+                effective_concurrency = flow_max_concurrency // n_value
+                logger.debug(
+                    "Adjusted max_concurrency from %d to %d for n=%d completions per request",
+                    flow_max_concurrency,
+                    effective_concurrency,
+                    n_value,
+                    extra={
+                        "block_name": self.block_name,
+                        "original_max_concurrency": flow_max_concurrency,
+                        "adjusted_max_concurrency": effective_concurrency,
+                        "n_value": n_value,
                     },
-                },
-                {
-                    "type": "text",
-                    "text": "Extract the data from the image",
-                },
-            ]
+                )
+            else:
+                # Warn when max_concurrency is less than n
+                logger.warning(
+                    "max_concurrency (%d) is less than n (%d). Consider increasing max_concurrency for optimal performance.",
+                    flow_max_concurrency,
+                    n_value,
+                    extra={
+                        "block_name": self.block_name,
+                        "max_concurrency": flow_max_concurrency,
+                        "n_value": n_value,
+                    },
+                )
+                effective_concurrency = flow_max_concurrency
+
+        return effective_concurrency
+
+    def _make_completion(
+        self,
+        messages: list[dict[str, Any]],
+        completion_kwargs: dict[str, Any],
+    ) -> list[dict[str, Any]]:
+        """Sends a single blocking completion request and converts its choices to dicts."""
+
+        start_time = time.perf_counter()
+
+        response = completion(messages=messages, **completion_kwargs)
+
+        self._record_request(response, time.perf_counter() - start_time)
+
+        return self._choices_to_dicts(response, completion_kwargs)
+
+    async def _make_acompletion(
+        self,
+        messages: list[dict[str, Any]],
+        completion_kwargs: dict[str, Any],
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ) -> list[dict[str, Any]]:
+        """Sends a single async completion request and converts its choices to dicts.
+
+        With ``measure_ttft`` the response is streamed and reassembled, so that the time to the
+        first chunk can be recorded; the returned messages are the same either way.
+        """
+
+        if semaphore is not None:
+            async with semaphore:
+                return await self._make_acompletion(messages, completion_kwargs)
+
+        start_time = time.perf_counter()
+        ttft = None
+
+        if self.measure_ttft:
+            chunks = []
+            stream = await acompletion(
+                messages=messages, stream=True, stream_options={"include_usage": True}, **completion_kwargs
+            )
+            async for chunk in stream:
+                if ttft is None:
+                    ttft = time.perf_counter() - start_time
+                chunks.append(chunk)
+            response = stream_chunk_builder(chunks, messages=messages)
+        else:
+            response = await acompletion(messages=messages, **completion_kwargs)
+
+        self._record_request(response, time.perf_counter() - start_time, ttft)
+
+        return self._choices_to_dicts(response, completion_kwargs)
+
+    def _choices_to_dicts(self, response: Any, completion_kwargs: dict[str, Any]) -> list[dict[str, Any]]:
+        """Converts the choices of a completion response to dicts (all of them when n > 1)."""
+
+        # Extract response based on n parameter
+        n_value = completion_kwargs.get("n", 1)
+        if n_value > 1:
+            return [self._message_to_dict(choice.message) for choice in response.choices]
+
+        return [self._message_to_dict(response.choices[0].message)]
+
+    def _record_request(self, response: Any, latency: float, ttft: Optional[float] = None) -> None:
+        """Reports a completed request's latency, tokens and cost to the active FlowInstrumentation."""
+
+        metrics = active_instrumentation()
+
+        if metrics is None:
+            return
+
+        usage = getattr(response, "usage", None)
+
+        metrics.record_request(
+            self.block_name,
+            latency,
+            ttft,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            cost=(getattr(response, "_hidden_params", None) or {}).get("response_cost") or 0.0,
+        )
+
+    def _record_failure(self) -> None:
+        """Reports a request that failed for good to the active FlowInstrumentation."""
+
+        metrics = active_instrumentation()
+
+        if metrics is not None:
+            metrics.record_failure(self.block_name)
+
+    def _error_response(self, error: Exception) -> list[dict[str, Any]]:
+        """Placeholder response recorded for a sample whose request failed."""
+
+        return [{"role": "assistant", "content": "", "error": str(error)}]
+
+    def failed_rows(self, samples: pd.DataFrame) -> pd.Series:
+        """Returns a boolean mask of the rows whose request failed (their response is an error placeholder)."""
+
+        return samples[self.output_cols[0]].map(is_error_response).astype(bool)
+
+    def _response_cache(self) -> Optional[ResponseCache]:
+        """Returns the response cache configured for this block, if any."""
 
-        return records
+        if not self.response_cache_path:
+            return None
+
+        return get_response_cache(
+            self.response_cache_path,
+            max_bytes=int(self.response_cache_max_mb * 1024 * 1024),
+        )
+
+    def _read_cache(
+        self,
+        cache: Optional[ResponseCache],
+        messages_list: list[list[dict[str, Any]]],
+        completion_kwargs: dict[str, Any],
+        responses: list[Optional[list[dict[str, Any]]]],
+    ) -> dict[int, Optional[str]]:
+        """Fills responses from the cache and returns the cache keys of the misses by sample index."""
+
+        if cache is None:
+            return {i: None for i in range(len(messages_list))}
+
+        misses = {}
+
+        for i, messages in enumerate(messages_list):
+            key = make_cache_key(messages, completion_kwargs)
+            cached = cache.get(key)
+            if cached is None:
+                misses[i] = key
+            else:
+                responses[i] = cached
+
+        metrics = active_instrumentation()
+
+        if metrics is not None:
+            metrics.record_cache_hits(self.block_name, len(messages_list) - len(misses))
+
+        logger.info(
+            "Response cache served %d/%d samples (hit rate %.1f%%)",
+            len(messages_list) - len(misses),
+            len(messages_list),
+            cache.hit_rate * 100,
+            extra={
+                "block_name": self.block_name,
+                "cache_stats": cache.stats(),
+            },
+        )
+
+        return misses
 
     def _generate_sync(
         self,
         messages_list: list[list[dict[str, Any]]],
         completion_kwargs: dict[str, Any],
+        flow_max_concurrency: Optional[int] = None,
     ) -> list[list[dict[str, Any]]]:
-        """Generate responses synchronously.
+        """Generate responses synchronously over a bounded thread pool.
+
+        Requests are fanned out to at most ``flow_max_concurrency`` worker threads
+        (adjusted for ``n`` exactly as in ``_generate_async``). Responses keep the order
+        of ``messages_list``. A failed request does not abort the batch: its slot holds a
+        placeholder response carrying the error message. Samples found in the response
+        cache are not sent to the model.
 
         Parameters
         ----------
@@ -66,6 +503,9 @@ class CustomLLMMultimodalBlock(LLMChatBlock):
             List of message lists to process.
         completion_kwargs : dict[str, Any]
             Kwargs for LiteLLM completion.
+        flow_max_concurrency : Optional[int], optional
+            Maximum concurrency for sync requests. Defaults to the limit captured
+            from the flow in ``generate``.
 
         Returns
         -------
@@ -74,59 +514,190 @@ class CustomLLMMultimodalBlock(LLMChatBlock):
         """
 
         logger = setup_logger(__name__)
-        
-        responses = []
 
-        messages_list = self.monkey_patch_messages(messages_list)
+        messages_list = self.prepare_messages(messages_list)
 
-        for i, messages in enumerate(messages_list):
-            try:
-                response = completion(messages=messages, **completion_kwargs)
-                # Extract response based on n parameter
-                n_value = completion_kwargs.get("n", 1)
-                if n_value > 1:
-                    response_data = [
-                        self._message_to_dict(choice.message)
-                        for choice in response.choices
-                    ]
-                else:
-                    response_data = [self._message_to_dict(response.choices[0].message)]
-                responses.append(response_data)
+        if flow_max_concurrency is None:
+            flow_max_concurrency = self._flow_max_concurrency
+
+        if flow_max_concurrency is not None:
+            max_workers = self._effective_concurrency(flow_max_concurrency, completion_kwargs)
+        else:
+            # No concurrency limit: fall back to the executor's default pool size
+            max_workers = None
+
+        responses: list[Optional[list[dict[str, Any]]]] = [None] * len(messages_list)
+
+        cache = self._response_cache()
+        misses = self._read_cache(cache, messages_list, completion_kwargs, responses)
+
+        if not misses:
+            return responses
+
+        failed = []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                # Each request runs in a copy of the caller's context, which holds the active FlowInstrumentation
+                executor.submit(contextvars.copy_context().run, self._make_completion, messages_list[i],
+                                completion_kwargs): i
+                for i in misses
+            }
+
+            for completed, future in enumerate(as_completed(futures), start=1):
+                i = futures[future]
+                try:
+                    responses[i] = future.result()
+                    if cache is not None:
+                        cache.put(misses[i], responses[i])
+                except Exception as e:
+                    logger.error(
+                        "Failed to generate response for sample %d: %s",
+                        i,
+                        str(e),
+                        extra={
+                            "block_name": self.block_name,
+                            "sample_index": i,
+                            "error": str(e),
+                        },
+                    )
+                    responses[i] = self._error_response(e)
+                    self._record_failure()
+                    failed.append(i)
 
                 # Log progress for large batches
-                if (i + 1) % 10 == 0:
+                if completed % 10 == 0:
                     logger.debug(
                         "Generated %d/%d responses",
-                        i + 1,
-                        len(messages_list),
+                        completed,
+                        len(misses),
                         extra={
                             "block_name": self.block_name,
-                            "progress": f"{i + 1}/{len(messages_list)}",
+                            "progress": f"{completed}/{len(misses)}",
                         },
                     )
 
-            except Exception as e:
-                logger.error(
-                    "Failed to generate response for sample %d: %s",
-                    i,
-                    str(e),
-                    extra={
-                        "block_name": self.block_name,
-                        "sample_index": i,
-                        "error": str(e),
-                    },
-                )
-                raise
+        if failed:
+            logger.warning(
+                "%d/%d samples failed to generate a response",
+                len(failed),
+                len(messages_list),
+                extra={
+                    "block_name": self.block_name,
+                    "failed_sample_indices": sorted(failed),
+                },
+            )
 
         return responses
 
+    def _get_limiter(
+        self,
+        flow_max_concurrency: Optional[int],
+        completion_kwargs: dict[str, Any],
+        num_requests: int,
+    ) -> AdaptiveConcurrencyLimiter:
+        """Returns the block's adaptive limiter, capped at the flow's (n-adjusted) concurrency.
+
+        The limiter is kept across batches so that the limit learned from the endpoint carries over.
+        """
+        if flow_max_concurrency is not None:
+            ceiling = self._effective_concurrency(flow_max_concurrency, completion_kwargs)
+        else:
+            # No concurrency limit: every request may be in flight at once
+            ceiling = max(num_requests, self._limiter.max_limit if self._limiter else 1)
+
+        if self._limiter is None:
+            self._limiter = AdaptiveConcurrencyLimiter(
+                max_limit=ceiling,
+                min_limit=self.min_concurrency,
+                latency_tolerance=self.latency_tolerance,
+            )
+        else:
+            self._limiter.set_max_limit(ceiling)
+
+        return self._limiter
+
+    def concurrency_stats(self) -> dict[str, Any]:
+        """Current concurrency limit, in-flight requests, queue depth and counters of the async path."""
+
+        return self._limiter.stats() if self._limiter is not None else {}
+
+    async def _make_cached_acompletion(
+        self,
+        messages: list[dict[str, Any]],
+        completion_kwargs: dict[str, Any],
+        cache: Optional[ResponseCache],
+        key: Optional[str],
+        limiter: AdaptiveConcurrencyLimiter,
+    ) -> list[dict[str, Any]]:
+        """Sends a single async completion request under the limiter and caches its response.
+
+        Transient failures (429/5xx, timeouts, connection errors) are retried up to
+        ``max_retries`` times with full-jitter exponential backoff. Latencies and overloads are
+        reported to the limiter. A request that still fails gets a placeholder response carrying
+        the error instead of failing the batch.
+        """
+
+        # Retry here only: LiteLLM's own retries (num_retries) would hold the limiter slot and hide
+        # overloads from it until they are exhausted
+        completion_kwargs = {**completion_kwargs, "num_retries": 0}
+
+        for attempt in range(self.max_retries + 1):
+            async with limiter:
+                start_time = time.perf_counter()
+                try:
+                    response = await self._make_acompletion(messages, completion_kwargs)
+                except Exception as e:
+                    error = e
+                    if is_overload(e):
+                        limiter.on_overload()
+                else:
+                    limiter.on_success(time.perf_counter() - start_time)
+                    if cache is not None:
+                        cache.put(key, response)
+                    return response
+
+            if attempt == self.max_retries or not is_retryable(error):
+                break
+
+            delay = backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay)
+
+            metrics = active_instrumentation()
+
+            if metrics is not None:
+                metrics.record_retry(self.block_name)
+
+            logger.warning(
+                "Retrying request in %.2fs (attempt %d/%d): %s",
+                delay,
+                attempt + 1,
+                self.max_retries,
+                str(error),
+                extra={
+                    "block_name": self.block_name,
+                    "status_code": error_status(error),
+                    "concurrency": limiter.stats(),
+                },
+            )
+
+            await asyncio.sleep(delay)
+
+        self._record_failure()
+
+        return self._error_response(error)
+
     async def _generate_async(
         self,
         messages_list: list[list[dict[str, Any]]],
         completion_kwargs: dict[str, Any],
         flow_max_concurrency: Optional[int] = None,
     ) -> list[list[dict[str, Any]]]:
-        """Generate responses asynchronously.
+        """Generate responses asynchronously under an adaptive concurrency limit.
+
+        In-flight requests are bounded by an AIMD limiter (see ``AdaptiveConcurrencyLimiter``)
+        that never exceeds ``flow_max_concurrency`` (adjusted for ``n``) and backs off on
+        429/5xx responses and latency growth. A failed request does not abort the batch: its
+        slot holds a placeholder response carrying the error message.
 
         Parameters
         ----------
@@ -147,63 +718,49 @@ class CustomLLMMultimodalBlock(LLMChatBlock):
 
             logger = setup_logger(__name__)
 
-            messages_list = self.monkey_patch_messages(messages_list)
-            
-            if flow_max_concurrency is not None:
-                # Validate max_concurrency parameter
-                if flow_max_concurrency < 1:
-                    raise ValueError(
-                        f"max_concurrency must be greater than 0, got {flow_max_concurrency}"
-                    )
+            messages_list = self.prepare_messages(messages_list)
 
-                # Adjust concurrency based on n parameter (number of completions per request)
-                effective_concurrency = flow_max_concurrency
-                n_value = completion_kwargs.get("n", 1)
-
-                if n_value and n_value > 1:
-                    if flow_max_concurrency >= n_value:
-                        # Adjust concurrency to account for n completions per request
-                        effective_concurrency = flow_max_concurrency // n_value
-                        logger.debug(
-                            "Adjusted max_concurrency from %d to %d for n=%d completions per request",
-                            flow_max_concurrency,
-                            effective_concurrency,
-                            n_value,
-                            extra={
-                                "block_name": self.block_name,
-                                "original_max_concurrency": flow_max_concurrency,
-                                "adjusted_max_concurrency": effective_concurrency,
-                                "n_value": n_value,
-                            },
-                        )
-                    else:
-                        # Warn when max_concurrency is less than n
-                        logger.warning(
-                            "max_concurrency (%d) is less than n (%d). Consider increasing max_concurrency for optimal performance.",
-                            flow_max_concurrency,
-                            n_value,
-                            extra={
-                                "block_name": self.block_name,
-                                "max_concurrency": flow_max_concurrency,
-                                "n_value": n_value,
-                            },
-                        )
-                        effective_concurrency = flow_max_concurrency
-
-                # Use semaphore for concurrency control
-                semaphore = asyncio.Semaphore(effective_concurrency)
-                tasks = [
-                    self._make_acompletion(messages, completion_kwargs, semaphore)
-                    for messages in messages_list
-                ]
-            else:
-                # No concurrency limit
-                tasks = [
-                    self._make_acompletion(messages, completion_kwargs)
-                    for messages in messages_list
-                ]
+            responses: list[Optional[list[dict[str, Any]]]] = [None] * len(messages_list)
+
+            cache = self._response_cache()
+            misses = self._read_cache(cache, messages_list, completion_kwargs, responses)
+
+            if not misses:
+                return responses
+
+            limiter = self._get_limiter(flow_max_concurrency, completion_kwargs, len(misses))
+
+            tasks = [
+                self._make_cached_acompletion(messages_list[i], completion_kwargs, cache, key, limiter)
+                for i, key in misses.items()
+            ]
+
+            for i, response in zip(misses, await asyncio.gather(*tasks)):
+                responses[i] = response
+
+            failed = [i for i in misses if responses[i] and "error" in responses[i][0]]
+
+            if failed:
+                logger.warning(
+                    "%d/%d samples failed to generate a response",
+                    len(failed),
+                    len(messages_list),
+                    extra={
+                        "block_name": self.block_name,
+                        "failed_sample_indices": failed,
+                    },
+                )
+
+            logger.info(
+                "Async generation finished with a concurrency limit of %d/%d",
+                limiter.limit,
+                limiter.max_limit,
+                extra={
+                    "block_name": self.block_name,
+                    "concurrency": limiter.stats(),
+                },
+            )
 
-            responses = await asyncio.gather(*tasks)
             return responses
 
         except Exception as e:
@@ -219,6 +776,354 @@ class CustomLLMMultimodalBlock(LLMChatBlock):
             raise
 
 
+@BlockRegistry.register("CustomLLMMultimodalBlock", 
+                        "llm", 
+                        "Extension of BaseBlock that supports multimodal models")
+class CustomLLMMultimodalBlock(CustomLLMChatBlock):
+    """Extends LLMChatBlock to support multimodal models"""
+
+    model_config = ConfigDict(extra="allow")
+
+    image_detail: str = "high"
+
+    def monkey_patch_messages(self, records):
+        """Returns the messages with an <image_url> part added to each user message.
+
+        Local image files (e.g. the output of CustomImageNormalizationBlock) are sent inline as data URLs.
+        Text preceding the image reference is sent along with the image; when there is none,
+        the model is asked to extract the data from the image.
+        """
+
+        patched = []
+
+        for record in records:
+
+            user = next(message for message in record if message["role"] == "user")
+
+            text, _, image_url = user["content"].partition("```image_url: ")
+
+            if os.path.isfile(image_url.strip()):
+
+                image_url = to_data_url(image_url.strip())
+        
+            elif not validators.url(image_url):
+    
+                raise ValueError(f"Error processing image_url: Ensure image_url={image_url} is valid")
+
+            content = [
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": image_url,
+                        "detail": self.image_detail,
+                    },
+                },
+                {
+                    "type": "text",
+                    "text": text.strip() or "Extract the data from the image",
+                },
+            ]
+
+            # Build new messages rather than rewriting the dataset's prompts in place, so the same
+            # prompts can be sent again (e.g. to another model) and the data URLs are not kept around
+            patched.append([{**message, "content": content} if message is user else message for message in record])
+
+        return patched
+
+    def prepare_messages(self, messages_list):
+        """Sends the image referenced in each user message as an <image_url> part."""
+
+        return self.monkey_patch_messages(messages_list)
+
+
+EXTRACTED_FIELDS = ["name", "date_of_birth", "expiration_date", "issuance_date", "state_issued",
+                    "dl_number", "photo_orientation"]
+
+# Structured output of the single-pass extract-and-evaluate call
+EXTRACT_EVALUATE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "extracted": {
+            "type": "object",
+            "properties": {field: {"type": "string"} for field in EXTRACTED_FIELDS},
+            "required": EXTRACTED_FIELDS,
+            "additionalProperties": False,
+        },
+        "evaluation": {
+            "type": "object",
+            "properties": {field: {"type": "string", "enum": VERDICTS} for field in EVALUATED_FIELDS},
+            "required": EVALUATED_FIELDS,
+            "additionalProperties": False,
+        },
+    },
+    "required": ["extracted", "evaluation"],
+    "additionalProperties": False,
+}
+
+
+@BlockRegistry.register("CustomLLMExtractEvaluateBlock",
+                        "llm",
+                        "Multimodal block that extracts license fields and evaluates them in one structured-output call")
+class CustomLLMExtractEvaluateBlock(CustomLLMMultimodalBlock):
+    """Extracts the license fields from the image and judges each application field in a single call.
+
+    The response is constrained to ``response_schema`` (an ``extracted`` object and an
+    ``evaluation`` object of VALID/INVALID/NEEDS_REVIEW verdicts), replacing the separate
+    extraction and evaluation round-trips of the two-stage flow.
+
+    Attributes
+    ----------
+    response_schema : Optional[dict]
+        JSON schema of the response. Defaults to EXTRACT_EVALUATE_SCHEMA.
+    """
+
+    model_config = ConfigDict(extra="allow")
+
+    response_schema: Optional[dict] = None
+
+    def _build_completion_kwargs(self, **overrides: Any) -> dict[str, Any]:
+        """Builds the completion kwargs with the response constrained to the schema."""
+
+        return {
+            **super()._build_completion_kwargs(**overrides),
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "license_extract_evaluate",
+                    "schema": self.response_schema or EXTRACT_EVALUATE_SCHEMA,
+                    "strict": True,
+                },
+            },
+        }
+
+
+@BlockRegistry.register(
+    "CustomRuleBasedValidatorBlock",
+    "evaluation",
+    "Evaluates extracted license fields with deterministic rules, flagging ambiguous rows for the LLM",
+)
+class CustomRuleBasedValidatorBlock(BaseBlock):
+    """Block that evaluates the submitted fields against the extracted license data with rules.
+
+    Names are normalized and fuzzy-matched, dates are parsed and compared, expiry is checked
+    against ``reference_date`` and the state must be Colorado (see field_validation). The first
+    output column holds the verdicts as JSON in the same shape as the evaluation prompt's
+    response; the second flags the rows with a NEEDS_REVIEW field, which still need the LLM.
+
+    Attributes
+    ----------
+    block_name : str
+        Name of the block.
+    input_cols
+        Submitted field columns (name, date_of_birth, expiration_date, state_issued, dl_number)
+        followed by the extracted data column.
+    output_cols
+        Verdicts column and needs-review flag column.
+    reference_date : Optional[str]
+        ISO date expiry is checked against; defaults to today.
+    """
+
+    reference_date: Optional[str] = None
+
+    @field_validator("output_cols", mode="after")
+    @classmethod
+    def validate_output_cols(cls, v):
+        """Validate that exactly two output columns are given."""
+        if not v or len(v) != 2:
+            raise ValueError(f"exactly two output columns are required, got {v}")
+        return v
+
+    def generate(self, samples: pd.DataFrame, **kwargs: Any) -> pd.DataFrame:
+        """Generate a dataset with the rule-based verdicts and the needs-review flag.
+
+        Parameters
+        ----------
+        samples : pd.DataFrame
+            Input dataset with the submitted fields and the extracted data.
+
+        Returns
+        -------
+        pd.DataFrame
+            Dataset with the verdicts and needs-review columns.
+        """
+        reference_date = date.fromisoformat(self.reference_date) if self.reference_date else None
+
+        verdicts = validate_fields(samples, extracted_col=self.input_cols[-1], reference_date=reference_date)
+
+        verdicts_col, needs_review_col = self.output_cols
+
+        output = samples.copy()
+
+        output[verdicts_col] = [json.dumps(row) for row in verdicts.to_dict(orient="records")]
+        output[needs_review_col] = (verdicts == NEEDS_REVIEW).any(axis=1).to_numpy()
+
+        logger.info(
+            "Rules decided %d/%d samples; %d need review",
+            (~output[needs_review_col]).sum(),
+            len(output),
+            output[needs_review_col].sum(),
+            extra={"block_name": self.block_name},
+        )
+
+        return output
+
+
+@BlockRegistry.register(
+    "CustomSplitJSONColumnBlock",
+    "transform",
+    "Splits a column of JSON objects into one JSON column per top-level key",
+)
+class CustomSplitJSONColumnBlock(BaseBlock):
+    """Block that splits a JSON column into one column per top-level key.
+
+    Each output column holds the JSON encoding of the corresponding key's value ("{}" when
+    the input is not valid JSON or lacks the key), so that e.g. a single-pass response can
+    feed the same extracted_data/eval_data columns as the two-stage flow.
+
+    Attributes
+    ----------
+    block_name : str
+        Name of the block.
+    input_cols
+        Column holding the JSON text.
+    output_cols
+        Columns to create, one per key.
+    keys : list[str]
+        Top-level keys, in the order of output_cols.
+    """
+
+    keys: list[str]
+
+    @field_validator("input_cols", mode="after")
+    @classmethod
+    def validate_input_cols(cls, v):
+        """Validate that exactly one input column is given."""
+        if not v or len(v) != 1:
+            raise ValueError(f"exactly one input column is required, got {v}")
+        return v
+
+    def generate(self, samples: pd.DataFrame, **kwargs: Any) -> pd.DataFrame:
+        """Generate a dataset with the split JSON columns.
+
+        Parameters
+        ----------
+        samples : pd.DataFrame
+            Input dataset with a JSON text column.
+
+        Returns
+        -------
+        pd.DataFrame
+            Dataset with one JSON column per key.
+
+        Raises
+        ------
+        ValueError
+            If keys and output_cols differ in length.
+        """
+        if len(self.keys) != len(self.output_cols):
+            raise ValueError(
+                f"keys {self.keys} and output_cols {self.output_cols} must have the same length"
+            )
+
+        def parse(text):
+            try:
+                parsed = json.loads(text)
+            except (TypeError, ValueError):
+                return {}
+            return parsed if isinstance(parsed, dict) else {}
+
+        parsed = [parse(text) for text in samples[self.input_cols[0]]]
+
+        output = samples.copy()
+
+        for key, col in zip(self.keys, self.output_cols):
+            output[col] = [json.dumps(item.get(key, {})) for item in parsed]
+
+        return output
+
+
+@BlockRegistry.register(
+    "CustomImageNormalizationBlock",
+    "transform",
+    "Normalizes and downscales images before they are sent to vision models",
+)
+class CustomImageNormalizationBlock(BaseBlock):
+    """Block that EXIF-rotates, crops, downscales and re-encodes the images referenced in a dataset.
+
+    The output column holds the local path of the normalized image (the input path is kept
+    for sources that are not images). Results are cached on disk by source hash.
+
+    Attributes
+    ----------
+    block_name : str
+        Name of the block.
+    input_cols
+        Column with the image path or URL.
+    output_cols
+        Column receiving the normalized image path.
+    max_edge : int
+        Longest edge of the normalized images, in pixels.
+    image_format : str
+        Output format (JPEG or WEBP).
+    quality : int
+        Encoder quality.
+    crop_to_card : bool
+        Whether to crop images to the card region.
+    cache_dir : str
+        Directory holding the normalized images.
+    max_workers : Optional[int]
+        Size of the process pool; defaults to the number of CPUs.
+    """
+
+    max_edge: int = DEFAULT_MAX_EDGE
+
+    image_format: str = "JPEG"
+
+    quality: int = 80
+
+    crop_to_card: bool = True
+
+    cache_dir: str = "cache/images"
+
+    max_workers: Optional[int] = None
+
+    @field_validator("input_cols", "output_cols", mode="after")
+    @classmethod
+    def validate_single_col(cls, v):
+        """Validate that exactly one column is given."""
+        if not v or len(v) != 1:
+            raise ValueError(f"exactly one column is required, got {v}")
+        return v
+
+    def generate(self, samples: pd.DataFrame, **kwargs: Any) -> pd.DataFrame:
+        """Generate a dataset with the normalized image paths added.
+
+        Parameters
+        ----------
+        samples : pd.DataFrame
+            Input dataset with an image path column.
+
+        Returns
+        -------
+        pd.DataFrame
+            Dataset with the normalized image path column.
+        """
+        normalizer = ImageNormalizer(
+            cache_dir=self.cache_dir,
+            max_edge=self.max_edge,
+            image_format=self.image_format,
+            quality=self.quality,
+            crop=self.crop_to_card,
+            max_workers=self.max_workers,
+        )
+
+        output = samples.copy()
+
+        output[self.output_cols[0]] = normalizer.normalize(samples[self.input_cols[0]].tolist())
+
+        return output
+
+
 @BlockRegistry.register(
     "CustomDeleteColumnsBlock",
     "transform",
@@ -0,0 +1,239 @@
+##############################################################################
+# Image normalization for vision-model requests
+##############################################################################
+from sdg_hub.core.utils.logger_config import setup_logger
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from typing import Optional
+from urllib.parse import urlparse
+import base64
+import hashlib
+import mimetypes
+import os
+logger = setup_logger(__name__)
+
+# Output formats and their MIME types
+IMAGE_FORMATS = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+# Longest edge (in pixels) of a normalized image by default
+DEFAULT_MAX_EDGE = 1280
+
+
+def is_http_url(path: str) -> bool:
+    """Returns whether or not the input is an http(s) URL."""
+    parsed_url = urlparse(path)
+
+    return parsed_url.scheme in ("http", "https") and bool(parsed_url.netloc)
+
+
+def read_image_bytes(path: str) -> bytes:
+    """Reads the bytes of an image from a local path or URL."""
+    if is_http_url(path):
+        from utils import get_http_session
+
+        response = get_http_session().get(path)
+
+        response.raise_for_status()
+
+        return response.content
+
+    with open(urlparse(path).path if path.startswith("file:") else path, "rb") as f:
+        return f.read()
+
+
+def crop_to_card(image, threshold: int = 40, min_fill: float = 0.05, margin: float = 0.02):
+    """Crops an image to the region that stands out from its background (the card on a scan or photo).
+
+    The background colour is taken as the median of the image border. Rows and columns in which
+    more than ``min_fill`` of the pixels differ from it by more than ``threshold`` bound the crop,
+    which is padded by ``margin``. Textured or uneven backgrounds simply yield little or no crop.
+    """
+    import numpy as np
+    from PIL import ImageFilter
+
+    # Work on a small, denoised copy; the box is scaled back to the full image
+    probe = image.convert("RGB")
+    probe.thumbnail((256, 256))
+    probe = np.asarray(probe.filter(ImageFilter.MedianFilter(5)), dtype=np.int16)
+
+    border = np.concatenate([probe[:4].reshape(-1, 3), probe[-4:].reshape(-1, 3),
+                             probe[:, :4].reshape(-1, 3), probe[:, -4:].reshape(-1, 3)])
+    mask = np.abs(probe - np.median(border, axis=0)).max(axis=2) > threshold
+
+    rows = np.flatnonzero(mask.mean(axis=1) > min_fill)
+    cols = np.flatnonzero(mask.mean(axis=0) > min_fill)
+
+    if len(rows) == 0 or len(cols) == 0:
+        return image
+
+    scale_x, scale_y = image.width / mask.shape[1], image.height / mask.shape[0]
+    pad_x, pad_y = margin * image.width, margin * image.height
+
+    return image.crop((max(0, int(cols[0] * scale_x - pad_x)), max(0, int(rows[0] * scale_y - pad_y)),
+                       min(image.width, int((cols[-1] + 1) * scale_x + pad_x)),
+                       min(image.height, int((rows[-1] + 1) * scale_y + pad_y))))
+
+
+def normalize_image_bytes(data: bytes, max_edge: int = DEFAULT_MAX_EDGE, image_format: str = "JPEG",
+                          quality: int = 80, crop: bool = True) -> bytes:
+    """EXIF-rotates, optionally crops to the card, downscales and re-encodes an image.
+
+    Args:
+        data (bytes): The source image.
+        max_edge (int): Longest edge of the output, in pixels.
+        image_format (str): Output format (JPEG or WEBP).
+        quality (int): Encoder quality.
+        crop (bool): Whether to crop to the card region.
+    """
+    from PIL import Image, ImageOps
+
+    image = Image.open(BytesIO(data))
+
+    image = ImageOps.exif_transpose(image).convert("RGB")
+
+    if crop:
+        image = crop_to_card(image)
+
+    image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    output = BytesIO()
+
+    image.save(output, format=image_format, quality=quality, optimize=True)
+
+    return output.getvalue()
+
+
+def to_data_url(path: str) -> str:
+    """Returns a base64 data URL with the content of a local image file."""
+    mime_type, _ = mimetypes.guess_type(path)
+
+    with open(path, "rb") as f:
+        return f"data:{mime_type or 'application/octet-stream'};base64,{base64.b64encode(f.read()).decode('utf-8')}"
+
+
+class ImageNormalizer:
+    """Normalizes images for vision-model requests, caching the results on disk by source hash.
+
+    Sources are downloaded over a thread pool and the misses are normalized over a process
+    pool. Normalized images are stored as ``<cache_dir>/<sha[:2]>/<sha>-<settings>.<ext>``, so a
+    source is only processed once per combination of settings.
+
+    Attributes
+    ----------
+    cache_dir : str
+        Directory holding the normalized images.
+    max_edge : int
+        Longest edge of the normalized images, in pixels.
+    image_format : str
+        Output format (JPEG or WEBP).
+    quality : int
+        Encoder quality.
+    crop : bool
+        Whether to crop photos to the card region.
+    max_workers : Optional[int]
+        Size of the process pool; defaults to the number of CPUs.
+    download_workers : int
+        Number of concurrent downloads.
+    """
+
+    def __init__(self, cache_dir: str = "cache/images", max_edge: int = DEFAULT_MAX_EDGE,
+                 image_format: str = "JPEG", quality: int = 80, crop: bool = True,
+                 max_workers: Optional[int] = None, download_workers: int = 16):
+        image_format = image_format.upper()
+
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"image_format must be one of {sorted(IMAGE_FORMATS)}, got {image_format}")
+
+        if max_edge < 1:
+            raise ValueError(f"max_edge must be greater than 0, got {max_edge}")
+
+        self.cache_dir = cache_dir
+        self.max_edge = max_edge
+        self.image_format = image_format
+        self.quality = quality
+        self.crop = crop
+        self.max_workers = max_workers
+        self.download_workers = download_workers
+
+    def cache_path(self, digest: str) -> str:
+        """Location of the normalized image for a source digest under the current settings."""
+        settings = f"{self.max_edge}-q{self.quality}{'-crop' if self.crop else ''}"
+        extension = "jpg" if self.image_format == "JPEG" else self.image_format.lower()
+
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}-{settings}.{extension}")
+
+    def normalize(self, paths: list) -> list:
+        """Returns the local path of the normalized image for each source path or URL.
+
+        Sources that are not images, or that fail to load or decode, keep their original path.
+        """
+        def fetch(path):
+            """Reads a source image and returns (bytes, digest), or (None, None) if it is skipped."""
+            mime_type, _ = mimetypes.guess_type(urlparse(path).path)
+
+            if not mime_type or not mime_type.startswith("image"):
+                return None, None
+
+            try:
+                data = read_image_bytes(path)
+            except Exception as e:
+                logger.warning("Failed to read image %s: %s", path, str(e))
+                return None, None
+
+            return data, hashlib.sha256(data).hexdigest()
+
+        with ThreadPoolExecutor(max_workers=self.download_workers) as executor:
+            sources = list(executor.map(fetch, paths))
+
+        results = list(paths)
+        misses = {}
+
+        for i, (data, digest) in enumerate(sources):
+            if digest is None:
+                continue
+
+            if os.path.exists(self.cache_path(digest)):
+                results[i] = self.cache_path(digest)
+            else:
+                misses.setdefault(digest, []).append(i)
+
+        if misses:
+            digests = list(misses)
+            first = [sources[misses[digest][0]][0] for digest in digests]
+
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(normalize_image_bytes, data, self.max_edge, self.image_format,
+                                           self.quality, self.crop) for data in first]
+
+                for digest, future in zip(digests, futures):
+                    try:
+                        encoded = future.result()
+                    except Exception as e:
+                        logger.warning("Failed to normalize image %s: %s", paths[misses[digest][0]], str(e))
+                        continue
+
+                    path = self.cache_path(digest)
+
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+                    # Write to a temporary file first so that an interrupted run never leaves a partial image behind
+                    with open(f"{path}.tmp", "wb") as f:
+                        f.write(encoded)
+
+                    os.replace(f"{path}.tmp", path)
+
+                    for i in misses[digest]:
+                        results[i] = path
+
+        normalized = [i for i, (path, source) in enumerate(zip(results, paths)) if path != source]
+
+        logger.info(
+            "Normalized %d/%d images (%d from cache): %.2f MB -> %.2f MB",
+            len(normalized),
+            len(paths),
+            len(normalized) - sum(len(indices) for indices in misses.values() if results[indices[0]] != paths[indices[0]]),
+            sum(len(sources[i][0]) for i in normalized) / 1e6,
+            sum(os.path.getsize(results[i]) for i in normalized) / 1e6,
+        )
+
+        return results
@@ -0,0 +1,320 @@
+##############################################################################
+# Per-block latency, token and cost instrumentation for sdg_hub flows
+##############################################################################
+# Wraps every block of a flow to record wall time and rows in/out, and
+# collects the request metrics reported by the custom LLM blocks (latency,
+# time to first token, tokens, cost, retries, failures, cache hits). Metrics
+# are exported as JSONL and as Prometheus text, and summarized per run.
+#
+# Usage (from the notebooks directory):
+#   python instrumentation.py flows/drivers_license_validation/flow.yaml --data-dir data2 --target-dir reports
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# Quantiles reported for request latency and time to first token
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Instrumentation the custom LLM blocks report their requests to (see FlowInstrumentation.__enter__).
+# A context variable, so that concurrent runs (e.g. the models of a sweep) each report to their own.
+_active: ContextVar[Optional["FlowInstrumentation"]] = ContextVar("flow_instrumentation", default=None)
+
+
+def active_instrumentation() -> Optional["FlowInstrumentation"]:
+    """Returns the instrumentation of the running flow, if any."""
+    return _active.get()
+
+
+def _quantile(values: list, q: float) -> Optional[float]:
+    return float(np.quantile(values, q)) if values else None
+
+
+@dataclass
+class BlockStats:
+    """Metrics of one block over a run."""
+
+    block_name: str
+    block_type: str = ""
+    calls: int = 0
+    wall_seconds: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    requests: int = 0
+    failed_requests: int = 0
+    retries: int = 0
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    latencies: list = field(default_factory=list)
+    ttfts: list = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        """Counters plus latency and TTFT quantiles (the raw samples are left out)."""
+        record = {key: value for key, value in self.__dict__.items() if key not in ("latencies", "ttfts")}
+
+        for q in QUANTILES:
+            record[f"latency_p{int(q * 100)}_s"] = _quantile(self.latencies, q)
+            record[f"ttft_p{int(q * 100)}_s"] = _quantile(self.ttfts, q)
+
+        return record
+
+
+class FlowInstrumentation:
+    """Collects per-block metrics of a flow run.
+
+    Use it as a context manager around the run, after instrumenting the flow::
+
+        with FlowInstrumentation().instrument(flow) as metrics:
+            flow.generate(dataset, max_concurrency=10)
+        print(metrics.summary().to_string())
+
+    Attributes
+    ----------
+    run_id : str
+        Identifies the run in the exported metrics.
+    blocks : dict[str, BlockStats]
+        Metrics by block name, in execution order.
+    """
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        self.blocks: dict = {}
+        self.started: Optional[float] = None
+        self.wall_seconds = 0.0
+        self._lock = threading.Lock()
+        self._originals: dict = {}
+        self._tokens: list = []
+
+    def _stats(self, block_name: str, block_type: str = "") -> BlockStats:
+        stats = self.blocks.get(block_name)
+
+        if stats is None:
+            stats = self.blocks[block_name] = BlockStats(block_name, block_type)
+        elif block_type and not stats.block_type:
+            stats.block_type = block_type
+
+        return stats
+
+    def instrument(self, flow) -> "FlowInstrumentation":
+        """Wraps the generate method of every block of a flow (or list of blocks) to time it."""
+        for block in getattr(flow, "blocks", flow):
+            if id(block) in self._originals:
+                continue
+
+            original = block.generate
+            self._originals[id(block)] = (block, original)
+
+            def generate(samples, *args, _block=block, _original=original, **kwargs):
+                start_time = time.perf_counter()
+                output = _original(samples, *args, **kwargs)
+                self.record_block(_block, time.perf_counter() - start_time, len(samples), len(output))
+                return output
+
+            # Instance attribute: BaseBlock.__call__ resolves self.generate to it; the block's config is untouched
+            object.__setattr__(block, "generate", generate)
+
+            with self._lock:
+                self._stats(block.block_name, type(block).__name__)
+
+        return self
+
+    def uninstrument(self):
+        """Restores the blocks' generate methods."""
+        for block, _ in self._originals.values():
+            block.__dict__.pop("generate", None)
+
+        self._originals.clear()
+
+    def __enter__(self) -> "FlowInstrumentation":
+        self._tokens.append(_active.set(self))
+        self.started = time.perf_counter()
+
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall_seconds += time.perf_counter() - self.started
+
+        _active.reset(self._tokens.pop())
+
+    def record_block(self, block, seconds: float, rows_in: int, rows_out: int):
+        """Records one call of a block."""
+        with self._lock:
+            stats = self._stats(block.block_name, type(block).__name__)
+            stats.calls += 1
+            stats.wall_seconds += seconds
+            stats.rows_in += rows_in
+            stats.rows_out += rows_out
+
+    def record_request(self, block_name: str, latency: float, ttft: Optional[float] = None,
+                       prompt_tokens: int = 0, completion_tokens: int = 0, cost: float = 0.0):
+        """Records a successful model request."""
+        with self._lock:
+            stats = self._stats(block_name)
+            stats.requests += 1
+            stats.latencies.append(latency)
+            if ttft is not None:
+                stats.ttfts.append(ttft)
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cost_usd += cost
+
+    def record_retry(self, block_name: str):
+        with self._lock:
+            self._stats(block_name).retries += 1
+
+    def record_failure(self, block_name: str):
+        with self._lock:
+            self._stats(block_name).failed_requests += 1
+
+    def record_cache_hits(self, block_name: str, hits: int):
+        with self._lock:
+            self._stats(block_name).cache_hits += hits
+
+    def summary(self) -> pd.DataFrame:
+        """Per-block summary table of the run, with each block's share of wall time and cost."""
+        with self._lock:
+            rows = [stats.to_dict() for stats in self.blocks.values()]
+
+        summary = pd.DataFrame(rows).set_index("block_name")
+
+        if summary.empty:
+            return summary
+
+        total_seconds = summary["wall_seconds"].sum()
+        total_cost = summary["cost_usd"].sum()
+
+        summary.insert(2, "wall_share", summary["wall_seconds"] / total_seconds if total_seconds else 0.0)
+        summary["rows_per_second"] = summary["rows_out"] / summary["wall_seconds"].where(summary["wall_seconds"] > 0)
+        summary["cost_share"] = summary["cost_usd"] / total_cost if total_cost else 0.0
+
+        return summary.round(4)
+
+    def to_jsonl(self, path: str):
+        """Appends one JSON record per block, tagged with the run id and time."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        timestamp = datetime.now().isoformat(timespec="seconds")
+
+        with self._lock:
+            records = [stats.to_dict() for stats in self.blocks.values()]
+
+        with open(path, "a") as f:
+            for record in records:
+                f.write(json.dumps({"run_id": self.run_id, "timestamp": timestamp, **record}) + "\n")
+
+    def to_prometheus(self, path: str, prefix: str = "dla_flow"):
+        """Writes the metrics in the Prometheus text exposition format (e.g. for the node_exporter textfile collector)."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        counters = [
+            ("block_wall_seconds_total", "wall_seconds", "Wall time spent in the block."),
+            ("block_rows_in_total", "rows_in", "Rows passed to the block."),
+            ("block_rows_out_total", "rows_out", "Rows returned by the block."),
+            ("llm_requests_total", "requests", "Successful model requests."),
+            ("llm_failed_requests_total", "failed_requests", "Model requests that failed after retries."),
+            ("llm_retries_total", "retries", "Retried model requests."),
+            ("llm_cache_hits_total", "cache_hits", "Samples served from the response cache."),
+            ("llm_prompt_tokens_total", "prompt_tokens", "Prompt tokens."),
+            ("llm_completion_tokens_total", "completion_tokens", "Completion tokens."),
+            ("llm_cost_usd_total", "cost_usd", "Cost reported by LiteLLM, in USD."),
+        ]
+
+        summaries = [
+            ("llm_latency_seconds", "latencies", "Model request latency."),
+            ("llm_ttft_seconds", "ttfts", "Time to first token of streamed model requests."),
+        ]
+
+        with self._lock:
+            blocks = list(self.blocks.values())
+
+        def labels(stats, **extra):
+            pairs = {"run_id": self.run_id, "block": stats.block_name, "block_type": stats.block_type, **extra}
+            return ",".join(f'{key}="{value}"' for key, value in pairs.items())
+
+        lines = []
+
+        for name, attribute, help_text in counters:
+            lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} counter"]
+            lines += [f"{prefix}_{name}{{{labels(stats)}}} {getattr(stats, attribute)}" for stats in blocks]
+
+        for name, attribute, help_text in summaries:
+            lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} summary"]
+            for stats in blocks:
+                values = getattr(stats, attribute)
+                if not values:
+                    continue
+                lines += [f"{prefix}_{name}{{{labels(stats, quantile=q)}}} {_quantile(values, q)}" for q in QUANTILES]
+                lines += [f"{prefix}_{name}_sum{{{labels(stats)}}} {sum(values)}",
+                          f"{prefix}_{name}_count{{{labels(stats)}}} {len(values)}"]
+
+        with open(f"{path}.tmp", "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+        # Replace atomically so that a scraper never reads a partial file
+        os.replace(f"{path}.tmp", path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a flow with per-block instrumentation.")
+
+    parser.add_argument("flow_path")
+
+    parser.add_argument("--data-dir", default="data2")
+
+    parser.add_argument("--model-prefix", default="LLAMASCOUT4", help="Prefix of the <PREFIX>_LLM_* environment variables.")
+
+    parser.add_argument("--max-concurrency", type=int, default=10)
+
+    parser.add_argument("--measure-ttft", action="store_true", help="Stream async responses to measure time to first token.")
+
+    parser.add_argument("--target-dir", default="reports")
+
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    # The blocks report to the instrumentation module they import, not to this script's __main__ copy of it
+    from instrumentation import FlowInstrumentation
+    from utils import load_local_applications
+    from model_sweep import build_flow
+
+    load_dotenv()
+
+    df = load_local_applications(args.data_dir)
+
+    df["model_name"] = os.getenv(f"{args.model_prefix}_LLM_NAME")
+
+    flow = build_flow(args.model_prefix, args.flow_path)
+
+    if args.measure_ttft:
+        for block in flow.blocks:
+            if hasattr(block, "measure_ttft"):
+                block.measure_ttft = True
+
+    with FlowInstrumentation(f"{args.model_prefix}-{datetime.now():%Y%m%d-%H%M%S}").instrument(flow) as metrics:
+        flow.generate(df, max_concurrency=args.max_concurrency)
+
+    metrics.to_jsonl(os.path.join(args.target_dir, "flow_metrics.jsonl"))
+
+    metrics.to_prometheus(os.path.join(args.target_dir, "flow_metrics.prom"))
+
+    print(f"Run {metrics.run_id} completed in {metrics.wall_seconds:.2f}s")
+
+    print(metrics.summary().to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+##############################################################################
+# Content-addressed LLM response cache
+##############################################################################
+try:
+    from sdg_hub.core.utils.logger_config import setup_logger
+except ImportError:
+    from logging import getLogger as setup_logger
+from typing import Any, Optional
+from urllib.parse import urlparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+logger = setup_logger(__name__)
+
+# Completion kwargs that do not change the content of a response
+NON_CONTENT_KWARGS = {"api_key", "api_base", "timeout", "num_retries", "async_mode"}
+
+
+def image_digest(url: str) -> str:
+    """Returns a stable digest for the image referenced by an image_url entry.
+
+    Inline ``data:`` URLs and local files are hashed by content. Remote URLs are
+    hashed by the URL itself, since their content is addressed by path.
+    """
+    if url.startswith("data:"):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    parsed_url = urlparse(url)
+
+    if parsed_url.scheme in ("", "file") and os.path.isfile(parsed_url.path):
+        digest = hashlib.sha256()
+        with open(parsed_url.path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _digest_images(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Returns a copy of messages with every image_url replaced by its digest."""
+    digested = []
+
+    for message in messages:
+        content = message.get("content")
+
+        if isinstance(content, list):
+            parts = []
+            for part in content:
+                if isinstance(part, dict) and part.get("type") == "image_url":
+                    image_url = dict(part["image_url"])
+                    image_url["url"] = f"sha256:{image_digest(image_url['url'])}"
+                    part = {**part, "image_url": image_url}
+                parts.append(part)
+            message = {**message, "content": parts}
+
+        digested.append(message)
+
+    return digested
+
+
+def make_cache_key(
+    messages: list[dict[str, Any]],
+    completion_kwargs: dict[str, Any],
+) -> str:
+    """Builds the cache key for a completion request.
+
+    Parameters
+    ----------
+    messages : list[dict[str, Any]]
+        Messages sent to the model.
+    completion_kwargs : dict[str, Any]
+        Kwargs for LiteLLM completion, including the model name.
+
+    Returns
+    -------
+    str
+        SHA-256 over the model, messages (with image digests) and content-affecting kwargs.
+    """
+    kwargs = {
+        key: value
+        for key, value in completion_kwargs.items()
+        if key not in NON_CONTENT_KWARGS and key != "model"
+    }
+
+    payload = {
+        "model": completion_kwargs.get("model"),
+        "messages": _digest_images(messages),
+        "kwargs": kwargs,
+    }
+
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """Persistent, size-capped LRU cache of LLM responses backed by SQLite.
+
+    Attributes
+    ----------
+    path : str
+        Location of the SQLite database.
+    max_bytes : int
+        Maximum total size of the cached responses. Least recently used entries
+        are evicted once it is exceeded.
+    hits : int
+        Number of lookups served from the cache in this process.
+    misses : int
+        Number of lookups that required a model call in this process.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        if max_bytes < 1:
+            raise ValueError(f"max_bytes must be greater than 0, got {max_bytes}")
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def get(self, key: str) -> Optional[list[dict[str, Any]]]:
+        """Returns the cached response for key, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def put(self, key: str, response: list[dict[str, Any]]) -> None:
+        """Stores a response, evicting least recently used entries beyond max_bytes."""
+        value = json.dumps(response, default=str)
+        size = len(value.encode("utf-8"))
+
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+
+            self._evict()
+            self._conn.commit()
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        """Changes the size limit, evicting least recently used entries beyond it."""
+        if max_bytes < 1:
+            raise ValueError(f"max_bytes must be greater than 0, got {max_bytes}")
+
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 64"
+            ).fetchall()
+
+            if not rows:
+                break
+
+            evicted = []
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                self._total_bytes -= size
+
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        """Returns hit/miss counters and the current size of the cache."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "entries": entries,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self) -> None:
+        """Removes every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._total_bytes = 0
+
+
+_caches: dict[str, ResponseCache] = {}
+
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(path: str, max_bytes: int = 512 * 1024 * 1024) -> ResponseCache:
+    """Returns the process-wide cache for path, so blocks sharing a file share one connection.
+
+    A file has a single size limit: when callers ask for different limits, the smallest one applies.
+    """
+    path = os.path.abspath(path)
+
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(path, max_bytes=max_bytes)
+
+        cache = _caches[path]
+
+        if max_bytes != cache.max_bytes:
+            logger.warning("Response cache %s was opened with max_bytes=%d, now requested with %d; using %d",
+                           path, cache.max_bytes, max_bytes, min(cache.max_bytes, max_bytes))
+            cache.set_max_bytes(min(cache.max_bytes, max_bytes))
+
+        return cache
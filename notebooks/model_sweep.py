@@ -0,0 +1,258 @@
+##############################################################################
+# Concurrent multi-model evaluation sweep
+##############################################################################
+# Ingests the applications once, runs the model-independent head of the flow
+# (image normalization, prompt building) once, then streams the shared frame
+# through every model's LLM stages concurrently. Models served from the same
+# endpoint share one adaptive concurrency limiter, so each endpoint gets its
+# own budget. The sweep takes about as long as the slowest model.
+#
+# Usage (from the notebooks directory):
+#   python model_sweep.py --models LLAMASCOUT4 GEMMA27B GEMMA12B --target-dir reports
+#   python model_sweep.py --data-dir data2 --budget GEMMA12B=4
+import argparse
+import asyncio
+import os
+import time
+import traceback
+from typing import Any, Callable, Optional
+
+import pandas as pd
+
+import utils
+from adaptive_concurrency import AdaptiveConcurrencyLimiter
+from streaming_flow import astream_stages, split_stages
+
+FLOW_PATH = "flows/drivers_license_validation/flow.yaml"
+
+DEFAULT_MODELS = ["LLAMASCOUT4", "GEMMA27B", "GEMMA12B"]
+
+DEFAULT_MAX_CONCURRENCY = 10
+
+
+def ingest_applications(github_repo: Optional[str] = None, github_subfolder: Optional[str] = None,
+                        data_dir: Optional[str] = None, patterns_file_path: str = "patterns.json") -> pd.DataFrame:
+    """Loads the applications once, from a GitHub folder or a local directory, as submitted fields."""
+    if data_dir:
+        return utils.load_local_applications(data_dir, patterns_file_path)
+
+    applications = utils.group_files_by_id(github_repo, github_subfolder)
+
+    return pd.DataFrame(utils.convert_to_submitted_fields(applications, patterns_file_path))
+
+
+def model_config(model_prefix: str) -> dict:
+    """Model settings of a <PREFIX>_LLM_* environment, as used by the notebooks."""
+    return {
+        "model": os.getenv(f"{model_prefix}_LLM_NAME"),
+        "api_base": os.getenv(f"{model_prefix}_LLM_BASE"),
+        "api_key": os.getenv(f"{model_prefix}_LLM_KEY"),
+        "temperature": 0,
+        "max_tokens": 8192,
+        "response_format": {"type": "json_object"},
+        "top_k": 1,
+    }
+
+
+def build_flow(model_prefix: str, flow_path: str = FLOW_PATH):
+    """Loads the flow and configures it for a model."""
+    from sdg_hub.core.flow import Flow
+
+    import flow_extensions  # noqa: F401 (registers the custom blocks)
+
+    flow = Flow.from_yaml(flow_path)
+
+    flow.set_model_config(**model_config(model_prefix))
+
+    return flow
+
+
+def share_endpoint_limiters(flows: dict, budgets: dict):
+    """Gives the LLM blocks of all flows that target the same endpoint one adaptive limiter.
+
+    Args:
+        flows (dict): Flows by model prefix.
+        budgets (dict): Maximum concurrency by model prefix; an endpoint gets the smallest budget of its models.
+
+    Returns the limiter of each model prefix.
+    """
+    limiters = {}
+
+    for model_prefix, flow in flows.items():
+        endpoint = os.getenv(f"{model_prefix}_LLM_BASE") or model_prefix
+
+        limiter = limiters.get(endpoint)
+
+        if limiter is None:
+            limiter = limiters[endpoint] = AdaptiveConcurrencyLimiter(max_limit=budgets[model_prefix])
+        else:
+            limiter.set_max_limit(min(limiter.max_limit, budgets[model_prefix]))
+
+        for block in flow.blocks:
+            if hasattr(block, "astream"):
+                block._limiter = limiter
+
+    return {prefix: limiters[os.getenv(f"{prefix}_LLM_BASE") or prefix] for prefix in flows}
+
+
+async def _run_model(model_prefix: str, flow, df: pd.DataFrame, max_concurrency: int) -> tuple:
+    """Streams the preprocessed frame through one model's LLM stages.
+
+    Returns (frame of the completed applications, [(index, row, block name) of the failed ones]).
+    """
+    _, stages = split_stages(flow.blocks)
+
+    df = df.copy()
+
+    df["model_name"] = os.getenv(f"{model_prefix}_LLM_NAME")
+
+    start_time = time.perf_counter()
+
+    failures = []
+
+    rows = [row async for _, row in astream_stages(stages, df, max_concurrency,
+                                                    on_failure=lambda *failure: failures.append(failure))]
+
+    print(f"{model_prefix}: {len(rows)} applications in {time.perf_counter() - start_time:.2f}s"
+          f" ({len(failures)} failed)")
+
+    return (pd.concat(rows).sort_index() if rows else df.iloc[0:0]), failures
+
+
+async def arun_sweep(df: pd.DataFrame, model_prefixes: list = DEFAULT_MODELS, flow_path: str = FLOW_PATH,
+                     budgets: Optional[dict] = None, default_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                     on_failure: Optional[Callable[[str, Any, pd.DataFrame, str], None]] = None,
+                     on_output: Optional[Callable[[str, pd.DataFrame], None]] = None) -> pd.DataFrame:
+    """Runs the flow for all models concurrently over the same applications.
+
+    Args:
+        df (pd.DataFrame): Submitted application fields (see ingest_applications).
+        model_prefixes (list): Prefixes of the <PREFIX>_LLM_* environment variables.
+        flow_path (str): The flow to run.
+        budgets (dict): Maximum concurrency per model prefix; defaults to default_concurrency.
+        default_concurrency (int): Budget of the models missing from budgets.
+        on_failure: Called with (model prefix, index, row, block name) for each application that
+            failed for a model; the other applications of that model are still returned.
+        on_output: Called with (model prefix, frame of its completed applications) as each model
+            finishes, e.g. to write per-model reports.
+
+    Returns the raw outputs of all models in one frame (one row per completed application and model).
+    """
+    budgets = {prefix: (budgets or {}).get(prefix, default_concurrency) for prefix in model_prefixes}
+
+    flows = {prefix: build_flow(prefix, flow_path) for prefix in model_prefixes}
+
+    share_endpoint_limiters(flows, budgets)
+
+    # The blocks before the first LLM block do not depend on the model: run them once
+    head, _ = split_stages(flows[model_prefixes[0]].blocks)
+
+    start_time = time.perf_counter()
+
+    for block in head:
+        df = await asyncio.to_thread(block, df)
+
+    print(f"Preprocessed {len(df)} applications in {time.perf_counter() - start_time:.2f}s")
+
+    async def run_model(prefix):
+        output, failures = await _run_model(prefix, flows[prefix], df, budgets[prefix])
+
+        if on_output:
+            on_output(prefix, output)
+
+        return output, failures
+
+    results = await asyncio.gather(*(run_model(prefix) for prefix in model_prefixes), return_exceptions=True)
+
+    datasets = []
+
+    for prefix, result in zip(model_prefixes, results):
+
+        # Only errors that stop a whole model's run end up here; failed applications are reported per record
+        if isinstance(result, Exception):
+            print(f"Error occurred while processing with model {prefix}: {result}")
+
+            traceback.print_exception(result)
+
+            continue
+
+        output, failures = result
+
+        if on_failure:
+            for index, row, block_name in failures:
+                on_failure(prefix, index, row, block_name)
+
+        datasets.append(output)
+
+    print(f"Sweep over {len(model_prefixes)} models completed in {time.perf_counter() - start_time:.2f}s")
+
+    return pd.concat(datasets, ignore_index=True) if datasets else pd.DataFrame()
+
+
+def run_sweep(df: pd.DataFrame, model_prefixes: list = DEFAULT_MODELS, flow_path: str = FLOW_PATH,
+              budgets: Optional[dict] = None, default_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+              on_failure: Optional[Callable[[str, Any, pd.DataFrame, str], None]] = None,
+              on_output: Optional[Callable[[str, pd.DataFrame], None]] = None) -> pd.DataFrame:
+    """Runs arun_sweep to completion (see there for the arguments).
+
+    Inside a running event loop (e.g. a Jupyter notebook), await arun_sweep instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(arun_sweep(df, model_prefixes, flow_path, budgets, default_concurrency, on_failure, on_output))
+
+    raise RuntimeError("run_sweep cannot be called from a running event loop; use `await arun_sweep(...)` instead")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the license validation flow for several models concurrently.")
+
+    parser.add_argument("--models", nargs="+", default=DEFAULT_MODELS)
+
+    parser.add_argument("--github-repo", default="https://github.com/agapebondservant/dla_poc")
+
+    parser.add_argument("--github-subfolder", default="notebooks/data2")
+
+    parser.add_argument("--data-dir", default=None, help="Local directory of applications (instead of GitHub).")
+
+    parser.add_argument("--flow-path", default=FLOW_PATH)
+
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY)
+
+    parser.add_argument("--budget", action="append", default=[], metavar="PREFIX=N",
+                        help="Maximum concurrency of one model's endpoint (repeatable).")
+
+    parser.add_argument("--target-dir", default="reports")
+
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    budgets = {prefix: int(n) for prefix, n in (item.split("=", 1) for item in args.budget)}
+
+    df = ingest_applications(args.github_repo, args.github_subfolder, data_dir=args.data_dir)
+
+    failed = []
+
+    combined_df = run_sweep(df, args.models, args.flow_path, budgets, args.max_concurrency,
+                            on_failure=lambda prefix, index, row, block_name: failed.append(
+                                (prefix, row["application_id"].iloc[0], block_name)),
+                            on_output=lambda prefix, output: utils.generate_jsonl_report(output, f"reports_{prefix}"))
+
+    for prefix, application_id, block_name in failed:
+        print(f"{prefix}: application {application_id} failed in {block_name}")
+
+    transformed_df = utils.data_report_prep(combined_df)
+
+    utils.generate_csv_report(transformed_df, args.target_dir)
+
+    utils.generate_jsonl_report(transformed_df, args.target_dir)
+
+    utils.generate_visualizatioms(transformed_df.filter(regex='^eval_|model_name'), args.target_dir, show=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+##############################################################################
+# Parallel PDF to image conversion with docling
+##############################################################################
+# Renders the first page of each application PDF to a PNG next to the license
+# images. Each worker process builds its DocumentConverter once, so model
+# loading is paid per worker rather than per file.
+#
+# Usage:
+#   python pdf_conversion.py data2 --archive-dir pdf2
+import argparse
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+_log = logging.getLogger(__name__)
+
+IMAGE_RESOLUTION_SCALE = 2.0
+
+# Converter of the current worker process, built by _init_worker
+_converter = None
+
+
+def build_converter(images_scale: float = IMAGE_RESOLUTION_SCALE, num_threads: Optional[int] = None):
+    """Returns a DocumentConverter that only renders page images (no OCR, tables or picture crops).
+
+    Args:
+        images_scale (float): Scale at which pages are rendered.
+        num_threads (int): Number of threads the converter's models may use.
+    """
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.images_scale = images_scale
+    pipeline_options.generate_page_images = True
+    pipeline_options.generate_picture_images = False
+    pipeline_options.do_ocr = False
+    pipeline_options.do_table_structure = False
+
+    if num_threads:
+        pipeline_options.accelerator_options.num_threads = num_threads
+
+    return DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+        }
+    )
+
+
+def _init_worker(images_scale: float, num_threads: Optional[int]):
+    """Builds the converter once per worker process."""
+    global _converter
+
+    _converter = build_converter(images_scale, num_threads)
+
+
+def output_path_for(pdf_path: str, output_dir: str) -> str:
+    """Returns the PNG path a PDF is rendered to."""
+    return os.path.join(output_dir, f"{os.path.splitext(os.path.basename(pdf_path))[0]}.png")
+
+
+def is_up_to_date(pdf_path: str, output_path: str) -> bool:
+    """Returns whether the output PNG exists and is newer than the PDF."""
+    return os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(pdf_path)
+
+
+def archive_pdf(pdf_path: str, archive_dir: str):
+    """Moves a PDF to the archive directory."""
+    shutil.move(pdf_path, os.path.join(archive_dir, os.path.basename(pdf_path)))
+
+
+def convert_pdf(pdf_path: str, output_dir: str, page_no: int = 1) -> tuple:
+    """Renders a single page of a PDF to a PNG with the worker's converter.
+
+    Returns (pdf_path, output_path, seconds).
+    """
+    global _converter
+
+    if _converter is None:
+        _converter = build_converter()
+
+    start_time = time.perf_counter()
+
+    # Only the requested page goes through the pipeline
+    conv_res = _converter.convert(pdf_path, page_range=(page_no, page_no))
+
+    page = conv_res.document.pages[page_no]
+
+    output_path = output_path_for(pdf_path, output_dir)
+
+    # Write to a temporary file first so that an interrupted run never leaves a partial image behind
+    with open(f"{output_path}.tmp", "wb") as fp:
+        page.image.pil_image.save(fp, format="PNG")
+
+    os.replace(f"{output_path}.tmp", output_path)
+
+    return pdf_path, output_path, time.perf_counter() - start_time
+
+
+def convert_pdfs(source_dir: str, output_dir: Optional[str] = None, archive_dir: Optional[str] = None,
+                 processes: Optional[int] = None, images_scale: float = IMAGE_RESOLUTION_SCALE,
+                 page_no: int = 1) -> list:
+    """Converts the PDFs of a directory to PNGs in parallel, skipping those already converted.
+
+    Args:
+        source_dir (str): Directory holding the PDFs.
+        output_dir (str): Directory receiving the PNGs; defaults to source_dir.
+        archive_dir (str): If given, converted and up-to-date PDFs are moved there (as the preprocessing notebook does).
+        processes (int): Number of worker processes; defaults to the number of CPUs.
+        images_scale (float): Scale at which pages are rendered.
+        page_no (int): Page to render.
+
+    Returns a list of {"pdf_path", "output_path", "seconds"} dicts for the converted files.
+    """
+    output_dir = output_dir or source_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    if archive_dir:
+        os.makedirs(archive_dir, exist_ok=True)
+
+    pdf_files = sorted(os.path.join(source_dir, f) for f in os.listdir(source_dir) if f.lower().endswith(".pdf"))
+
+    pending = [f for f in pdf_files if not is_up_to_date(f, output_path_for(f, output_dir))]
+
+    _log.info(f"Converting {len(pending)} of {len(pdf_files)} PDFs in {source_dir} "
+              f"({len(pdf_files) - len(pending)} up to date)...")
+
+    # PDFs converted by an earlier run are archived like the ones converted now
+    if archive_dir:
+        for pdf_path in pdf_files:
+            if pdf_path not in pending:
+                archive_pdf(pdf_path, archive_dir)
+
+    if not pending:
+        return []
+
+    processes = min(processes or os.cpu_count() or 1, len(pending))
+
+    # Split the cores between the workers so that their models do not oversubscribe the CPU
+    num_threads = max(1, (os.cpu_count() or 1) // processes)
+
+    results = []
+
+    start_time = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(images_scale, num_threads)) as executor:
+
+        futures = {executor.submit(convert_pdf, f, output_dir, page_no): f for f in pending}
+
+        for future, pdf_path in futures.items():
+
+            try:
+                pdf_path, output_path, seconds = future.result()
+
+            except Exception as e:
+                _log.error(f"Error while converting {pdf_path}: {e}")
+                continue
+
+            if archive_dir:
+                archive_pdf(pdf_path, archive_dir)
+
+            _log.info(f"Conversion of {pdf_path} complete in {seconds:.2f}s.")
+
+            results.append({"pdf_path": pdf_path, "output_path": output_path, "seconds": seconds})
+
+    _log.info(f"Converted {len(results)} PDFs with {processes} workers in {time.perf_counter() - start_time:.2f}s.")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the first page of each PDF in a directory to PNG.")
+    parser.add_argument("source_dir")
+    parser.add_argument("--output-dir")
+    parser.add_argument("--archive-dir")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--images-scale", type=float, default=IMAGE_RESOLUTION_SCALE)
+    parser.add_argument("--page", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    convert_pdfs(args.source_dir, output_dir=args.output_dir, archive_dir=args.archive_dir,
+                 processes=args.processes, images_scale=args.images_scale, page_no=args.page)
+
+
+if __name__ == "__main__":
+    main()
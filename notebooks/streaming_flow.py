@@ -0,0 +1,298 @@
+##############################################################################
+# Streaming (pipelined) execution of sdg_hub flows
+##############################################################################
+# Flow.generate runs each block over the whole batch before the next block
+# starts, so the evaluation stage waits for the slowest extraction. Here every
+# block with an ``astream`` method (the custom LLM blocks) streams its rows as
+# they complete into the blocks that follow, so a record reaches the second
+# LLM stage as soon as its own extraction is done.
+#
+# Usage (from the notebooks directory):
+#   python streaming_flow.py flows/drivers_license_validation/flow.yaml --data-dir data2 --target-dir reports
+import argparse
+import asyncio
+import os
+from typing import Any, AsyncIterator, Callable, Optional
+
+import pandas as pd
+
+try:
+    from sdg_hub.core.utils.logger_config import setup_logger
+except ImportError:
+    from logging import getLogger as setup_logger
+
+logger = setup_logger(__name__)
+
+
+def split_stages(blocks: list) -> tuple:
+    """Splits a flow's blocks into a batch head and streaming stages.
+
+    Returns (head, stages): head holds the blocks before the first streaming block, which run
+    over the whole batch; each stage is (streaming block, [row blocks up to the next streaming block]).
+    """
+    head, stages = [], []
+
+    for block in blocks:
+        if hasattr(block, "astream"):
+            stages.append((block, []))
+        elif stages:
+            stages[-1][1].append(block)
+        else:
+            head.append(block)
+
+    return head, stages
+
+
+def _run_row_blocks(blocks: list, frame: pd.DataFrame, **kwargs: Any) -> tuple:
+    """Runs blocks over a micro-batch of rows, keeping the rows' original index.
+
+    Blocks that drop rows (e.g. a parser dropping a response it cannot parse) act as filters.
+
+    Returns (output frame, dropped), where dropped lists the (index, single-row frame, block name)
+    of the rows a block dropped, as they were passed to that block.
+    """
+    dropped = []
+
+    for block in blocks:
+        if not len(frame):
+            break
+
+        index = frame.index
+        output = block.generate(frame, **kwargs)
+
+        if len(output) != len(frame):
+            # Parser blocks build new frames, so run the rows one by one to tell which ones were dropped
+            outputs = [block.generate(frame.iloc[[position]], **kwargs) for position in range(len(frame))]
+
+            if any(len(row) > 1 for row in outputs):
+                raise ValueError(f"Block {block.block_name} expands rows and cannot be streamed")
+
+            kept = [position for position, row in enumerate(outputs) if len(row)]
+            dropped += [(index[position], frame.iloc[[position]], block.block_name)
+                        for position, row in enumerate(outputs) if not len(row)]
+
+            output = pd.concat([outputs[position] for position in kept]) if kept else output.iloc[0:0]
+            index = index[kept]
+
+        # Parser blocks build new frames; keep the rows addressable by their original index
+        output.index = index
+        frame = output
+
+    return frame, dropped
+
+
+def _report_failure(on_failure: Optional[Callable], index: Any, row: pd.DataFrame, block_name: str, reason: str):
+    """Logs a record that left the stream and passes it to the on_failure callback."""
+    logger.warning("Record %s failed in block %s (%s)", index, block_name, reason)
+
+    if on_failure:
+        on_failure(index, row, block_name)
+
+
+async def _drop_failed(block, records: AsyncIterator, on_failure: Optional[Callable] = None) -> AsyncIterator:
+    """Passes on the rows of a streaming block, except those whose request failed."""
+    async for index, row in records:
+        if hasattr(block, "failed_rows") and block.failed_rows(row).any():
+            _report_failure(on_failure, index, row, block.block_name, "request failed")
+            continue
+
+        yield index, row
+
+
+async def _apply_row_blocks(blocks: list, records: AsyncIterator, on_failure: Optional[Callable] = None,
+                            **kwargs: Any) -> AsyncIterator:
+    """Runs the non-streaming blocks of a stage over the rows as they arrive.
+
+    Rows that arrive while a micro-batch is being processed form the next micro-batch, so under
+    load the per-call overhead of the vectorized blocks is amortized, while a lone row still goes
+    through immediately. Micro-batches are processed off the event loop so requests keep flowing.
+    Rows dropped by a block are reported to on_failure instead of being yielded.
+    """
+    if not blocks:
+        async for index, row in records:
+            yield index, row
+        return
+
+    arrived: asyncio.Queue = asyncio.Queue()
+
+    async def drain():
+        try:
+            async for item in records:
+                await arrived.put(item)
+        finally:
+            await arrived.put(None)
+
+    feeder = asyncio.ensure_future(drain())
+
+    try:
+        done = False
+
+        while not done:
+            batch = [await arrived.get()]
+            while not arrived.empty():
+                batch.append(arrived.get_nowait())
+
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+
+            if not batch:
+                continue
+
+            frame, dropped = await asyncio.to_thread(_run_row_blocks, blocks, pd.concat([row for _, row in batch]),
+                                                     **kwargs)
+
+            for index, row, block_name in dropped:
+                _report_failure(on_failure, index, row, block_name, "dropped by the block")
+
+            for position, index in enumerate(frame.index):
+                yield index, frame.iloc[[position]]
+
+        # Surfaces a failure of the upstream stream
+        await feeder
+    finally:
+        feeder.cancel()
+
+
+async def astream_stages(stages: list, df: pd.DataFrame, max_concurrency: Optional[int] = None,
+                         on_failure: Optional[Callable[[Any, pd.DataFrame, str], None]] = None) -> AsyncIterator:
+    """Streams the rows of a frame through the stages returned by split_stages.
+
+    A record whose request fails, or that a block drops, leaves the stream: it is logged and
+    passed to ``on_failure(index, row, block_name)`` rather than failing the other records.
+    """
+    kwargs = {"_flow_max_concurrency": max_concurrency} if max_concurrency is not None else {}
+
+    if not stages:
+        for position in range(len(df)):
+            yield df.index[position], df.iloc[[position]]
+        return
+
+    records = df
+
+    for block, row_blocks in stages:
+        records = _drop_failed(block, block.astream(records, **kwargs), on_failure)
+        records = _apply_row_blocks(row_blocks, records, on_failure, **kwargs)
+
+    async for index, row in records:
+        yield index, row
+
+
+async def astream_flow(flow, dataset: Any, max_concurrency: Optional[int] = None,
+                       on_failure: Optional[Callable[[Any, pd.DataFrame, str], None]] = None) -> AsyncIterator:
+    """Runs a flow and yields (original index, single-row frame) pairs as records finish.
+
+    Args:
+        flow: sdg_hub Flow with its model configured.
+        dataset: pd.DataFrame or datasets.Dataset with the flow's input columns.
+        max_concurrency: Per-block limit of in-flight requests (the adaptive limit never exceeds it).
+        on_failure: Called with (index, row, block name) for each record that fails (see astream_stages).
+    """
+    df = dataset.to_pandas() if hasattr(dataset, "to_pandas") else dataset
+
+    head, stages = split_stages(flow.blocks)
+
+    for block in head:
+        df = block(df, **({"_flow_max_concurrency": max_concurrency} if max_concurrency is not None else {}))
+
+    async for index, row in astream_stages(stages, df, max_concurrency, on_failure):
+        yield index, row
+
+
+async def arun_streaming(flow, dataset: Any, max_concurrency: Optional[int] = None,
+                         on_record: Optional[Callable[[Any, pd.DataFrame], None]] = None,
+                         on_failure: Optional[Callable[[Any, pd.DataFrame, str], None]] = None) -> pd.DataFrame:
+    """Runs astream_flow to completion and returns the completed rows in their original order.
+
+    Args:
+        on_record: Called with (index, row) as each record finishes, e.g. to write it out.
+        on_failure: Called with (index, row, block name) for each record that fails.
+    """
+    rows = []
+
+    async for index, row in astream_flow(flow, dataset, max_concurrency, on_failure):
+        if on_record:
+            on_record(index, row)
+        rows.append(row)
+
+    return pd.concat(rows).sort_index() if rows else pd.DataFrame()
+
+
+def run_streaming(flow, dataset: Any, max_concurrency: Optional[int] = None,
+                  on_record: Optional[Callable[[Any, pd.DataFrame], None]] = None,
+                  on_failure: Optional[Callable[[Any, pd.DataFrame, str], None]] = None) -> pd.DataFrame:
+    """Runs arun_streaming to completion (see there for the arguments).
+
+    Inside a running event loop (e.g. a Jupyter notebook), await arun_streaming instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(arun_streaming(flow, dataset, max_concurrency, on_record, on_failure))
+
+    raise RuntimeError("run_streaming cannot be called from a running event loop; "
+                       "use `await arun_streaming(...)` instead")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a flow with records streamed between its LLM stages.")
+
+    parser.add_argument("flow_path")
+
+    parser.add_argument("--data-dir", default="data2")
+
+    parser.add_argument("--model-prefix", default="LLAMASCOUT4", help="Prefix of the <PREFIX>_LLM_* environment variables.")
+
+    parser.add_argument("--max-concurrency", type=int, default=10)
+
+    parser.add_argument("--target-dir", default="reports")
+
+    parser.add_argument("--formats", nargs="+", default=["jsonl"], choices=["csv", "jsonl", "parquet"])
+
+    args = parser.parse_args()
+
+    import time
+
+    from dotenv import load_dotenv
+    from sdg_hub.core.flow import Flow
+
+    import flow_extensions  # noqa: F401 (registers the custom blocks)
+    from utils import StreamingReportSink, load_local_applications
+
+    load_dotenv()
+
+    df = load_local_applications(args.data_dir)
+
+    df["model_name"] = os.getenv(f"{args.model_prefix}_LLM_NAME")
+
+    flow = Flow.from_yaml(args.flow_path)
+
+    flow.set_model_config(
+        model=os.getenv(f"{args.model_prefix}_LLM_NAME"),
+        api_base=os.getenv(f"{args.model_prefix}_LLM_BASE"),
+        api_key=os.getenv(f"{args.model_prefix}_LLM_KEY"),
+        temperature=0,
+        max_tokens=8192,
+        response_format={"type": "json_object"},
+        top_k=1,
+    )
+
+    start_time = time.perf_counter()
+
+    with StreamingReportSink(args.target_dir, formats=args.formats) as sink:
+
+        def write(index, row):
+            sink.write(row)
+            print(f"{time.perf_counter() - start_time:7.2f}s  {row.iloc[0].get('application_id', index)}")
+
+        failed = []
+
+        output = run_streaming(flow, df, args.max_concurrency, on_record=write,
+                               on_failure=lambda index, row, block_name: failed.append(index))
+
+    print(f"Processed {len(output)}/{len(df)} applications ({len(failed)} failed) in "
+          f"{time.perf_counter() - start_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
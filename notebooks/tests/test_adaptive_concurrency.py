@@ -0,0 +1,198 @@
+import asyncio
+import random
+
+import pytest
+
+from adaptive_concurrency import (AdaptiveConcurrencyLimiter, backoff_delay, error_status, is_overload,
+                                  is_retryable)
+
+
+class StatusError(Exception):
+
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class ResponseError(Exception):
+
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.response = type("Response", (), {"status_code": status_code})()
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+def saturate(limiter: AdaptiveConcurrencyLimiter):
+    """Marks every slot as in use, so that successes count towards an increase."""
+    limiter.in_flight = limiter.limit
+
+
+def test_error_status():
+    assert error_status(StatusError(429)) == 429
+    assert error_status(ResponseError(503)) == 503
+    assert error_status(StatusError("429")) is None
+    assert error_status(ValueError("boom")) is None
+
+
+@pytest.mark.parametrize("error, overload", [
+    (StatusError(429), True),
+    (StatusError(500), True),
+    (ResponseError(503), True),
+    (StatusError(400), False),
+    (StatusError(404), False),
+    (ValueError("boom"), False),
+])
+def test_is_overload(error, overload):
+    assert is_overload(error) is overload
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (StatusError(429), True),
+    (StatusError(502), True),
+    (RateLimitError("slow down"), True),
+    (APIConnectionError("reset"), True),
+    (StatusError(400), False),
+    (StatusError(401), False),
+    (ValueError("bad request"), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_backoff_delay_is_bounded_and_capped():
+    random.seed(0)
+
+    for attempt in range(8):
+        delays = [backoff_delay(attempt, 1.0, 30.0) for _ in range(200)]
+        assert all(0 <= delay <= min(30.0, 2 ** attempt) for delay in delays)
+
+    # Full jitter: the delays spread over the whole window rather than clustering at its end
+    delays = [backoff_delay(3, 1.0, 30.0) for _ in range(1000)]
+    assert min(delays) < 1.0 and max(delays) > 7.0
+
+
+def test_limit_is_clamped():
+    assert AdaptiveConcurrencyLimiter(max_limit=8).limit == 8
+    assert AdaptiveConcurrencyLimiter(max_limit=8, initial_limit=20).limit == 8
+    assert AdaptiveConcurrencyLimiter(max_limit=8, initial_limit=2, min_limit=4).limit == 4
+
+    with pytest.raises(ValueError):
+        AdaptiveConcurrencyLimiter(max_limit=0)
+
+
+def test_additive_increase_when_saturated():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=10, initial_limit=4)
+
+    # One step per `limit` successes
+    for _ in range(4):
+        saturate(limiter)
+        limiter.on_success(0.1)
+    assert limiter.limit == 5
+
+    for _ in range(5):
+        saturate(limiter)
+        limiter.on_success(0.1)
+    assert limiter.limit == 6
+
+
+def test_no_increase_when_not_saturated_or_at_max():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=10, initial_limit=4)
+
+    for _ in range(50):
+        limiter.on_success(0.1)
+    assert limiter.limit == 4
+
+    limiter = AdaptiveConcurrencyLimiter(max_limit=3)
+
+    for _ in range(50):
+        saturate(limiter)
+        limiter.on_success(0.1)
+    assert limiter.limit == 3
+
+
+def test_multiplicative_decrease_on_overload():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=16, min_limit=3)
+
+    limiter.on_overload()
+    assert limiter.limit == 8
+    assert limiter.overloads == 1 and limiter.decreases == 1
+
+    limiter._last_decrease = 0.0
+    limiter.on_overload()
+    limiter._last_decrease = 0.0
+    limiter.on_overload()
+    assert limiter.limit == 3
+
+
+def test_overload_burst_decreases_once():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=16)
+    limiter.on_success(60.0)
+
+    # Decreases are spaced by the recent latency, so a burst of 429s halves the limit once
+    for _ in range(5):
+        limiter.on_overload()
+
+    assert limiter.limit == 8
+    assert limiter.overloads == 5 and limiter.decreases == 1
+
+
+def test_decrease_on_latency_growth():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=16, latency_tolerance=2.0)
+
+    for _ in range(20):
+        limiter.on_success(0.1)
+    assert limiter.limit == 16
+
+    for _ in range(10):
+        limiter.on_success(2.0)
+    assert limiter.limit == 8
+
+
+def test_set_max_limit_lowers_the_limit():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=16, min_limit=8)
+
+    limiter.set_max_limit(4)
+
+    assert (limiter.limit, limiter.max_limit, limiter.min_limit) == (4, 4, 4)
+
+
+def test_acquire_waits_for_a_free_slot():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=2)
+
+    async def run():
+        await limiter.acquire()
+        await limiter.acquire()
+
+        third = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert not third.done() and limiter.waiting == 1
+
+        await limiter.release()
+        await asyncio.wait_for(third, 1)
+        assert limiter.in_flight == 2 and limiter.waiting == 0
+
+    asyncio.run(run())
+
+
+def test_limiter_serves_successive_event_loops():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=2)
+
+    async def request():
+        async with limiter:
+            await asyncio.sleep(0)
+        limiter.on_success(0.1)
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(5)))
+
+    asyncio.run(run())
+    asyncio.run(run())
+
+    assert limiter.successes == 10 and limiter.in_flight == 0
@@ -0,0 +1,120 @@
+import asyncio
+import types
+
+import pandas as pd
+import pytest
+
+from checkpointing import CheckpointStore, arun_with_checkpoints, is_failed, run_with_checkpoints
+
+
+class PrepareBlock:
+    """A batch block that adds a prompt column."""
+
+    block_name = "prepare"
+    output_cols = ["prompt"]
+
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, samples, **kwargs):
+        self.seen += samples["application_id"].tolist()
+        return samples.assign(prompt=samples["application_id"].map(lambda application_id: f"extract {application_id}"))
+
+
+class ExtractBlock:
+    """A streaming LLM block whose requests fail for the applications in `failing`."""
+
+    block_name = "extract"
+    output_cols = ["extracted_data"]
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.seen = []
+
+    async def astream(self, samples, **kwargs):
+        for index in reversed(samples.index):
+            row = samples.loc[[index]].copy()
+            application_id = row["application_id"].iloc[0]
+            self.seen.append(application_id)
+            await asyncio.sleep(0)
+            row["extracted_data"] = ([[{"error": "overloaded"}]] if application_id in self.failing
+                                     else [f'{{"id": "{application_id}"}}'])
+            yield index, row
+
+
+def make_flow(failing=()):
+    return types.SimpleNamespace(blocks=[PrepareBlock(), ExtractBlock(failing)])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+
+
+DATASET = pd.DataFrame({"application_id": ["a", "b", "c", "d"]})
+
+
+def test_is_failed():
+    assert is_failed({"out": [{"error": "boom"}]}, ["out"])
+    assert not is_failed({"out": [{"content": "ok"}]}, ["out"])
+    assert not is_failed({"out": "text"}, ["out", "missing"])
+
+
+def test_resume_runs_only_the_unfinished_slice(store):
+    flow = make_flow(failing={"c"})
+    output = run_with_checkpoints(flow, DATASET, store, "run")
+
+    assert output["application_id"].tolist() == ["a", "b", "d"]
+    assert store.stats("run") == {"prepare": 4, "extract": 3}
+
+    # The failed application resumes after the block it completed
+    flow = make_flow()
+    output = run_with_checkpoints(flow, DATASET, store, "run")
+
+    assert flow.blocks[0].seen == [] and flow.blocks[1].seen == ["c"]
+    assert output["application_id"].tolist() == ["a", "b", "c", "d"]
+    assert output["extracted_data"].tolist() == [f'{{"id": "{application_id}"}}' for application_id in "abcd"]
+
+    # A completed run is served from the store
+    flow = make_flow()
+    assert run_with_checkpoints(flow, DATASET, store, "run").equals(output)
+    assert flow.blocks[0].seen == [] and flow.blocks[1].seen == []
+
+    # Another run id starts over
+    flow = make_flow()
+    run_with_checkpoints(flow, DATASET, store, "other")
+    assert len(flow.blocks[1].seen) == 4
+
+
+def test_new_applications_join_a_finished_run(store):
+    run_with_checkpoints(make_flow(), DATASET.iloc[:2], store, "run")
+
+    flow = make_flow()
+    output = run_with_checkpoints(flow, DATASET, store, "run")
+
+    assert sorted(flow.blocks[0].seen) == ["c", "d"]
+    assert output["application_id"].tolist() == ["a", "b", "c", "d"]
+
+
+def test_latest_checkpoint_wins(store):
+    store.append("run", "extract", [{"application_id": "a", "extracted_data": "first"}])
+    store.append("run", "extract", [{"application_id": 1, "extracted_data": "other"},
+                                    {"application_id": "a", "extracted_data": "second"}])
+
+    assert store.load("run", "extract", ["a"]) == [{"application_id": "a", "extracted_data": "second"}]
+    assert store.completed("run") == {"extract": {"a", "1"}}
+
+
+def test_duplicate_application_ids_are_rejected(store):
+    with pytest.raises(ValueError):
+        run_with_checkpoints(make_flow(), pd.DataFrame({"application_id": ["a", "a"]}), store, "run")
+
+
+def test_running_event_loop_needs_the_async_variant(store):
+    async def notebook():
+        with pytest.raises(RuntimeError, match="arun_with_checkpoints"):
+            run_with_checkpoints(make_flow(), DATASET, store, "run")
+
+        return await arun_with_checkpoints(make_flow(), DATASET, store, "run")
+
+    assert asyncio.run(notebook())["application_id"].tolist() == ["a", "b", "c", "d"]
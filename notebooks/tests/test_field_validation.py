@@ -0,0 +1,76 @@
+import json
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from field_validation import (EVALUATED_FIELDS, INVALID, NEEDS_REVIEW, VALID, name_verdict, normalize_name,
+                              normalize_text, validate_fields)
+
+REFERENCE_DATE = date(2026, 1, 1)
+
+SUBMITTED = {"name": "Jane Q Doe", "date_of_birth": "1990-02-03", "expiration_date": "2030-02-03",
+             "state_issued": "CO", "dl_number": "12-345-678"}
+
+EXTRACTED = {"name": "DOE, JANE Q", "date_of_birth": "02/03/1990", "expiration_date": "02/03/2030",
+             "state_issued": "Colorado", "dl_number": "12345678"}
+
+
+def verdicts(submitted: dict = None, extracted: dict = None) -> dict:
+    """Validates one application, with fields of the matching application replaced."""
+    samples = pd.DataFrame([{**SUBMITTED, **(submitted or {}),
+                             "extracted_data": json.dumps({**EXTRACTED, **(extracted or {})})}])
+
+    return validate_fields(samples, reference_date=REFERENCE_DATE).iloc[0].to_dict()
+
+
+def test_matching_application_is_valid():
+    assert verdicts() == {field: VALID for field in EVALUATED_FIELDS}
+
+
+@pytest.mark.parametrize("value", [None, "", "  ", "Not visible", "N/A", "unknown", "cannot read"])
+@pytest.mark.parametrize("field", EVALUATED_FIELDS)
+def test_missing_values_need_review(field, value):
+    assert verdicts(extracted={field: value})[field] == NEEDS_REVIEW
+    assert verdicts(submitted={field: value})[field] == NEEDS_REVIEW
+
+
+def test_missing_value_markers_match_whole_words():
+    assert normalize_text(pd.Series(["Cannotti", "Unknownson", "cannot"])).tolist()[:2] == ["CANNOTTI", "UNKNOWNSON"]
+    assert verdicts(submitted={"name": "Jane Unknownson"}, extracted={"name": "Jane Unknownson"})["name"] == VALID
+
+
+@pytest.mark.parametrize("submitted, extracted, verdict", [
+    ("Jane Doe", "DOE, JANE", VALID),
+    ("Jane Doe", "Jane Q. Doe", NEEDS_REVIEW),
+    ("Jane Doe", "Jane Dae", NEEDS_REVIEW),
+    ("Jane Doe", "John Smith", INVALID),
+])
+def test_name_verdicts(submitted, extracted, verdict):
+    assert name_verdict(normalize_name(submitted.upper()), normalize_name(extracted.upper())) == verdict
+
+
+def test_date_verdicts():
+    assert verdicts(extracted={"date_of_birth": "1990-03-02"})["date_of_birth"] == NEEDS_REVIEW
+    assert verdicts(extracted={"date_of_birth": "1991-02-03"})["date_of_birth"] == INVALID
+
+    # An expired license is INVALID even when the dates match
+    expired = verdicts(submitted={"expiration_date": "2025-02-03"}, extracted={"expiration_date": "2025-02-03"})
+    assert expired["expiration_date"] == INVALID
+
+
+def test_state_and_license_number_verdicts():
+    assert verdicts(submitted={"state_issued": "Colo."})["state_issued"] == VALID
+    assert verdicts(extracted={"state_issued": "Utah"})["state_issued"] == INVALID
+    assert verdicts(submitted={"state_issued": "Utah"})["state_issued"] == INVALID
+
+    assert verdicts(extracted={"dl_number": "12345679"})["dl_number"] == NEEDS_REVIEW
+    assert verdicts(extracted={"dl_number": "99999999"})["dl_number"] == INVALID
+
+
+def test_unparseable_extracted_data_needs_review():
+    samples = pd.DataFrame([{**SUBMITTED, "extracted_data": "not json"}, {**SUBMITTED, "extracted_data": None}])
+
+    result = validate_fields(samples, reference_date=REFERENCE_DATE)
+
+    assert (result == NEEDS_REVIEW).all().all()
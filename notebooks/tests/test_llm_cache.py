@@ -0,0 +1,95 @@
+import itertools
+
+import pytest
+
+import llm_cache
+from llm_cache import ResponseCache, get_response_cache, image_digest, make_cache_key
+
+MESSAGES = [{"role": "user", "content": [{"type": "text", "text": "Extract the license fields."},
+                                         {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}}]}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Makes every cache access happen one second after the previous one, so LRU order is deterministic."""
+    ticks = itertools.count(1)
+    monkeypatch.setattr(llm_cache.time, "time", lambda: float(next(ticks)))
+
+
+def test_cache_key_ignores_transport_kwargs():
+    key = make_cache_key(MESSAGES, {"model": "m", "temperature": 0, "api_key": "a", "timeout": 10})
+
+    assert key == make_cache_key(MESSAGES, {"model": "m", "temperature": 0, "api_key": "b", "num_retries": 0})
+    assert key != make_cache_key(MESSAGES, {"model": "m", "temperature": 0.5})
+    assert key != make_cache_key(MESSAGES, {"model": "other", "temperature": 0})
+
+
+def test_cache_key_depends_on_image_content(tmp_path):
+    first, second = tmp_path / "first.png", tmp_path / "second.png"
+    first.write_bytes(b"first")
+    second.write_bytes(b"first")
+
+    # Local files are addressed by content, not by path
+    assert image_digest(str(first)) == image_digest(str(second)) == image_digest(f"file://{second}")
+
+    second.write_bytes(b"second")
+    assert image_digest(str(first)) != image_digest(str(second))
+
+    def messages(path):
+        return [{"role": "user", "content": [{"type": "image_url", "image_url": {"url": str(path)}}]}]
+
+    assert make_cache_key(messages(first), {"model": "m"}) != make_cache_key(messages(second), {"model": "m"})
+
+
+def test_get_and_put_round_trip(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    response = [{"content": '{"name": "JANE DOE"}', "role": "assistant"}]
+
+    assert cache.get("key") is None
+    cache.put("key", response)
+    assert cache.get("key") == response
+
+    assert (cache.hits, cache.misses, cache.hit_rate) == (1, 1, 0.5)
+
+    # Entries persist across connections
+    assert ResponseCache(str(tmp_path / "cache.sqlite")).get("key") == response
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=120)
+    response = [{"content": "x" * 20}]
+
+    for key in ("a", "b", "c"):
+        cache.put(key, response)
+
+    cache.get("a")
+    cache.put("d", response)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in ("a", "c", "d"))
+    assert cache.stats()["size_bytes"] <= 120
+
+
+def test_oversized_responses_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=10)
+
+    cache.put("key", [{"content": "x" * 20}])
+
+    assert cache.get("key") is None
+
+    with pytest.raises(ValueError):
+        ResponseCache(str(tmp_path / "other.sqlite"), max_bytes=0)
+
+
+def test_shared_cache_applies_the_smallest_limit(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    cache = get_response_cache(path, max_bytes=1000)
+
+    for key in "abcdef":
+        cache.put(key, [{"content": "x" * 20}])
+
+    assert get_response_cache(path, max_bytes=100) is cache
+    assert cache.max_bytes == 100 and cache.stats()["size_bytes"] <= 100
+    assert cache.get("a") is None and cache.get("f") is not None
+
+    assert get_response_cache(path, max_bytes=5000).max_bytes == 100
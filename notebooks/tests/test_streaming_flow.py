@@ -0,0 +1,130 @@
+import asyncio
+import types
+
+import pandas as pd
+import pytest
+
+from streaming_flow import _run_row_blocks, arun_streaming, run_streaming, split_stages
+
+
+def is_error(value) -> bool:
+    return isinstance(value, list) and bool(value) and isinstance(value[0], dict) and bool(value[0].get("error"))
+
+
+class LLMBlock:
+    """A streaming block that answers rows in reverse order and fails the requests of `failing`."""
+
+    def __init__(self, block_name, output_col, failing=()):
+        self.block_name = block_name
+        self.output_col = output_col
+        self.failing = set(failing)
+        self.seen = []
+
+    async def astream(self, samples, **kwargs):
+        rows = [(index, row) async for index, row in aiter_rows(samples)]
+
+        for index, row in reversed(rows):
+            row = row.copy()
+            self.seen.append(row["application_id"].iloc[0])
+            await asyncio.sleep(0)
+            row[self.output_col] = [[{"error": "overloaded"}]] if row["application_id"].iloc[0] in self.failing \
+                else [f"{self.output_col} of {row['application_id'].iloc[0]}"]
+            yield index, row
+
+    def failed_rows(self, samples):
+        return samples[self.output_col].map(is_error)
+
+
+async def aiter_rows(samples):
+    """Iterates over a frame, or the (index, row) stream of a previous stage."""
+    if isinstance(samples, pd.DataFrame):
+        for position in range(len(samples)):
+            yield samples.index[position], samples.iloc[[position]]
+    else:
+        async for item in samples:
+            yield item
+
+
+class ParserBlock:
+    """A row block that builds a new frame and drops the rows it cannot parse."""
+
+    def __init__(self, block_name, unparseable=()):
+        self.block_name = block_name
+        self.unparseable = set(unparseable)
+
+    def generate(self, samples, **kwargs):
+        kept = samples[~samples["application_id"].isin(self.unparseable)]
+        return kept.assign(parsed=True).reset_index(drop=True)
+
+
+class UpperBlock:
+    """A head block that runs over the whole batch."""
+
+    block_name = "upper"
+
+    def __call__(self, samples, **kwargs):
+        return samples.assign(name=samples["name"].str.upper())
+
+
+DATASET = pd.DataFrame({"application_id": list("abcdef"), "name": list("uvwxyz")})
+
+
+def test_split_stages():
+    head, extract, parse, evaluate = UpperBlock(), LLMBlock("extract", "x"), ParserBlock("parse"), LLMBlock("eval", "e")
+
+    assert split_stages([head, extract, parse, evaluate]) == ([head], [(extract, [parse]), (evaluate, [])])
+    assert split_stages([head]) == ([head], [])
+
+
+def test_failed_records_leave_the_stream():
+    extract = LLMBlock("extract", "extracted_data", failing={"b"})
+    evaluate = LLMBlock("evaluate", "eval_data", failing={"e"})
+    flow = types.SimpleNamespace(blocks=[UpperBlock(), extract, ParserBlock("parse", unparseable={"c"}), evaluate])
+    records, failures = [], []
+
+    output = run_streaming(flow, DATASET, 2, on_record=lambda index, row: records.append(index),
+                           on_failure=lambda index, row, block_name: failures.append((index, block_name)))
+
+    assert output["application_id"].tolist() == ["a", "d", "f"]
+    assert output.index.tolist() == [0, 3, 5]
+    assert output["name"].tolist() == ["U", "X", "Z"]
+    assert output["eval_data"].tolist() == ["eval_data of a", "eval_data of d", "eval_data of f"]
+
+    assert sorted(records) == [0, 3, 5]
+    assert sorted(failures) == [(1, "extract"), (2, "parse"), (4, "evaluate")]
+
+    # Records that failed a stage never reach the next one
+    assert sorted(evaluate.seen) == ["a", "d", "e", "f"]
+
+
+def test_row_blocks_report_the_rows_they_drop():
+    frame = DATASET.iloc[[1, 3, 4]]
+
+    output, dropped = _run_row_blocks([ParserBlock("parse", unparseable={"d"})], frame)
+
+    assert output.index.tolist() == [1, 4]
+    assert [(index, row["application_id"].iloc[0], block_name) for index, row, block_name in dropped] == [
+        (3, "d", "parse")]
+
+
+def test_row_blocks_that_expand_rows_are_rejected():
+    class ExpandBlock:
+        block_name = "expand"
+
+        def generate(self, samples, **kwargs):
+            return pd.concat([samples, samples])
+
+    with pytest.raises(ValueError, match="expand"):
+        _run_row_blocks([ExpandBlock()], DATASET.iloc[:2])
+
+
+def test_running_event_loop_needs_the_async_variant():
+    flow = types.SimpleNamespace(blocks=[LLMBlock("extract", "extracted_data")])
+
+    async def notebook():
+        with pytest.raises(RuntimeError, match="arun_streaming"):
+            run_streaming(flow, DATASET)
+
+        return await arun_streaming(flow, DATASET)
+
+    assert asyncio.run(notebook())["application_id"].tolist() == list("abcdef")
@@ -0,0 +1,195 @@
+import glob
+import gzip
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import utils
+from field_validation import NEEDS_REVIEW, VALID, VERDICTS
+from utils import JsonPathExtractor, get_jsonpath_match, load_file_as_json
+
+NOTEBOOKS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATTERNS = load_file_as_json(os.path.join(NOTEBOOKS_DIR, "patterns.json"))
+
+
+@pytest.mark.parametrize("content", [
+    {"data": [{"name": "JANE DOE", "id": "04SUF", "dob": "01/02/1990", "state": "CO"}]},
+    {"data": [{"name": None, "id": 7}]},
+    {"data": []},
+    {"data": {"name": "not a list"}},
+    {"data": [["nested"]]},
+    {},
+])
+def test_simple_paths_match_jsonpath_ng(content):
+    extracted = JsonPathExtractor(PATTERNS).extract(content)
+
+    assert extracted == {key: get_jsonpath_match(content, expression) for key, expression in PATTERNS.items()}
+
+
+def test_sample_applications_match_jsonpath_ng():
+    extractor = JsonPathExtractor.from_file(os.path.join(NOTEBOOKS_DIR, "patterns.json"))
+
+    paths = sorted(glob.glob(os.path.join(NOTEBOOKS_DIR, "data2", "*.json")))
+    assert paths
+
+    for path in paths:
+        content = load_file_as_json(path)
+        assert extractor.extract(content) == {key: get_jsonpath_match(content, expression)
+                                              for key, expression in PATTERNS.items()}
+
+
+def test_other_expressions_go_through_jsonpath_ng():
+    extractor = JsonPathExtractor({"first": "$.data[0].name", "any": "$..dl", "missing": "$.data[*].nope"})
+
+    assert isinstance(extractor._compiled["first"], tuple)
+    assert not isinstance(extractor._compiled["any"], tuple)
+
+    content = {"data": [{"name": "JANE DOE", "dl": "123"}, {"dl": "456"}]}
+    assert extractor.extract(content) == {"first": "JANE DOE", "any": "123", "missing": None}
+
+
+def test_extract_applications_is_lazy():
+    extractor = JsonPathExtractor({"name": "$.data[0].name"})
+    consumed = []
+
+    def applications():
+        for application_id in ("a", "b"):
+            consumed.append(application_id)
+            yield {"application_id": application_id, "image_path": f"{application_id}.png",
+                   "application_data": {"data": [{"name": application_id.upper()}]}}
+
+    submitted = extractor.extract_applications(applications())
+    assert consumed == []
+
+    assert next(submitted) == {"application_id": "a", "image_path": "a.png", "name": "A"}
+    assert consumed == ["a"]
+
+
+def json_normalize_report_prep(data: pd.DataFrame) -> pd.DataFrame:
+    """The json_normalize implementation data_report_prep replaced, as the reference for its output."""
+    def parse(value):
+        try:
+            parsed = json.loads(value)
+        except (TypeError, ValueError):
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
+
+    extracted = pd.json_normalize(data["extracted_data"].map(parse).tolist()).add_prefix("extracted_")
+    evaluated = pd.json_normalize(data["eval_data"].map(parse).tolist()).add_prefix("eval_")
+
+    return (data.drop(columns=["extracted_data", "eval_data"]).reset_index(drop=True)
+            .join(extracted).join(evaluated))
+
+
+def report_frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        "application_id": ["a", "b", "c", "d"],
+        "model_name": ["m1", "m1", "m2", "m2"],
+        "extracted_data": [json.dumps({"name": "JANE DOE", "address": {"city": "Denver", "zip": "80202"}}),
+                           json.dumps({"name": "JOHN ROE", "dl_number": "123"}),
+                           "not json",
+                           json.dumps(["a list"])],
+        "eval_data": [json.dumps({"name": "VALID", "dl_number": "NEEDS_REVIEW"}),
+                      json.dumps({"name": "INVALID", "dl_number": "VALID", "notes": "blurry"}),
+                      json.dumps({"name": "NEEDS_REVIEW"}),
+                      None],
+    })
+
+
+def test_data_report_prep_matches_json_normalize():
+    data = report_frame()
+
+    prepared = utils.data_report_prep(data)
+    expected = json_normalize_report_prep(data)
+
+    assert sorted(prepared.columns) == sorted(expected.columns)
+
+    for col in expected.columns:
+        assert prepared[col].astype(object).where(prepared[col].notna(), None).tolist() == \
+            expected[col].astype(object).where(expected[col].notna(), None).tolist(), col
+
+
+def test_data_report_prep_makes_verdict_columns_categorical():
+    data = report_frame()
+    data.loc[0, "eval_data"] = json.dumps({"name": "valid", "dl_number": "needs review"})
+
+    prepared = utils.data_report_prep(data)
+
+    assert isinstance(prepared["eval_name"].dtype, pd.CategoricalDtype)
+    assert list(prepared["eval_name"].cat.categories) == VERDICTS
+
+    # Verdicts are normalized; columns with other values are kept as they are
+    assert prepared["eval_dl_number"].tolist()[:2] == [NEEDS_REVIEW, VALID]
+    assert not isinstance(prepared["eval_notes"].dtype, pd.CategoricalDtype)
+
+
+def test_verdict_table_matches_per_model_value_counts():
+    reporting_df = utils.data_report_prep(report_frame()).filter(regex="^eval_|model_name")
+    reporting_df = reporting_df.drop(columns="eval_notes")
+
+    table = utils.compute_verdict_table(reporting_df)
+
+    fields = ["eval_name", "eval_dl_number"]
+    assert table.index.tolist() == [(model, field) for model in ["m1", "m2"] for field in fields]
+    assert list(table.columns) == VERDICTS
+
+    for (model, field), row in table.iterrows():
+        counts = (reporting_df.loc[reporting_df["model_name"] == model, field].value_counts(normalize=True) * 100).fillna(0)
+        assert row.to_dict() == {verdict: counts.get(verdict, 0) for verdict in VERDICTS}
+
+    # m2 has a single evaluated name and no evaluated license number
+    assert table.loc[("m2", "eval_name")].tolist() == [0, 0, 100]
+    assert table.loc[("m2", "eval_dl_number")].tolist() == [0, 0, 0]
+
+
+def test_sink_appends_batches_to_every_report(tmp_path):
+    with utils.StreamingReportSink(str(tmp_path), formats=("csv", "jsonl", "parquet")) as sink:
+        sink.write([{"application_id": "a", "name": "JANE DOE"}])
+        sink.write(pd.DataFrame({"application_id": ["b", "c"], "name": ["JOHN ROE", None]}))
+        sink.write([])
+
+        # Partial results are readable while the run goes on
+        assert len(pd.read_json(sink.paths["jsonl"], lines=True)) == 3
+
+    expected = ["a", "b", "c"]
+    assert (sink.rows_written, sink.batches_written) == (3, 2)
+    assert pd.read_csv(sink.paths["csv"])["application_id"].tolist() == expected
+    assert pd.read_json(sink.paths["jsonl"], lines=True)["application_id"].tolist() == expected
+    assert sorted(pd.read_parquet(sink.paths["parquet"])["application_id"].tolist()) == expected
+
+
+def test_sink_keeps_the_columns_of_the_first_batch(tmp_path):
+    with utils.StreamingReportSink(str(tmp_path), formats=("csv",)) as sink:
+        sink.write([{"application_id": "a", "name": "JANE DOE"}])
+        sink.write([{"name": "JOHN ROE", "application_id": "b", "extra": 1}])
+
+    report = pd.read_csv(sink.paths["csv"])
+    assert list(report.columns) == ["application_id", "name"]
+    assert report["name"].tolist() == ["JANE DOE", "JOHN ROE"]
+
+
+def test_sink_gzip_members_concatenate(tmp_path):
+    with utils.StreamingReportSink(str(tmp_path), formats=("jsonl",), compression="gzip") as sink:
+        sink.write([{"application_id": "a"}])
+        sink.write([{"application_id": "b"}])
+
+    with gzip.open(sink.paths["jsonl"], "rt") as f:
+        assert [json.loads(line)["application_id"] for line in f] == ["a", "b"]
+
+    with pytest.raises(ValueError):
+        utils.StreamingReportSink(str(tmp_path), formats=("xlsx",))
+
+
+def test_report_writers_go_through_the_sink(tmp_path):
+    data = pd.DataFrame({"application_id": ["a", "b"], "name": ["JANE DOE", "JOHN ROE"]})
+
+    utils.generate_csv_report(data, str(tmp_path))
+    utils.generate_jsonl_report(data, str(tmp_path))
+
+    (csv_path,) = glob.glob(str(tmp_path / "dataset_*.csv"))
+    (jsonl_path,) = glob.glob(str(tmp_path / "dataset_*.jsonl"))
+    pd.testing.assert_frame_equal(pd.read_csv(csv_path), data)
+    pd.testing.assert_frame_equal(pd.read_json(jsonl_path, lines=True), data)
@@ -10,6 +10,8 @@ from github import Github
 
 import base64
 
+import gzip
+
 from more_itertools import chunked
 
 from urllib.parse import urlparse
@@ -22,6 +24,32 @@ import ast
 
 from datetime import datetime
 
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.adapters import HTTPAdapter
+
+from urllib3.util.retry import Retry
+
+import threading
+
+import re
+
+from functools import lru_cache
+
+from itertools import chain
+
+from field_validation import VERDICTS
+
+try:
+
+    import orjson
+
+    _json_loads = orjson.loads
+
+except ImportError:
+
+    _json_loads = json.loads
+
 import matplotlib.pyplot as plt
 
 import matplotlib.ticker as mtick
@@ -46,16 +74,64 @@ def load_file_as_json(file_path):
         
         return {}
 
-def load_url_as_json(url):
+# Hosts that the GitHub token may be sent to
+GITHUB_HOSTS = {"github.com", "api.github.com", "raw.githubusercontent.com"}
+
+class GitHubTokenAuth(requests.auth.AuthBase):
+    """
+    Authenticates requests to GitHub hosts with the GIT_TOKEN, leaving requests to any other host untouched.
+    """
+    def __call__(self, request):
+
+        if os.getenv("GIT_TOKEN") and urlparse(request.url).hostname in GITHUB_HOSTS:
+
+            request.headers["Authorization"] = f"token {os.getenv('GIT_TOKEN')}"
+
+        return request
+
+_http_sessions = {}
+
+_http_session_lock = threading.Lock()
+
+def get_http_session(pool_size=32):
+    """
+    Returns a process-wide HTTP session with a pooled, retrying connection adapter.
+    One session is kept per pool size; the GitHub token is only sent to GitHub hosts.
+
+    Args:
+        pool_size (int): Maximum number of pooled connections per host.
+    """
+    with _http_session_lock:
+
+        if pool_size not in _http_sessions:
+
+            session = requests.Session()
+
+            retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+
+            session.mount("https://", adapter)
+
+            session.mount("http://", adapter)
+
+            session.auth = GitHubTokenAuth()
+
+            _http_sessions[pool_size] = session
+
+        return _http_sessions[pool_size]
+
+def load_url_as_json(url, session=None):
     """
     Given a file located at a given URL, returns its content as JSON.
     
     Args:
         url (str): Source url.
+        session (requests.Session): Optional session to reuse pooled connections.
     """
     try:
         
-        response = requests.get(url)
+        response = (session or requests).get(url)
 
         if response.status_code == 200:
             
@@ -85,6 +161,16 @@ def get_validation_file_path(file_path):
     
     return filename
 
+@lru_cache(maxsize=256)
+def compile_jsonpath(jsonexpression):
+    """
+    Returns the parsed jsonpath expression, parsing each distinct expression only once.
+
+    Args:
+        jsonexpression (str): The jsonpath expression to parse.
+    """
+    return parse(jsonexpression)
+
 def get_jsonpath_match(content, jsonexpression, first_match=True):
     """
     Returns the part of content that matches the given jsonpath expression.
@@ -94,7 +180,7 @@ def get_jsonpath_match(content, jsonexpression, first_match=True):
         jsonexpression (str): The jsonpath expression to match.
         first_match (bool): Whether to return only the first match or a list of matches.
     """
-    jsonpath_expr = parse(jsonexpression)
+    jsonpath_expr = compile_jsonpath(jsonexpression)
 
     matches =  [match.value for match in jsonpath_expr.find(content)]
 
@@ -104,6 +190,111 @@ def get_jsonpath_match(content, jsonexpression, first_match=True):
 
     return matches[0] if first_match else matches
 
+class JsonPathExtractor:
+    """
+    Extracts a fixed set of fields from JSON documents using jsonpath expressions compiled once.
+
+    Simple paths made only of field names and non-negative indices (e.g. $.data[0].name) are
+    resolved with direct dict/list lookups; any other expression goes through jsonpath_ng.
+
+    Args:
+        patterns (dict): Mapping of output field name to jsonpath expression.
+    """
+
+    SIMPLE_PATH = re.compile(r"^\$(?:\.[A-Za-z_][A-Za-z0-9_]*|\[\d+\])+$")
+
+    PATH_STEP = re.compile(r"\.([A-Za-z_][A-Za-z0-9_]*)|\[(\d+)\]")
+
+    _MISSING = object()
+
+    def __init__(self, patterns: dict):
+
+        self.patterns = dict(patterns)
+
+        self._compiled = {key: self._compile(expression) for key, expression in self.patterns.items()}
+
+    @classmethod
+    def from_file(cls, patterns_file_path: str):
+        """
+        Builds an extractor from a JSON file of {field: jsonpath expression} patterns.
+
+        Args:
+            patterns_file_path (str): The patterns file path.
+        """
+        return cls(load_file_as_json(patterns_file_path))
+
+    def _compile(self, expression: str):
+        """Returns a tuple of lookup steps for simple paths, or the parsed jsonpath expression otherwise."""
+
+        if self.SIMPLE_PATH.match(expression):
+
+            return tuple(field if field else int(index) for field, index in self.PATH_STEP.findall(expression))
+
+        return compile_jsonpath(expression)
+
+    def _lookup(self, content, steps: tuple):
+        """Resolves a tuple of lookup steps against content, mirroring jsonpath_ng's first match."""
+
+        for step in steps:
+
+            if isinstance(step, int):
+
+                if not isinstance(content, list) or step >= len(content):
+
+                    return self._MISSING
+
+            elif not isinstance(content, dict) or step not in content:
+
+                return self._MISSING
+
+            content = content[step]
+
+        return content
+
+    def extract(self, content) -> dict:
+        """
+        Returns the first match of every pattern in content (None when there is no match).
+
+        Args:
+            content (dict): The JSON document.
+        """
+        extracted = {}
+
+        for key, compiled in self._compiled.items():
+
+            if isinstance(compiled, tuple):
+
+                value = self._lookup(content, compiled)
+
+                extracted[key] = None if value is self._MISSING else value
+
+            else:
+
+                matches = compiled.find(content)
+
+                extracted[key] = matches[0].value if matches else None
+
+        return extracted
+
+    def extract_applications(self, applications):
+        """
+        Lazily converts applications into submitted application fields.
+
+        Accepts any iterable (including generators) of {'application_id': xxx, 'application_data': xxx, 'image_path': xxx}
+        dicts and yields one {'application_id': xxx, 'image_path': xxx, <pattern fields>} dict per application.
+
+        Args:
+            applications (Iterable[dict]): The applications.
+        """
+        for application in applications:
+
+            submitted = {"application_id": application["application_id"],
+                         "image_path": application["image_path"]}
+
+            submitted.update(self.extract(application["application_data"]))
+
+            yield submitted
+
 def fetch_files_from_git_url(repo_url: str, folder_path: str, branch="main", download=False, download_path=""):
     """
     Fetches the contents of a GitHub repository (non-recursive).
@@ -155,6 +346,86 @@ def fetch_files_from_git_url(repo_url: str, folder_path: str, branch="main", dow
         
         print(f"Error fetching files from {repo_url}#{branch}: {e}")
 
+def mirror_files_from_git_url(repo_url: str, folder_path: str, mirror_path: str, branch="main", recursive=True, max_workers=16):
+    """
+    Mirrors the files of a GitHub repository folder into a local, content-addressed store.
+
+    The folder listing comes from a single git tree request. Blobs are stored under
+    mirror_path/objects keyed by their blob SHA, so files that have not changed since the
+    last run are never downloaded again. Missing blobs are fetched concurrently over a
+    pooled HTTP session.
+
+    Returns a list of {'path': xxx, 'sha': xxx, 'local_path': xxx} entries sorted by path.
+
+    Args:
+        repo_url (str): The full name of the repository.
+        folder_path (str): The path to the folder within the repository.
+        mirror_path (str): The local directory holding the mirror.
+        branch (str): The branch name.
+        recursive (bool): Whether to include files in subfolders.
+        max_workers (int): Maximum number of concurrent downloads.
+    """
+
+    try:
+        g = Github(os.getenv("GIT_TOKEN"))
+
+        repo = g.get_user().get_repo(repo_url.split('/')[-1])
+
+        tree = repo.get_git_tree(sha=branch, recursive=True)
+
+        prefix = folder_path.strip("/") + "/"
+
+        blobs = [item for item in tree.tree
+                 if item.type == "blob" and
+                 item.path.startswith(prefix) and
+                 (recursive or "/" not in item.path[len(prefix):])]
+
+        objects_path = os.path.join(mirror_path, "objects")
+
+        os.makedirs(objects_path, exist_ok=True)
+
+        def get_object_path(sha: str):
+            """Returns the local path of the blob with the given SHA."""
+            return os.path.join(objects_path, sha[:2], sha)
+
+        raw_url = get_raw_github_url(repo_url, branch=branch)
+
+        session = get_http_session(pool_size=max_workers)
+
+        def download(blob):
+            """Downloads a single blob into the object store."""
+            response = session.get(f"{raw_url}/{blob.path}")
+
+            response.raise_for_status()
+
+            object_path = get_object_path(blob.sha)
+
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+
+            # Write to a temporary file first so that an interrupted download never leaves a partial blob behind
+            with open(f"{object_path}.tmp", 'wb') as f:
+
+                f.write(response.content)
+
+            os.replace(f"{object_path}.tmp", object_path)
+
+        missing = [blob for blob in blobs if not os.path.exists(get_object_path(blob.sha))]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            list(executor.map(download, missing))
+
+        print(f"Folder '{folder_path}' mirrored to '{mirror_path}': {len(missing)} downloaded, {len(blobs) - len(missing)} unchanged.")
+
+        return sorted([{"path": blob.path, "sha": blob.sha, "local_path": get_object_path(blob.sha)}
+                       for blob in blobs], key=lambda item: item["path"])
+
+    except Exception as e:
+
+        print(f"Error mirroring files from {repo_url}#{branch}: {e}")
+
+        traceback.print_exc()
+
 def get_raw_github_url(repo_url: str, branch="main"):
     """Returns the corresponding raw github url."""
 
@@ -170,8 +441,21 @@ def get_raw_github_url(repo_url: str, branch="main"):
 
         
 
-def group_files_by_id(git_repo: str, subdir: str, branch="main"):
-    """Groups files in this directory using the provided mappings"""
+def group_files_by_id(git_repo: str, subdir: str, branch="main", mirror_path=None, recursive=False, max_workers=16):
+    """Groups files in this directory using the provided mappings.
+
+    If mirror_path is provided, the folder is mirrored locally (see mirror_files_from_git_url)
+    and application JSON files are read from the mirror; otherwise they are fetched
+    concurrently over a pooled HTTP session.
+
+    Args:
+        git_repo (str): The full name of the repository.
+        subdir (str): The path to the folder within the repository.
+        branch (str): The branch name.
+        mirror_path (str): The local directory holding the mirror, if any.
+        recursive (bool): Whether to include files in subfolders.
+        max_workers (int): Maximum number of concurrent downloads.
+    """
     try:
         def get_application_id(file: str):
             """Hardcoded logic that retrieves the application_id from the given file"""
@@ -179,16 +463,29 @@ def group_files_by_id(git_repo: str, subdir: str, branch="main"):
 
         def get_extension(file: str):
             """Hardcoded logic that retrieves the file extension from the given file"""
-            return file.split('.')[1]
+            return file.split('.')[-1]
         
-        raw_url = get_raw_github_url(git_repo, branch="main")
+        raw_url = get_raw_github_url(git_repo, branch=branch)
 
         # fetch files
-        listing = fetch_files_from_git_url(git_repo, subdir, branch="main")
+        if mirror_path:
+
+            mirrored = mirror_files_from_git_url(git_repo, subdir, mirror_path, branch=branch,
+                                                 recursive=recursive, max_workers=max_workers)
+
+            local_paths = {item["path"]: item["local_path"] for item in mirrored}
+
+            listing = list(local_paths)
+
+        else:
+
+            listing = fetch_files_from_git_url(git_repo, subdir, branch=branch)
+
+            listing = [item.path for item in listing if item.type != "dir"]
 
         
         # sort files
-        listing = sorted([item.path for item in listing])
+        listing = sorted(listing)
 
         # build clusters of 2
         groups = list(chunked(listing, 2))
@@ -199,11 +496,24 @@ def group_files_by_id(git_repo: str, subdir: str, branch="main"):
                   if len(items)==2 and 
                   get_application_id(items[0]) == get_application_id(items[1])]
 
+        # load the application data
+        if mirror_path:
+
+            application_data = [load_file_as_json(local_paths[item[1]]) for item in groups]
+
+        else:
+
+            session = get_http_session(pool_size=max_workers)
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+                application_data = list(executor.map(lambda item: load_url_as_json(f"{raw_url}/{item[1]}", session=session), groups))
+
         # transform into {'application_id': xxx, 'application_data': xxx, 'image_path': xxx} format
         groups = [{"application_id": get_application_id(item[0]), 
-                   "application_data": {"data": load_url_as_json(f"{raw_url}/{item[1]}")},
+                   "application_data": {"data": data},
                    "image_path": f"{raw_url}/{item[0]}"}
-                  for item in groups]
+                  for item, data in zip(groups, application_data)]
     
         return groups
 
@@ -218,70 +528,206 @@ def convert_to_submitted_fields(applications: list, patterns_file_path: str) ->
 
     try:
 
-        # extract the static pattern matching rules
-        patterns = load_file_as_json(patterns_file_path)
+        # compile the static pattern matching rules once for the whole batch
+        extractor = JsonPathExtractor.from_file(patterns_file_path)
 
-        submitted_data = []
-    
         # extract the submitted application data
-        for application in applications:
+        return list(extractor.extract_applications(applications))
 
-            application_data = application["application_data"]
+    except Exception as e:
 
-            _application_data = {"application_id": application["application_id"], 
-                                 "image_path": application["image_path"]}
-            
-            for key in patterns:
+        print(f"Error extracting submitted data: {e}")
 
-                _application_data[key] = get_jsonpath_match(application_data, patterns[key])
+        traceback.print_exc()
 
-            submitted_data.append(_application_data)
-                
-        return submitted_data
+def load_local_applications(data_dir: str, patterns_file_path: str = "patterns.json") -> pd.DataFrame:
+    """Pairs the images and application JSON files of a local directory into a frame of submitted fields.
 
-    except Exception as e:
+    Args:
+        data_dir (str): Directory holding <application_id>.json files and their images.
+        patterns_file_path (str): The static pattern matching rules.
+    """
+    files = sorted(os.listdir(data_dir))
 
-        print(f"Error extracting submitted data: {e}")
+    images = {name.split('.')[0]: os.path.join(data_dir, name) for name in files if not name.endswith(".json")}
 
-        traceback.print_exc()
+    applications = [{"application_id": name.split('.')[0],
+                     "application_data": {"data": load_file_as_json(os.path.join(data_dir, name))},
+                     "image_path": images[name.split('.')[0]]}
+                    for name in files if name.endswith(".json") and name.split('.')[0] in images]
+
+    return pd.DataFrame(convert_to_submitted_fields(applications, patterns_file_path))
 
 ###############################################################################################
 # Report Generation
 ###############################################################################################
 
+def parse_json_column(values) -> list:
+    """
+    Parses a column of JSON strings into a list of dicts, using orjson when it is available.
+
+    Values that are not valid JSON objects become empty dicts.
+
+    Args:
+        values (Iterable[str]): The JSON strings.
+    """
+    values = list(values)
+
+    try:
+
+        # fast path: every value parses
+        parsed = list(map(_json_loads, values))
+
+    except Exception:
+
+        parsed = []
+
+        for value in values:
+
+            try:
+
+                parsed.append(_json_loads(value))
+
+            except Exception:
+
+                parsed.append({})
+
+    if set(map(type, parsed)) <= {dict}:
+
+        return parsed
+
+    return [obj if isinstance(obj, dict) else {} for obj in parsed]
+
+def build_columns(records: list, prefix: str) -> dict:
+    """
+    Builds one list per (flattened) key from a list of dicts, in the same shape as pd.json_normalize.
+
+    Nested dicts are flattened with "." separators; missing keys are filled with None.
+
+    Args:
+        records (list[dict]): The parsed records.
+        prefix (str): Prefix added to every column name.
+    """
+    columns = {}
+
+    # union of the keys of every record, in first-seen order
+    for key in dict.fromkeys(chain.from_iterable(records)):
+
+        column = [record.get(key) for record in records]
+
+        types = set(map(type, column))
+
+        if dict not in types:
+
+            columns[f"{prefix}{key}"] = column
+
+            continue
+
+        nested = [value if isinstance(value, dict) else {} for value in column]
+
+        if types - {dict, type(None)}:
+
+            columns[f"{prefix}{key}"] = [None if isinstance(value, dict) else value for value in column]
+
+        columns.update(build_columns(nested, f"{prefix}{key}."))
+
+    return columns
+
+def to_verdict_column(values: list):
+    """
+    Returns values as a categorical VALID/INVALID/NEEDS_REVIEW column, or None if they are not all verdicts.
+
+    Args:
+        values (list): The column values.
+    """
+    try:
+
+        uniques = set(values)
+
+    except TypeError:
+
+        return None
+
+    codes = {None: -1}
+
+    for value in uniques - {None}:
+
+        verdict = value.strip().upper().replace(" ", "_") if isinstance(value, str) else value
+
+        if verdict not in VERDICTS:
+
+            return None
+
+        codes[value] = VERDICTS.index(verdict)
+
+    return pd.Categorical.from_codes([codes[value] for value in values], categories=VERDICTS)
+
 def data_report_prep(data: pd.DataFrame):
     """
     Transforms the columns of the dataframe to a format more suitable for the reports/visualizations that will be created.
-    """
-    transformed_df = data.copy()
 
-    def jsonize(obj): 
-        try:
-            return json.loads(obj)
-        except Exception as e:
-            return {}
+    The extracted_data/eval_data JSON columns are parsed in a single pass and expanded into extracted_*/eval_* columns;
+    eval_* columns holding only verdicts become categoricals. The remaining columns are reused as-is rather than copied.
+    """
+    json_cols = ["extracted_data", "eval_data"]
 
-    transformed_df["extracted_data_dict"]= transformed_df["extracted_data"].apply(jsonize)
+    columns = {col: data[col] for col in data.columns if col not in json_cols}
 
-    transformed_df["eval_data_dict"]= transformed_df["eval_data"].apply(jsonize)
+    columns.update(build_columns(parse_json_column(data["extracted_data"].tolist()), "extracted_"))
 
-    extracted_df = pd.json_normalize(transformed_df["extracted_data_dict"]).add_prefix("extracted_")
+    for name, values in build_columns(parse_json_column(data["eval_data"].tolist()), "eval_").items():
 
-    eval_df = pd.json_normalize(transformed_df["eval_data_dict"]).add_prefix("eval_")
+        verdicts = to_verdict_column(values)
 
-    transformed_df = transformed_df.drop(columns=["extracted_data", "eval_data", "extracted_data_dict", "eval_data_dict"])
+        columns[name] = values if verdicts is None else verdicts
 
-    return transformed_df.join(extracted_df).join(eval_df)
+    return pd.DataFrame(columns, index=data.index, copy=False)
     
 
-def generate_visualizatioms(reporting_df: pd.DataFrame, target_dir: str):
-    """Generates visualizations from the given dataframe."""
+def compute_verdict_table(reporting_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Computes the percentage of each verdict per model and field in a single grouped pass.
+
+    Returns a dataframe indexed by (model_name, field) with one column per verdict.
+
+    Args:
+        reporting_df (pd.DataFrame): Dataframe with a model_name column and one column per evaluated field.
+    """
+    category_cols = [col for col in reporting_df.columns if col != "model_name"]
+
+    grouped = reporting_df.groupby("model_name", sort=False, observed=True)
+
+    percentages = pd.concat({col: grouped[col].value_counts(normalize=True) * 100 for col in category_cols},
+                            names=["field"])
+
+    table = percentages.unstack(fill_value=0).sort_index(axis=1)
+
+    table.columns.name = "verdict"
+
+    # order rows by model, then by field, as they are laid out in the report
+    return table.swaplevel("field", "model_name").reindex(
+        pd.MultiIndex.from_product([reporting_df["model_name"].unique(), category_cols], names=["model_name", "field"]),
+        fill_value=0)
+
+def generate_visualizatioms(reporting_df: pd.DataFrame, target_dir: str, show=True, table=None):
+    """
+    Generates visualizations from the given dataframe.
+
+    Args:
+        reporting_df (pd.DataFrame): Dataframe with a model_name column and one column per evaluated field.
+        target_dir (str): The directory the figure is written to.
+        show (bool): Whether to display the figure; set to False to render headless.
+        table (pd.DataFrame): A precomputed compute_verdict_table(reporting_df), if available.
+    """
+    if table is None:
+
+        table = compute_verdict_table(reporting_df)
     
-    groups = reporting_df['model_name'].unique()
+    groups = table.index.get_level_values("model_name").unique()
     
-    category_cols = [col for col in reporting_df.columns if col != "model_name"]
+    category_cols = table.index.get_level_values("field").unique()
     
-    fig, axes = plt.subplots(len(category_cols), len(groups), figsize=(12, 30), sharey=True)
+    fig, axes = plt.subplots(len(category_cols), len(groups), figsize=(12, 30), sharey=True, squeeze=False)
     
     fig.suptitle('Accuracy by Model and Field')
     
@@ -289,13 +735,8 @@ def generate_visualizatioms(reporting_df: pd.DataFrame, target_dir: str):
     
         for j, col in enumerate(category_cols):
             
-            # Filter data for the current group
-            group_data = reporting_df[reporting_df['model_name'] == group]
-        
-            # Calculate value counts (frequencies) of the categorical variable
-            category_cols = [col for col in reporting_df.columns if col != "model_name"]
-                    
-            category_counts = (group_data[col].value_counts(normalize=True) * 100).sort_index()
+            # Read the precomputed percentages of the categorical variable
+            category_counts = table.loc[(group, col)]
             
             category_counts.plot.bar(ax=axes[j, i])
             
@@ -307,22 +748,181 @@ def generate_visualizatioms(reporting_df: pd.DataFrame, target_dir: str):
             
             axes[j, i].tick_params(axis='x', rotation=45)
 
-    plt.tight_layout(rect=[0, 0.03, 1, 0.95]) # Adjust layout to prevent title overlap
-    
-    plt.savefig(f"{target_dir}/barplot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png") 
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95]) # Adjust layout to prevent title overlap
+
+    os.makedirs(target_dir, exist_ok=True)
     
-    plt.show()
+    fig.savefig(f"{target_dir}/barplot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png") 
 
-def generate_csv_report(data: pd.DataFrame, target_dir: str):
-    """Generates a CSV file from the given dataframe."""
+    if show:
     
+        plt.show()
+
+    else:
+
+        plt.close(fig)
+
+def generate_verdict_table_report(table: pd.DataFrame, target_dir: str):
+    """Generates a CSV file from the given verdict percentage table (see compute_verdict_table)."""
+
     os.makedirs(target_dir, exist_ok=True)
+
+    table.to_csv(f"{target_dir}/verdicts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+
+def generate_csv_report(data: pd.DataFrame, target_dir: str):
+    """Generates a CSV file from the given dataframe (see StreamingReportSink)."""
     
-    data.to_csv(f"{target_dir}/dataset_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    with StreamingReportSink(target_dir, formats=("csv",)) as sink:
+
+        sink.write(data)
 
 def generate_jsonl_report(data: pd.DataFrame, target_dir: str):
-    """Generates a jsonl file from the given dataframe."""
+    """Generates a jsonl file from the given dataframe (see StreamingReportSink)."""
     
-    os.makedirs(target_dir, exist_ok=True)
-    
-    data.to_json(f"{target_dir}/dataset_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl", orient='records', lines=True)
+    with StreamingReportSink(target_dir, formats=("jsonl",)) as sink:
+
+        sink.write(data)
+
+class StreamingReportSink:
+    """
+    Appends record batches to CSV, JSONL and/or Parquet reports as they are produced.
+
+    Every call to write() leaves the reports readable: text reports are appended and fsynced
+    (with gzip compression, each batch is written as its own gzip member), and each Parquet
+    batch is written atomically as a separate part file of a dataset_<timestamp>.parquet directory.
+    A crash therefore loses at most the batch being written, and partial results can be tailed.
+
+    Args:
+        target_dir (str): The directory the reports are written to.
+        formats (Iterable[str]): Any of "csv", "jsonl" and "parquet".
+        compression (str): None or "gzip", for the CSV and JSONL reports.
+        parquet_compression (str): Parquet codec, e.g. "snappy", "zstd" or "gzip".
+    """
+
+    FORMATS = ("csv", "jsonl", "parquet")
+
+    def __init__(self, target_dir: str, formats=("csv", "jsonl"), compression=None, parquet_compression="snappy"):
+
+        unknown = set(formats) - set(self.FORMATS)
+
+        if unknown:
+
+            raise ValueError(f"Unsupported report formats: {sorted(unknown)}")
+
+        if compression not in (None, "gzip"):
+
+            raise ValueError(f"Unsupported compression for text reports: {compression}")
+
+        os.makedirs(target_dir, exist_ok=True)
+
+        self.formats = tuple(formats)
+
+        self.compression = compression
+
+        self.parquet_compression = parquet_compression
+
+        self.columns = None
+
+        self.rows_written = 0
+
+        self.batches_written = 0
+
+        suffix = ".gz" if compression else ""
+
+        base_path = f"{target_dir}/dataset_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+        self.paths = {"csv": f"{base_path}.csv{suffix}",
+                      "jsonl": f"{base_path}.jsonl{suffix}",
+                      "parquet": f"{base_path}.parquet"}
+
+        if "parquet" in self.formats:
+
+            os.makedirs(self.paths["parquet"], exist_ok=True)
+
+    def _append_text(self, path: str, text: str):
+        """Appends text to a report and forces it to disk."""
+
+        data = text.encode("utf-8")
+
+        if self.compression == "gzip":
+
+            data = gzip.compress(data)
+
+        with open(path, "ab") as f:
+
+            f.write(data)
+
+            f.flush()
+
+            os.fsync(f.fileno())
+
+    def _write_parquet(self, batch: pd.DataFrame):
+        """Writes a batch as a new part file of the Parquet dataset."""
+
+        part_name = f"part-{self.batches_written:05d}.parquet"
+
+        # dot-prefixed temporary files are ignored by Parquet dataset readers
+        tmp_path = os.path.join(self.paths["parquet"], f".{part_name}.tmp")
+
+        batch.to_parquet(tmp_path, index=False, compression=self.parquet_compression)
+
+        os.replace(tmp_path, os.path.join(self.paths["parquet"], part_name))
+
+    def write(self, batch):
+        """
+        Appends a batch of records to every report.
+
+        Args:
+            batch (pd.DataFrame | list[dict]): The records. Columns are fixed by the first batch.
+        """
+        if not isinstance(batch, pd.DataFrame):
+
+            batch = pd.DataFrame(list(batch))
+
+        if batch.empty:
+
+            return
+
+        if self.columns is None:
+
+            self.columns = list(batch.columns)
+
+        else:
+
+            extra_cols = set(batch.columns) - set(self.columns)
+
+            if extra_cols:
+
+                print(f"Dropping columns not present in the first batch: {sorted(extra_cols)}")
+
+            batch = batch.reindex(columns=self.columns)
+
+        if "csv" in self.formats:
+
+            self._append_text(self.paths["csv"], batch.to_csv(index=False, header=self.rows_written == 0))
+
+        if "jsonl" in self.formats:
+
+            self._append_text(self.paths["jsonl"], batch.to_json(orient='records', lines=True).rstrip("\n") + "\n")
+
+        if "parquet" in self.formats:
+
+            self._write_parquet(batch)
+
+        self.rows_written += len(batch)
+
+        self.batches_written += 1
+
+    def close(self):
+        """Reports where the results were written; every batch is already on disk."""
+
+        print(f"Wrote {self.rows_written} rows in {self.batches_written} batches to "
+              f"{', '.join(self.paths[fmt] for fmt in self.formats)}")
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+
+        self.close()
@@ -0,0 +1,207 @@
+##############################################################################
+# Version diff of STIG benchmark revisions
+##############################################################################
+# Aligns the rules of two revisions of a benchmark by group ID (falling back
+# to the rule-ID stem for renumbered groups) and compares them by hashed
+# fingerprints, so no text diff is needed. StigIndex.apply_diff and
+# StigVectorStore.apply_diff use the result to move an index or vector store
+# from one revision to the next, touching only the rules that changed.
+#
+# Usage:
+#   python stig_diff.py markdown/U_ASD_STIG_V5R3_Manual-xccdf.md markdown/U_ASD_STIG_V6R3_Manual-xccdf.md
+#   python stig_diff.py --all
+import argparse
+import hashlib
+import json
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from stig_parser import MARKDOWN_DIR, RULE_FIELDS, StigRule, benchmark_id_from_path, iter_rules, list_benchmark_files
+
+# Fields compared between revisions; the rule ID revision suffix is left out as it
+# changes whenever any of these do
+FINGERPRINT_FIELDS = ("title", "severity", "discussion", "check_text")
+
+# Fields indexed for text search / embedded; a change limited to other fields only
+# needs a metadata update
+TEXT_FIELDS = ("title", "discussion", "check_text")
+
+RULE_STEM = re.compile(r"^(SV-\d+)")
+
+VERSION = re.compile(r"V(\d+)R(\d+)")
+
+
+def rule_stem(rule_id: str) -> str:
+    """Returns the rule ID without its revision suffix (SV-222387r960735_rule -> SV-222387)."""
+    match = RULE_STEM.match(rule_id)
+    return match.group(1) if match else rule_id
+
+
+def version_key(version: str) -> tuple:
+    """Sort key of a "VxRy" version string."""
+    match = VERSION.search(version)
+    return (int(match.group(1)), int(match.group(2))) if match else (0, 0)
+
+
+def fingerprint(rule: StigRule) -> tuple:
+    """Returns an 8-byte digest per fingerprinted field of a rule."""
+    return tuple(hashlib.blake2b(getattr(rule, name).encode("utf-8"), digest_size=8).digest()
+                 for name in FINGERPRINT_FIELDS)
+
+
+@dataclass
+class RuleChange:
+    """A rule present in both revisions whose fingerprint differs."""
+    old: StigRule
+    new: StigRule
+    fields: list
+
+    @property
+    def text_changed(self) -> bool:
+        return any(name in TEXT_FIELDS for name in self.fields)
+
+
+@dataclass
+class BenchmarkDiff:
+    """Differences between two revisions of a benchmark."""
+    benchmark_id: str
+    old_file: str
+    new_file: str
+    old_version: str
+    new_version: str
+    added: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+
+    @property
+    def severity_changes(self) -> list:
+        return [change for change in self.changed if "severity" in change.fields]
+
+    def summary(self) -> dict:
+        """Counts of the rules added, removed, changed and unchanged."""
+        return {"benchmark_id": self.benchmark_id, "old": self.old_version, "new": self.new_version,
+                "added": len(self.added), "removed": len(self.removed), "changed": len(self.changed),
+                "severity_changed": len(self.severity_changes), "unchanged": len(self.unchanged)}
+
+    def to_dict(self) -> dict:
+        """JSON-friendly report listing the affected rules."""
+        return {**self.summary(),
+                "added_rules": [[rule.group_id, rule.rule_id, rule.severity, rule.title] for rule in self.added],
+                "removed_rules": [[rule.group_id, rule.rule_id, rule.severity, rule.title] for rule in self.removed],
+                "changed_rules": [[change.new.group_id, change.old.rule_id, change.new.rule_id, change.fields]
+                                  for change in self.changed],
+                "severity_changes": [[change.new.group_id, change.old.severity, change.new.severity]
+                                     for change in self.severity_changes]}
+
+
+def diff_rules(old_rules: Iterable[StigRule], new_rules: Iterable[StigRule], benchmark_id: str = "") -> BenchmarkDiff:
+    """Aligns two revisions of a benchmark and classifies every rule.
+
+    Rules are paired by group ID first; rules left unpaired are then paired by rule-ID stem.
+    """
+    old_rules, new_rules = list(old_rules), list(new_rules)
+    first_old = old_rules[0] if old_rules else StigRule(*[""] * len(RULE_FIELDS))
+    first_new = new_rules[0] if new_rules else StigRule(*[""] * len(RULE_FIELDS))
+    diff = BenchmarkDiff(benchmark_id=benchmark_id or first_new.benchmark_id or first_old.benchmark_id,
+                         old_file=first_old.source_file, new_file=first_new.source_file,
+                         old_version=first_old.version, new_version=first_new.version)
+
+    old_by_group = {rule.group_id: rule for rule in old_rules}
+    pairs, unpaired = [], []
+    for rule in new_rules:
+        old = old_by_group.pop(rule.group_id, None)
+        if old is None:
+            unpaired.append(rule)
+        else:
+            pairs.append((old, rule))
+
+    old_by_stem = {rule_stem(rule.rule_id): rule for rule in old_by_group.values()}
+    for rule in unpaired:
+        old = old_by_stem.pop(rule_stem(rule.rule_id), None)
+        if old is None:
+            diff.added.append(rule)
+        else:
+            pairs.append((old, rule))
+    diff.removed = list(old_by_stem.values())
+
+    for old, new in pairs:
+        old_print, new_print = fingerprint(old), fingerprint(new)
+        if old_print == new_print:
+            diff.unchanged.append((old, new))
+        else:
+            diff.changed.append(RuleChange(old=old, new=new, fields=[
+                name for name, a, b in zip(FINGERPRINT_FIELDS, old_print, new_print) if a != b]))
+
+    return diff
+
+
+def diff_files(old_path: str, new_path: str) -> BenchmarkDiff:
+    """Diffs two benchmark files."""
+    return diff_rules(iter_rules(old_path), iter_rules(new_path), benchmark_id_from_path(new_path)[0])
+
+
+def benchmark_revisions(paths: Iterable[str]) -> dict:
+    """Groups benchmark files by benchmark_id, each group sorted from oldest to newest version."""
+    revisions = defaultdict(list)
+    for path in paths:
+        benchmark_id, version = benchmark_id_from_path(path)
+        revisions[benchmark_id].append((version_key(version), path))
+    return {benchmark_id: [path for _, path in sorted(files)] for benchmark_id, files in revisions.items()}
+
+
+def pair_revisions(old_paths: Iterable[str], new_paths: Iterable[str]) -> list:
+    """Pairs the latest new file of each benchmark with the latest old file of the same benchmark.
+
+    Returns (old_path, new_path) tuples; benchmarks missing from either side are left out.
+    """
+    old_latest = {benchmark_id: paths[-1] for benchmark_id, paths in benchmark_revisions(old_paths).items()}
+    return [(old_latest[benchmark_id], paths[-1]) for benchmark_id, paths in benchmark_revisions(new_paths).items()
+            if benchmark_id in old_latest]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two revisions of a STIG benchmark.")
+    parser.add_argument("old", nargs="?")
+    parser.add_argument("new", nargs="?")
+    parser.add_argument("--all", action="store_true",
+                        help="Diff the two latest revisions of every benchmark in the markdown directory")
+    parser.add_argument("--markdown-dir", default=MARKDOWN_DIR)
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    if args.all:
+        pairs = [(paths[-2], paths[-1]) for paths in benchmark_revisions(list_benchmark_files(args.markdown_dir)).values()
+                 if len(paths) > 1]
+    elif args.old and args.new:
+        pairs = [(args.old, args.new)]
+    else:
+        parser.error("give two benchmark files or --all")
+
+    start_time = time.perf_counter()
+    for old_path, new_path in pairs:
+        diff = diff_files(old_path, new_path)
+        if args.json:
+            print(json.dumps(diff.to_dict()))
+            continue
+
+        summary = diff.summary()
+        print(f"{summary['benchmark_id']} {summary['old']} -> {summary['new']}: "
+              f"+{summary['added']} -{summary['removed']} ~{summary['changed']} "
+              f"(severity {summary['severity_changed']}, unchanged {summary['unchanged']})")
+        if len(pairs) == 1:
+            for rule in diff.added:
+                print(f"  + {rule.group_id:<10} {rule.severity:<7} {rule.title}")
+            for rule in diff.removed:
+                print(f"  - {rule.group_id:<10} {rule.severity:<7} {rule.title}")
+            for change in diff.changed:
+                print(f"  ~ {change.new.group_id:<10} {', '.join(change.fields)}"
+                      + (f" ({change.old.severity} -> {change.new.severity})" if "severity" in change.fields else ""))
+    print(f"({time.perf_counter() - start_time:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+##############################################################################
+# Persistent BM25 index over the STIG rules
+##############################################################################
+# Keeps the rules parsed by stig_parser in a SQLite database with an FTS5
+# index, so keyword search does not need to scan the markdown corpus.
+#
+# A file replaced by a newer revision of the same benchmark is diffed against
+# its indexed rules (see stig_diff), and only the rules whose text changed are
+# rewritten in the FTS index.
+#
+# Usage:
+#   python stig_index.py update
+#   python stig_index.py search "session idle timeout" --severity high
+#   python stig_index.py lookup V-222389
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from typing import Iterable, Optional, Union
+
+from stig_diff import TEXT_FIELDS, BenchmarkDiff, diff_rules, pair_revisions
+from stig_parser import MARKDOWN_DIR, RULE_FIELDS, StigRule, iter_rules, list_benchmark_files, load_rules
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stig_index.sqlite")
+
+TOKEN = re.compile(r"\w+")
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS files (
+    source_file TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rules (
+    id INTEGER PRIMARY KEY,
+    {", ".join(f"{name} TEXT" for name in RULE_FIELDS)}
+);
+CREATE INDEX IF NOT EXISTS rules_rule_id ON rules (rule_id);
+CREATE INDEX IF NOT EXISTS rules_group_id ON rules (group_id);
+CREATE INDEX IF NOT EXISTS rules_source_file ON rules (source_file);
+CREATE VIRTUAL TABLE IF NOT EXISTS rules_fts USING fts5 (
+    title, discussion, check_text,
+    content='rules', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS rules_ai AFTER INSERT ON rules BEGIN
+    INSERT INTO rules_fts (rowid, title, discussion, check_text)
+    VALUES (new.id, new.title, new.discussion, new.check_text);
+END;
+CREATE TRIGGER IF NOT EXISTS rules_ad AFTER DELETE ON rules BEGIN
+    INSERT INTO rules_fts (rules_fts, rowid, title, discussion, check_text)
+    VALUES ('delete', old.id, old.title, old.discussion, old.check_text);
+END;
+"""
+
+# BM25 column weights for title, discussion and check text
+BM25_WEIGHTS = (5.0, 1.0, 1.0)
+
+
+def file_sha256(path: str) -> str:
+    """Returns the SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def to_fts_query(text: str, operator: str = "OR") -> str:
+    """Turns free text into an FTS5 query matching all (AND) or any (OR) of its terms."""
+    return f" {operator} ".join(f'"{token}"' for token in TOKEN.findall(text.lower()))
+
+
+class StigIndex:
+    """On-disk keyword index over the STIG rules, updated incrementally from markdown/.
+
+    Args:
+        path: Location of the SQLite database.
+    """
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def changed_files(self, paths: Iterable[str]) -> dict:
+        """Classifies benchmark files against the index by mtime/size, then by content hash.
+
+        Returns a dict of "changed" (paths to reindex), "new" (the changed paths that were not
+        indexed before), "touched" (paths whose mtime changed but whose content did not),
+        "removed" (indexed source files no longer present) and "unchanged" (count).
+        """
+        indexed = {row["source_file"]: row for row in self.conn.execute("SELECT * FROM files")}
+        changed, new, touched, unchanged = [], [], [], 0
+
+        for path in paths:
+            stat = os.stat(path)
+            row = indexed.pop(os.path.basename(path), None)
+            if row is not None and row["mtime"] == stat.st_mtime and row["size"] == stat.st_size:
+                unchanged += 1
+            elif row is not None and row["sha256"] == file_sha256(path):
+                touched.append(path)
+            else:
+                changed.append(path)
+                if row is None:
+                    new.append(path)
+
+        return {"changed": changed, "new": new, "touched": touched, "removed": list(indexed),
+                "unchanged": unchanged}
+
+    def _record_file(self, path: str, sha256: Optional[str] = None):
+        """Stores the mtime, size and hash a file was indexed at."""
+        stat = os.stat(path)
+        self.conn.execute("INSERT OR REPLACE INTO files (source_file, mtime, size, sha256) VALUES (?, ?, ?, ?)",
+                          (os.path.basename(path), stat.st_mtime, stat.st_size, sha256 or file_sha256(path)))
+
+    def remove_files(self, source_files: Iterable[str]):
+        """Removes the rules of the given source files from the index."""
+        for source_file in source_files:
+            self.conn.execute("DELETE FROM rules WHERE source_file = ?", (source_file,))
+            self.conn.execute("DELETE FROM files WHERE source_file = ?", (source_file,))
+
+    def _insert_rules(self, rules: Iterable[StigRule]):
+        """Inserts rules (the FTS index is kept in sync by trigger)."""
+        placeholders = ", ".join("?" for _ in RULE_FIELDS)
+        self.conn.executemany(f"INSERT INTO rules ({', '.join(RULE_FIELDS)}) VALUES ({placeholders})",
+                              (tuple(getattr(rule, name) for name in RULE_FIELDS) for rule in rules))
+
+    def indexed_rules(self, source_file: str) -> list:
+        """Returns the indexed rules of a source file."""
+        rows = self.conn.execute(f"SELECT {', '.join(RULE_FIELDS)} FROM rules WHERE source_file = ?", (source_file,))
+        return [StigRule(*row) for row in rows]
+
+    def apply_diff(self, diff: BenchmarkDiff) -> dict:
+        """Moves the indexed rules of diff.old_file to diff.new_file.
+
+        Rules whose title, discussion and check text are unchanged keep their row and FTS
+        entry and only have their metadata updated; the others are deleted and inserted.
+        The caller commits.
+
+        Returns the number of rules updated in place, rewritten, added and removed.
+        """
+        ids = {(row["group_id"], row["rule_id"]): row["id"] for row in
+               self.conn.execute("SELECT id, group_id, rule_id FROM rules WHERE source_file = ?", (diff.old_file,))}
+
+        in_place = diff.unchanged + [(change.old, change.new) for change in diff.changed if not change.text_changed]
+        rewritten = [change for change in diff.changed if change.text_changed]
+
+        # Only columns outside the FTS index are updated, so the external-content index stays valid
+        metadata_fields = [name for name in RULE_FIELDS if name not in TEXT_FIELDS]
+        self.conn.executemany(
+            f"UPDATE rules SET {', '.join(f'{name} = ?' for name in metadata_fields)} WHERE id = ?",
+            [tuple(getattr(new, name) for name in metadata_fields) + (ids[old.group_id, old.rule_id],)
+             for old, new in in_place])
+        self.conn.executemany("DELETE FROM rules WHERE id = ?",
+                              [(ids[rule.group_id, rule.rule_id],)
+                               for rule in diff.removed + [change.old for change in rewritten]])
+        self._insert_rules(diff.added + [change.new for change in rewritten])
+        self.conn.execute("DELETE FROM files WHERE source_file = ?", (diff.old_file,))
+
+        return {"updated": len(in_place), "rewritten": len(rewritten),
+                "added": len(diff.added), "removed": len(diff.removed)}
+
+    def update(self, directory: str = MARKDOWN_DIR, processes: Optional[int] = None) -> dict:
+        """Reindexes only the benchmark files whose content changed since the last update.
+
+        A new (not yet indexed) file that replaces a removed revision of the same benchmark is
+        applied as a diff against the removed file's rules rather than indexed from scratch.
+
+        Returns the number of files reindexed, revised, touched, removed and unchanged.
+        """
+        status = self.changed_files(list_benchmark_files(directory))
+        revisions = pair_revisions(status["removed"], status["new"])
+        revised = {path for _, path in revisions}
+        superseded = {source_file for source_file, _ in revisions}
+        changed = [path for path in status["changed"] if path not in revised]
+
+        with self.conn:
+            for source_file, path in revisions:
+                self.apply_diff(diff_rules(self.indexed_rules(source_file), iter_rules(path)))
+
+            self.remove_files(source_file for source_file in status["removed"] if source_file not in superseded)
+            self.remove_files(os.path.basename(path) for path in changed)
+
+            if changed:
+                self._insert_rules(load_rules(changed, processes=processes))
+
+            for path in status["changed"] + status["touched"]:
+                self._record_file(path)
+
+        return {"reindexed": len(changed), "revised": len(revisions), "touched": len(status["touched"]),
+                "removed": len(status["removed"]) - len(superseded), "unchanged": status["unchanged"]}
+
+    def search(self, query: str, k: int = 10,
+               severity: Union[str, Iterable[str], None] = None,
+               benchmark: Optional[str] = None,
+               group: Optional[str] = None) -> list:
+        """Returns the top-k rules for a keyword query, ranked by BM25.
+
+        Args:
+            query: Free-text query.
+            k: Number of rules to return.
+            severity: Severity or severities to keep (low, medium, high).
+            benchmark: Keep rules whose benchmark_id or benchmark title contains this text.
+            group: Keep rules whose SRG group title starts with this text (e.g. SRG-APP-000295).
+        """
+        if not TOKEN.search(query):
+            return []
+
+        sql = [f"SELECT rules.*, bm25(rules_fts, {', '.join(map(str, BM25_WEIGHTS))}) AS score",
+               "FROM rules_fts JOIN rules ON rules.id = rules_fts.rowid",
+               "WHERE rules_fts MATCH ?"]
+        params = []
+
+        if severity:
+            severities = [severity] if isinstance(severity, str) else list(severity)
+            sql.append(f"AND rules.severity IN ({', '.join('?' for _ in severities)})")
+            params.extend(s.lower() for s in severities)
+        if benchmark:
+            sql.append("AND (rules.benchmark_id LIKE ? OR rules.benchmark LIKE ?)")
+            params.extend([f"%{benchmark}%"] * 2)
+        if group:
+            sql.append("AND rules.group_title LIKE ?")
+            params.append(f"{group}%")
+
+        sql.append("ORDER BY score LIMIT ?")
+        params.append(k)
+
+        # Rules matching every term are far fewer than those matching any term, so rank
+        # those first and only widen to any-term matching when they do not fill k
+        rules = []
+        for operator in ("AND", "OR"):
+            rows = self.conn.execute(" ".join(sql), [to_fts_query(query, operator)] + params)
+            seen = {rule["id"] for rule in rules}
+            rules.extend(dict(row) for row in rows if row["id"] not in seen)
+            if len(rules) >= k:
+                break
+
+        return rules[:k]
+
+    def lookup(self, identifier: str) -> list:
+        """Returns the rules with the given group ID (V-xxxxx) or rule ID (SV-xxxxx, with or without revision)."""
+        # IDs are stored as SV-<n>r<n>_rule / V-<n>: normalize the case of a user-typed ID
+        prefix, _, number = identifier.strip().partition("-")
+        identifier = f"{prefix.upper()}-{number.lower()}"
+        if prefix.upper() == "SV":
+            rows = self.conn.execute("SELECT * FROM rules WHERE rule_id = ? OR rule_id LIKE ?",
+                                     (identifier, f"{identifier}r%"))
+        else:
+            rows = self.conn.execute("SELECT * FROM rules WHERE group_id = ?", (identifier,))
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the STIG rule index.")
+    parser.add_argument("--index", default=INDEX_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    update_parser = subparsers.add_parser("update", help="Reindex changed benchmark files")
+    update_parser.add_argument("markdown_dir", nargs="?", default=MARKDOWN_DIR)
+
+    search_parser = subparsers.add_parser("search", help="BM25 keyword search")
+    search_parser.add_argument("query")
+    search_parser.add_argument("-k", type=int, default=10)
+    search_parser.add_argument("--severity", action="append")
+    search_parser.add_argument("--benchmark")
+    search_parser.add_argument("--group")
+
+    lookup_parser = subparsers.add_parser("lookup", help="Find rules by V- or SV- ID")
+    lookup_parser.add_argument("identifier")
+
+    args = parser.parse_args()
+    index = StigIndex(args.index)
+    start_time = time.perf_counter()
+
+    if args.command == "update":
+        print(index.update(args.markdown_dir))
+        rules = []
+    elif args.command == "search":
+        rules = index.search(args.query, k=args.k, severity=args.severity, benchmark=args.benchmark, group=args.group)
+    else:
+        rules = index.lookup(args.identifier)
+
+    for rule in rules:
+        print(f"{rule['group_id']:<10} {rule['rule_id']:<24} {rule['severity']:<7} {rule['source_file']}\n    {rule['title']}")
+    print(f"({time.perf_counter() - start_time:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
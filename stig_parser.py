@@ -0,0 +1,214 @@
+##############################################################################
+# STIG benchmark markdown parser
+##############################################################################
+# Turns the markdown/*.md STIG benchmarks into typed rule records.
+#
+# Usage:
+#   python stig_parser.py markdown stig_rules.parquet
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import astuple, dataclass, fields
+from typing import Iterable, Iterator, Optional
+
+MARKDOWN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "markdown")
+
+FILE_VERSION = re.compile(r"_V(\d+)R(\d+)")
+
+DISCUSSION = re.compile(r"<VulnDiscussion>(.*?)</VulnDiscussion>", re.DOTALL)
+
+
+@dataclass
+class StigRule:
+    """A single rule of a STIG benchmark."""
+    benchmark_id: str
+    benchmark: str
+    version: str
+    source_file: str
+    group_id: str
+    group_title: str
+    rule_id: str
+    severity: str
+    title: str
+    discussion: str
+    check_text: str
+
+
+RULE_FIELDS = [field.name for field in fields(StigRule)]
+
+
+def benchmark_id_from_path(path: str) -> tuple:
+    """Returns (benchmark_id, version) for a benchmark file.
+
+    The benchmark_id is the file name without its release and boilerplate suffixes, so
+    that U_ASD_STIG_V5R3_Manual-xccdf.md and U_ASD_STIG_V6R3_Manual-xccdf.md share it.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+
+    match = FILE_VERSION.search(stem)
+    version = f"V{match.group(1)}R{match.group(2)}" if match else ""
+
+    benchmark_id = FILE_VERSION.sub("", stem)
+    benchmark_id = re.sub(r"(_STIG|_Manual|[-_]xccdf)", "", benchmark_id)
+
+    return benchmark_id, version
+
+
+def _tick_value(line: str) -> str:
+    """Returns the value of a '**Label:** `value`' line."""
+    return line.split(":**", 1)[1].strip().strip("`")
+
+
+def iter_rules(path: str) -> Iterator[StigRule]:
+    """Streams the rules of a benchmark file line by line.
+
+    Args:
+        path: Path to a STIG benchmark markdown file.
+    """
+    benchmark_id, version = benchmark_id_from_path(path)
+    source_file = os.path.basename(path)
+    benchmark = ""
+
+    rule: Optional[dict] = None
+    section = None
+    description, check_text = [], []
+
+    def build(rule, description, check_text):
+        """Builds the record for the rule that has just ended."""
+        text = "\n".join(description).strip()
+        match = DISCUSSION.search(text)
+        return StigRule(benchmark_id=benchmark_id, benchmark=benchmark, version=version,
+                        source_file=source_file, discussion=(match.group(1) if match else text).strip(),
+                        check_text="\n".join(check_text).strip(), **rule)
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\n")
+
+            if line.startswith("## Group:"):
+                if rule is not None:
+                    yield build(rule, description, check_text)
+                rule = {"group_id": "", "group_title": line[len("## Group:"):].strip(), "rule_id": "",
+                        "severity": "", "title": ""}
+                section = None
+                description, check_text = [], []
+
+            elif rule is None:
+                if line.startswith("# STIG Benchmark:"):
+                    benchmark = line[len("# STIG Benchmark:"):].strip()
+                elif line.startswith("**Version:**") and not version:
+                    version = f"V{_tick_value(line)}"
+
+            elif section == "check":
+                check_text.append(line)
+
+            elif line.startswith("**Group ID:**"):
+                rule["group_id"] = _tick_value(line)
+
+            elif line.startswith("### Rule:"):
+                rule["title"] = line[len("### Rule:"):].strip()
+
+            elif line.startswith("**Rule ID:**"):
+                rule["rule_id"] = _tick_value(line)
+
+            elif line.startswith("**Severity:**"):
+                rule["severity"] = _tick_value(line).lower()
+
+            elif line.startswith("**Description:**"):
+                section = "description"
+
+            elif line.startswith("**Check Text:**"):
+                section = "check"
+
+            elif section == "description":
+                description.append(line)
+
+    if rule is not None:
+        yield build(rule, description, check_text)
+
+
+def parse_file(path: str) -> list:
+    """Parses a benchmark file into a list of rule tuples (cheap to send across processes)."""
+    return [astuple(rule) for rule in iter_rules(path)]
+
+
+def list_benchmark_files(directory: str = MARKDOWN_DIR) -> list:
+    """Returns the benchmark markdown files of a directory, sorted by name."""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".md"))
+
+
+def load_rules(paths: Optional[Iterable[str]] = None, processes: Optional[int] = None) -> Iterator[StigRule]:
+    """Parses benchmark files in parallel across a process pool, yielding rules file by file.
+
+    Args:
+        paths: Files to parse; defaults to every file in markdown/.
+        processes: Size of the process pool; defaults to the number of CPUs.
+    """
+    paths = list_benchmark_files() if paths is None else list(paths)
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for rows in executor.map(parse_file, paths, chunksize=4):
+            for row in rows:
+                yield StigRule(*row)
+
+
+def rules_to_arrow(rules: Iterable[StigRule]):
+    """Returns the rules as a pyarrow Table with one string column per StigRule field."""
+    import pyarrow as pa
+
+    columns = {name: [] for name in RULE_FIELDS}
+    for rule in rules:
+        for name, value in zip(RULE_FIELDS, astuple(rule)):
+            columns[name].append(value)
+
+    return pa.table({name: pa.array(values, type=pa.string()) for name, values in columns.items()})
+
+
+def write_parquet(output_path: str, paths: Optional[Iterable[str]] = None, processes: Optional[int] = None,
+                  batch_size: int = 10000) -> int:
+    """Parses the corpus in parallel and streams the rules to a Parquet file in row groups.
+
+    Returns the number of rules written.
+    """
+    import pyarrow.parquet as pq
+
+    writer, batch, count = None, [], 0
+
+    def flush(writer, batch):
+        """Writes a batch of rules as a row group."""
+        table = rules_to_arrow(batch)
+        writer = writer or pq.ParquetWriter(output_path, table.schema, compression="zstd")
+        writer.write_table(table)
+        return writer
+
+    try:
+        for rule in load_rules(paths, processes=processes):
+            batch.append(rule)
+            count += 1
+            if len(batch) >= batch_size:
+                writer, batch = flush(writer, batch), []
+        if batch or writer is None:
+            writer = flush(writer, batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse STIG benchmark markdown into a Parquet file of rules.")
+    parser.add_argument("markdown_dir", nargs="?", default=MARKDOWN_DIR)
+    parser.add_argument("output", nargs="?", default="stig_rules.parquet")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    count = write_parquet(args.output, list_benchmark_files(args.markdown_dir), processes=args.processes)
+    print(f"Wrote {count} rules to {args.output} in {time.perf_counter() - start_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
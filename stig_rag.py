@@ -0,0 +1,122 @@
+##############################################################################
+# Hybrid keyword + vector retrieval over the STIG rules
+##############################################################################
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from chat_memory import estimate_tokens
+from stig_index import StigIndex
+
+IDENTIFIER = re.compile(r"\b(S?V-\d+(?:r\d+_rule)?)\b", re.IGNORECASE)
+
+# Characters of discussion/check text kept per snippet
+SNIPPET_CHARS = 700
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes a query for caching: lowercase, single-spaced, without trailing punctuation."""
+    return " ".join(query.lower().split()).rstrip("?.! ")
+
+
+def rule_key(rule: dict) -> str:
+    """Key a rule is fused under, shared by index rows and vector store metadata."""
+    return f"{rule['source_file']}#{rule['rule_id']}"
+
+
+def format_snippet(rule: dict) -> str:
+    """Formats a rule as a compact snippet for the prompt."""
+    return (f"[{rule['group_id']} | {rule['rule_id']} | severity: {rule['severity']} | "
+            f"{rule['benchmark']} {rule['version']}]\n"
+            f"{rule['title']}\n"
+            f"Discussion: {rule['discussion'][:SNIPPET_CHARS]}\n"
+            f"Check: {rule['check_text'][:SNIPPET_CHARS]}")
+
+
+class HybridRetriever:
+    """Fuses BM25 and vector rankings of STIG rules and packs the best ones into a token budget.
+
+    Args:
+        index: Keyword index (see stig_index).
+        vectors: Optional vector store (see stig_vectors); keyword-only retrieval without it.
+        k: Maximum number of snippets returned.
+        candidates: Number of candidates taken from each ranking before fusion.
+        max_context_tokens: Token budget for the returned snippets.
+        rrf_k: Reciprocal rank fusion constant.
+        cache_size: Number of normalized queries whose results are cached.
+    """
+
+    def __init__(self, index: StigIndex, vectors=None, k: int = 5, candidates: int = 20,
+                 max_context_tokens: int = 1500, rrf_k: int = 60, cache_size: int = 256):
+        self.index = index
+        self.vectors = vectors
+        self.k = k
+        self.candidates = candidates
+        self.max_context_tokens = max_context_tokens
+        self.rrf_k = rrf_k
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _vector_rules(self, query: str) -> list:
+        """Nearest rules from the vector store, resolved to full index rows."""
+        if self.vectors is None:
+            return []
+
+        rules = []
+        for chunk in self.vectors.query(query, k=self.candidates):
+            metadata = chunk["metadata"]
+            rules.extend(rule for rule in self.index.lookup(metadata["rule_id"])
+                         if rule["source_file"] == metadata["source_file"])
+        return rules
+
+    def fuse(self, rankings: list) -> list:
+        """Reciprocal rank fusion of several ranked lists of rules."""
+        scores, rules = {}, {}
+        for ranking in rankings:
+            for rank, rule in enumerate(ranking):
+                key = rule_key(rule)
+                rules.setdefault(key, rule)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        return [rules[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+    def retrieve(self, query: str) -> list:
+        """Returns the snippets of the top rules for the query, within the token budget."""
+        key = normalize_query(query)
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        # Rules named explicitly by ID always come first
+        rankings = [[rule for identifier in IDENTIFIER.findall(query) for rule in self.index.lookup(identifier)]]
+        fused = rankings[0] + self.fuse([self.index.search(query, k=self.candidates), self._vector_rules(query)])
+
+        snippets, seen, tokens = [], set(), 0
+        for rule in fused:
+            if rule_key(rule) in seen:
+                continue
+            snippet = format_snippet(rule)
+            if tokens + estimate_tokens(snippet) > self.max_context_tokens and snippets:
+                break
+            seen.add(rule_key(rule))
+            snippets.append(snippet)
+            tokens += estimate_tokens(snippet)
+            if len(snippets) >= self.k:
+                break
+
+        with self._lock:
+            self._cache[key] = snippets
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return snippets
+
+
+def grounding_prompt(snippets: list, template: str) -> Optional[str]:
+    """Fills the grounding template with the retrieved snippets (None if nothing was retrieved)."""
+    if not snippets:
+        return None
+    return template.format(rules="\n\n".join(snippets))
@@ -0,0 +1,273 @@
+##############################################################################
+# Embedding pipeline and local vector store for the STIG rules
+##############################################################################
+# Embeds one chunk per rule into an embedded Chroma collection. Vectors are
+# cached by content hash, so re-ingesting after a STIG revision only embeds
+# the rules whose text changed. A new revision of an ingested benchmark can
+# also be applied as a diff (see stig_diff), reusing the stored vectors of
+# the rules whose text did not change.
+#
+# Usage:
+#   python stig_vectors.py ingest
+#   python stig_vectors.py revise markdown/U_ASD_STIG_V5R3_Manual-xccdf.md markdown/U_ASD_STIG_V6R3_Manual-xccdf.md
+#   python stig_vectors.py query "session idle timeout"
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from stig_diff import BenchmarkDiff, diff_files
+from stig_parser import StigRule, list_benchmark_files, load_rules
+
+STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stig_vectors")
+
+COLLECTION_NAME = "stig_rules"
+
+EMBED_DIMENSIONS = 768
+
+UPSERT_BATCH = 1000
+
+# Rough cap on the characters embedded per rule, to stay within embedding model context limits
+MAX_CHUNK_CHARS = 6000
+
+
+def get_embedder():
+    """Returns the embedding client configured the same way as app.py."""
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(
+        api_key=os.getenv('EMBED_API_KEY'),
+        base_url=os.getenv('EMBED_API_BASE'),
+        dimensions=EMBED_DIMENSIONS,
+        model=os.getenv('EMBED_LLM_NAME'),
+    )
+
+
+def rule_chunk(rule: StigRule) -> dict:
+    """Builds the chunk embedded for a rule: its title, discussion and check text."""
+    text = f"{rule.title}\n\n{rule.discussion}\n\nCheck: {rule.check_text}"[:MAX_CHUNK_CHARS]
+    return {
+        "id": f"{rule.source_file}#{rule.rule_id}",
+        "text": text,
+        "metadata": {
+            "benchmark_id": rule.benchmark_id,
+            "benchmark": rule.benchmark,
+            "version": rule.version,
+            "source_file": rule.source_file,
+            "group_id": rule.group_id,
+            "group_title": rule.group_title,
+            "rule_id": rule.rule_id,
+            "severity": rule.severity,
+            "title": rule.title,
+        },
+    }
+
+
+def content_hash(text: str, model: str) -> str:
+    """Hash a vector is cached under: the chunk text and the model that embedded it."""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class VectorCache:
+    """SQLite cache of embedding vectors keyed by content hash."""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self.conn.commit()
+        self._lock = threading.Lock()
+
+    def get_many(self, hashes: list) -> dict:
+        """Returns {hash: vector} for the hashes that are cached."""
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT hash, vector FROM vectors WHERE hash IN ({', '.join('?' for _ in batch)})", batch)
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, vectors: dict):
+        """Stores {hash: vector}."""
+        with self._lock:
+            self.conn.executemany("INSERT OR REPLACE INTO vectors (hash, vector) VALUES (?, ?)",
+                                  [(key, array("f", vector).tobytes()) for key, vector in vectors.items()])
+            self.conn.commit()
+
+
+class StigVectorStore:
+    """Embedded Chroma collection of STIG rule chunks with content-hash vector caching.
+
+    Args:
+        embedder: Any object with LangChain's embed_documents/embed_query interface.
+        path: Directory of the persistent Chroma store (the vector cache lives next to it).
+        model: Name of the embedding model, part of the cache key.
+        batch_size: Number of chunks per embedding request.
+        max_workers: Number of embedding requests in flight.
+    """
+
+    def __init__(self, embedder, path: str = STORE_PATH, model: Optional[str] = None,
+                 batch_size: int = 128, max_workers: int = 8):
+        import chromadb
+
+        os.makedirs(path, exist_ok=True)
+        self.embedder = embedder
+        self.model = model or getattr(embedder, "model", None) or "default"
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.client = chromadb.PersistentClient(path=path)
+        self.collection = self.client.get_or_create_collection(COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+        self.cache = VectorCache(os.path.join(path, "vector_cache.sqlite"))
+
+    def _embed(self, texts_by_hash: dict) -> dict:
+        """Embeds texts concurrently in batches, skipping those already in the vector cache."""
+        vectors = self.cache.get_many(list(texts_by_hash))
+        missing = [key for key in texts_by_hash if key not in vectors]
+
+        def embed_batch(keys):
+            embedded = dict(zip(keys, self.embedder.embed_documents([texts_by_hash[key] for key in keys])))
+            self.cache.put_many(embedded)
+            return embedded
+
+        batches = [missing[start:start + self.batch_size] for start in range(0, len(missing), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for embedded in executor.map(embed_batch, batches):
+                vectors.update(embedded)
+
+        return vectors
+
+    def ingest(self, rules: Iterable[StigRule]) -> dict:
+        """Brings the collection in line with the given rules.
+
+        Only chunks whose content hash changed are embedded and upserted; chunks of the
+        ingested source files that no longer exist are deleted.
+
+        Returns the number of chunks embedded, upserted, deleted and unchanged.
+        """
+        chunks = {chunk["id"]: chunk for chunk in map(rule_chunk, rules)}
+        for chunk in chunks.values():
+            chunk["metadata"]["content_hash"] = content_hash(chunk["text"], self.model)
+
+        source_files = sorted({chunk["metadata"]["source_file"] for chunk in chunks.values()})
+        existing = {}
+        for start in range(0, len(source_files), 100):
+            stored = self.collection.get(where={"source_file": {"$in": source_files[start:start + 100]}},
+                                         include=["metadatas"])
+            existing.update(zip(stored["ids"], (m["content_hash"] for m in stored["metadatas"])))
+
+        changed = [chunk for chunk_id, chunk in chunks.items()
+                   if existing.get(chunk_id) != chunk["metadata"]["content_hash"]]
+        stale = [chunk_id for chunk_id in existing if chunk_id not in chunks]
+
+        cached_before = len(self.cache.get_many([chunk["metadata"]["content_hash"] for chunk in changed]))
+        vectors = self._embed({chunk["metadata"]["content_hash"]: chunk["text"] for chunk in changed})
+
+        self._upsert(changed, vectors)
+        for start in range(0, len(stale), UPSERT_BATCH):
+            self.collection.delete(ids=stale[start:start + UPSERT_BATCH])
+
+        return {"embedded": len({chunk["metadata"]["content_hash"] for chunk in changed}) - cached_before,
+                "upserted": len(changed), "deleted": len(stale), "unchanged": len(chunks) - len(changed)}
+
+    def _upsert(self, chunks: list, vectors: dict):
+        """Upserts chunks in batches, with their vectors looked up by content hash."""
+        for start in range(0, len(chunks), UPSERT_BATCH):
+            batch = chunks[start:start + UPSERT_BATCH]
+            self.collection.upsert(ids=[chunk["id"] for chunk in batch],
+                                   embeddings=[vectors[chunk["metadata"]["content_hash"]] for chunk in batch],
+                                   documents=[chunk["text"] for chunk in batch],
+                                   metadatas=[chunk["metadata"] for chunk in batch])
+
+    def apply_diff(self, diff: BenchmarkDiff) -> dict:
+        """Replaces the chunks of diff.old_file with those of diff.new_file.
+
+        Rules whose text is unchanged reuse the vectors stored under their old chunk IDs,
+        so only added rules and rules whose text changed are embedded (or taken from the
+        vector cache).
+
+        Returns the number of chunks embedded, reused and deleted.
+        """
+        kept = diff.unchanged + [(change.old, change.new) for change in diff.changed if not change.text_changed]
+        embedded_rules = diff.added + [change.new for change in diff.changed if change.text_changed]
+
+        old_ids = [rule_chunk(old)["id"] for old, _ in kept]
+        stored = {}
+        for start in range(0, len(old_ids), UPSERT_BATCH):
+            found = self.collection.get(ids=old_ids[start:start + UPSERT_BATCH], include=["embeddings"])
+            stored.update(zip(found["ids"], (list(map(float, vector)) for vector in found["embeddings"])))
+
+        chunks, vectors = [], {}
+        for old_id, (_, new) in zip(old_ids, kept):
+            chunk = rule_chunk(new)
+            chunk["metadata"]["content_hash"] = content_hash(chunk["text"], self.model)
+            chunks.append(chunk)
+            if old_id in stored:
+                vectors[chunk["metadata"]["content_hash"]] = stored[old_id]
+            else:
+                embedded_rules.append(new)
+        chunks = [chunk for chunk in chunks if chunk["metadata"]["content_hash"] in vectors]
+
+        new_chunks = list(map(rule_chunk, embedded_rules))
+        for chunk in new_chunks:
+            chunk["metadata"]["content_hash"] = content_hash(chunk["text"], self.model)
+        cached_before = len(self.cache.get_many([chunk["metadata"]["content_hash"] for chunk in new_chunks]))
+        vectors.update(self._embed({chunk["metadata"]["content_hash"]: chunk["text"] for chunk in new_chunks}))
+
+        self._upsert(chunks + new_chunks, vectors)
+        deleted = len(self.collection.get(where={"source_file": diff.old_file}, include=[])["ids"])
+        self.collection.delete(where={"source_file": diff.old_file})
+
+        return {"embedded": len({chunk["metadata"]["content_hash"] for chunk in new_chunks}) - cached_before,
+                "reused": len(chunks), "deleted": deleted}
+
+    def query(self, text: str, k: int = 10, where: Optional[dict] = None) -> list:
+        """Returns the k chunks nearest to the query, as dicts of id, document, metadata and distance."""
+        result = self.collection.query(query_embeddings=[self.embedder.embed_query(text)], n_results=k,
+                                       where=where, include=["documents", "metadatas", "distances"])
+        return [{"id": chunk_id, "document": document, "metadata": metadata, "distance": distance}
+                for chunk_id, document, metadata, distance in zip(result["ids"][0], result["documents"][0],
+                                                                   result["metadatas"][0], result["distances"][0])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed the STIG rules into a local vector store.")
+    parser.add_argument("--store", default=STORE_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Embed new and changed rules")
+    ingest_parser.add_argument("files", nargs="*", help="Benchmark files to ingest (default: all of markdown/)")
+
+    revise_parser = subparsers.add_parser("revise", help="Replace a benchmark revision with a newer one")
+    revise_parser.add_argument("old")
+    revise_parser.add_argument("new")
+
+    query_parser = subparsers.add_parser("query", help="Nearest-neighbour search")
+    query_parser.add_argument("text")
+    query_parser.add_argument("-k", type=int, default=10)
+
+    args = parser.parse_args()
+    store = StigVectorStore(get_embedder(), path=args.store)
+    start_time = time.perf_counter()
+
+    if args.command == "ingest":
+        print(store.ingest(load_rules(args.files or list_benchmark_files())))
+    elif args.command == "revise":
+        diff = diff_files(args.old, args.new)
+        print(diff.summary())
+        print(store.apply_diff(diff))
+    else:
+        for chunk in store.query(args.text, k=args.k):
+            print(f"{chunk['distance']:.3f} {chunk['metadata']['group_id']:<10} {chunk['metadata']['source_file']}\n"
+                  f"    {chunk['metadata']['title']}")
+    print(f"({time.perf_counter() - start_time:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
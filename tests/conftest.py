@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+# The STIG modules live at the repository root and import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RULE_TEMPLATE = """## Group: {group_title}
+
+**Group ID:** `{group_id}`
+
+### Rule: {title}
+
+**Rule ID:** `{rule_id}`
+**Severity:** {severity}
+
+**Description:**
+<VulnDiscussion>{discussion}</VulnDiscussion><FalsePositives></FalsePositives><Documentable>false</Documentable>
+
+**Check Text:**
+{check_text}
+
+"""
+
+
+def make_rule(number: int, revision: int = 1, **overrides) -> dict:
+    """Returns the markdown fields of a benchmark rule; overrides replace any of them."""
+    return {"group_title": f"SRG-APP-{number:06d}", "group_id": f"V-{number}",
+            "title": f"The application must enforce control {number}.",
+            "rule_id": f"SV-{number}r{revision}_rule", "severity": "medium",
+            "discussion": f"Control {number} limits session exposure.",
+            "check_text": f"Verify control {number} is enabled. If it is not, this is a finding.", **overrides}
+
+
+@pytest.fixture
+def rule():
+    """Returns a function building the markdown fields of a rule (see make_rule)."""
+    return make_rule
+
+
+@pytest.fixture
+def write_benchmark():
+    """Returns a function that writes a benchmark markdown file with the given rules."""
+    def write(path, rules, title="Example Application Security Technical Implementation Guide"):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# STIG Benchmark: {title}\n\n---\n\n**Version:** 1\n\n**Description:**\nAn example.\n\n")
+            for fields in rules:
+                f.write(RULE_TEMPLATE.format(**fields))
+        return str(path)
+
+    return write
@@ -0,0 +1,78 @@
+import os
+
+from stig_diff import diff_files, pair_revisions, rule_stem, version_key
+from stig_index import StigIndex
+
+
+def test_rule_stem_and_version_key():
+    assert rule_stem("SV-222387r960735_rule") == "SV-222387"
+    assert rule_stem("custom") == "custom"
+    assert version_key("V10R2") > version_key("V9R12") > version_key("")
+
+
+def test_diff_classifies_every_rule(tmp_path, write_benchmark, rule):
+    old = write_benchmark(tmp_path / "U_App_STIG_V1R1_Manual-xccdf.md",
+                          [rule(1), rule(2), rule(3), rule(4), rule(5)])
+    new = write_benchmark(tmp_path / "U_App_STIG_V1R2_Manual-xccdf.md", [
+        rule(1, revision=2),
+        rule(2, revision=2, severity="high"),
+        rule(3, revision=2, check_text="Verify the new setting."),
+        # Group renumbered: paired by rule-ID stem
+        rule(5, revision=2, group_id="V-50"),
+        rule(6),
+    ])
+
+    diff = diff_files(old, new)
+
+    assert (diff.benchmark_id, diff.old_version, diff.new_version) == ("U_App", "V1R1", "V1R2")
+    assert [rule.group_id for rule in diff.added] == ["V-6"]
+    assert [rule.group_id for rule in diff.removed] == ["V-4"]
+    assert sorted((change.new.group_id, change.fields) for change in diff.changed) == [
+        ("V-2", ["severity"]), ("V-3", ["check_text"])]
+    assert sorted(new.group_id for _, new in diff.unchanged) == ["V-1", "V-50"]
+
+    assert [change.new.group_id for change in diff.severity_changes] == ["V-2"]
+    assert {change.new.group_id: change.text_changed for change in diff.changed} == {"V-2": False, "V-3": True}
+    assert diff.summary()["severity_changed"] == 1
+
+
+def test_pair_revisions_uses_the_latest_revision():
+    old = ["U_App_STIG_V1R1_Manual-xccdf.md", "U_App_STIG_V1R3_Manual-xccdf.md", "U_Other_STIG_V1R1_Manual-xccdf.md"]
+    new = ["markdown/U_App_STIG_V2R1_Manual-xccdf.md", "markdown/U_New_STIG_V1R1_Manual-xccdf.md"]
+
+    assert pair_revisions(old, new) == [("U_App_STIG_V1R3_Manual-xccdf.md", "markdown/U_App_STIG_V2R1_Manual-xccdf.md")]
+
+
+def test_index_update_applies_revisions_as_diffs(tmp_path, write_benchmark, rule):
+    directory = tmp_path / "markdown"
+    directory.mkdir()
+    old = write_benchmark(directory / "U_App_STIG_V1R1_Manual-xccdf.md",
+                          [rule(1), rule(2), rule(3, discussion="Passwords must rotate.")])
+    write_benchmark(directory / "U_Other_STIG_V1R1_Manual-xccdf.md", [rule(10)])
+
+    index = StigIndex(str(tmp_path / "index.sqlite"))
+    index.update(str(directory), processes=1)
+
+    os.remove(old)
+    write_benchmark(directory / "U_App_STIG_V1R2_Manual-xccdf.md", [
+        rule(1, revision=2), rule(2, revision=2, severity="high"),
+        rule(3, revision=2, discussion="Passphrases must rotate."), rule(4)])
+    # A benchmark indexed for the first time alongside the revision is indexed in full
+    write_benchmark(directory / "U_New_STIG_V1R1_Manual-xccdf.md", [rule(20)])
+
+    status = index.update(str(directory), processes=1)
+
+    assert (status["revised"], status["reindexed"], status["removed"]) == (1, 1, 0)
+    assert index.indexed_rules("U_App_STIG_V1R1_Manual-xccdf.md") == []
+    assert sorted(rule.rule_id for rule in index.indexed_rules("U_App_STIG_V1R2_Manual-xccdf.md")) == [
+        "SV-1r2_rule", "SV-2r2_rule", "SV-3r2_rule", "SV-4r1_rule"]
+    assert index.lookup("V-2")[0]["severity"] == "high"
+
+    # The full-text index follows the rewritten rules
+    assert [rule["group_id"] for rule in index.search("passphrases")] == ["V-3"]
+    assert index.search("passwords") == []
+
+    assert [rule["group_id"] for rule in index.lookup("V-20")] == ["V-20"]
+    assert len(index.indexed_rules("U_Other_STIG_V1R1_Manual-xccdf.md")) == 1
+
+    index.close()
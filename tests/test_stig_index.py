@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from stig_index import StigIndex, to_fts_query
+
+
+@pytest.fixture
+def corpus(tmp_path, write_benchmark, rule):
+    """A markdown directory with two benchmarks."""
+    directory = tmp_path / "markdown"
+    directory.mkdir()
+
+    write_benchmark(directory / "U_Web_STIG_V1R1_Manual-xccdf.md", [
+        rule(1, title="The web server must terminate idle sessions after 15 minutes.", severity="high"),
+        rule(2, title="The web server must log every request.", discussion="Logs support forensic analysis."),
+    ], title="Web Server Security Technical Implementation Guide")
+    write_benchmark(directory / "U_DB_STIG_V1R1_Manual-xccdf.md", [
+        rule(3, title="The database must encrypt data at rest.", severity="high"),
+    ], title="Database Security Technical Implementation Guide")
+
+    return directory
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = StigIndex(str(tmp_path / "index.sqlite"))
+    yield index
+    index.close()
+
+
+def test_to_fts_query():
+    assert to_fts_query("Idle session-timeout") == '"idle" OR "session" OR "timeout"'
+    assert to_fts_query("idle session", "AND") == '"idle" AND "session"'
+
+
+def test_update_only_reindexes_changed_files(corpus, index, write_benchmark, rule):
+    assert index.update(str(corpus), processes=1) == {"reindexed": 2, "revised": 0, "touched": 0, "removed": 0,
+                                                      "unchanged": 0}
+    assert index.update(str(corpus), processes=1)["unchanged"] == 2
+
+    # A new mtime with the same content is only recorded
+    path = corpus / "U_DB_STIG_V1R1_Manual-xccdf.md"
+    os.utime(path, (1, 1))
+    assert index.update(str(corpus), processes=1)["touched"] == 1
+
+    write_benchmark(path, [rule(3), rule(4)])
+    assert index.update(str(corpus), processes=1)["reindexed"] == 1
+    assert len(index.indexed_rules(path.name)) == 2
+
+    os.remove(corpus / "U_Web_STIG_V1R1_Manual-xccdf.md")
+    assert index.update(str(corpus), processes=1)["removed"] == 1
+    assert index.lookup("V-1") == []
+
+
+def test_search_ranks_and_filters(corpus, index):
+    index.update(str(corpus), processes=1)
+
+    assert [rule["group_id"] for rule in index.search("idle sessions", k=1)] == ["V-1"]
+    assert index.search("forensic")[0]["group_id"] == "V-2"
+
+    # Rules matching any term fill the results once rules matching every term run out
+    assert {rule["group_id"] for rule in index.search("web encrypt")} == {"V-1", "V-2", "V-3"}
+
+    assert {rule["group_id"] for rule in index.search("must", severity="HIGH")} == {"V-1", "V-3"}
+    assert {rule["group_id"] for rule in index.search("must", benchmark="Database")} == {"V-3"}
+    assert {rule["group_id"] for rule in index.search("must", group="SRG-APP-000002")} == {"V-2"}
+    assert index.search("?!") == []
+
+
+def test_lookup_by_group_or_rule_id(corpus, index):
+    index.update(str(corpus), processes=1)
+
+    assert [rule["rule_id"] for rule in index.lookup("V-2")] == ["SV-2r1_rule"]
+    assert [rule["group_id"] for rule in index.lookup("SV-2")] == ["V-2"]
+    assert [rule["group_id"] for rule in index.lookup("SV-2r1_rule")] == ["V-2"]
+
+    # IDs typed in any case match
+    assert [rule["group_id"] for rule in index.lookup(" sv-2R1_RULE ")] == ["V-2"]
+    assert [rule["group_id"] for rule in index.lookup("v-2")] == ["V-2"]
@@ -0,0 +1,36 @@
+from stig_parser import MARKDOWN_DIR, StigRule, benchmark_id_from_path, iter_rules, list_benchmark_files, load_rules
+
+
+def test_benchmark_id_from_path():
+    assert benchmark_id_from_path("markdown/U_ASD_STIG_V5R3_Manual-xccdf.md") == ("U_ASD", "V5R3")
+    assert benchmark_id_from_path("U_ASD_STIG_V6R3_Manual-xccdf.md") == ("U_ASD", "V6R3")
+    assert benchmark_id_from_path("DOD_EP_V3.md") == ("DOD_EP_V3", "")
+
+
+def test_iter_rules_parses_every_field(tmp_path, write_benchmark, rule):
+    path = write_benchmark(tmp_path / "U_Example_STIG_V2R1_Manual-xccdf.md",
+                           [rule(1), rule(2, severity="High", check_text="Line one.\nLine two.")])
+
+    rules = list(iter_rules(path))
+
+    assert rules[0] == StigRule(
+        benchmark_id="U_Example", benchmark="Example Application Security Technical Implementation Guide",
+        version="V2R1", source_file="U_Example_STIG_V2R1_Manual-xccdf.md", group_id="V-1",
+        group_title="SRG-APP-000001", rule_id="SV-1r1_rule", severity="medium",
+        title="The application must enforce control 1.", discussion="Control 1 limits session exposure.",
+        check_text="Verify control 1 is enabled. If it is not, this is a finding.")
+
+    assert rules[1].severity == "high"
+    assert rules[1].check_text == "Line one.\nLine two."
+
+
+def test_version_falls_back_to_the_header(tmp_path, write_benchmark, rule):
+    (parsed,) = iter_rules(write_benchmark(tmp_path / "DOD_Example.md", [rule(1)]))
+
+    assert parsed.version == "V1"
+
+
+def test_load_rules_matches_iter_rules_on_the_corpus():
+    paths = list_benchmark_files(MARKDOWN_DIR)[:8]
+
+    assert list(load_rules(paths, processes=2)) == [parsed for path in paths for parsed in iter_rules(path)]